@@ -1,12 +1,19 @@
-from tools import Agent_Tools
-from elasticsearch import Elasticsearch
+from tools import AsyncAgent_Tools
+from elasticsearch import AsyncElasticsearch
 
 from pydantic_ai import Agent, RunContext
-from pydantic_ai.messages import FunctionToolCallEvent
+from pydantic_ai.messages import FunctionToolCallEvent, FunctionToolResultEvent, ToolReturnPart
 from pydantic import BaseModel, HttpUrl
 from toyaikit.chat.interface import StdOutputInterface
 from toyaikit.chat.runners import PydanticAIRunner
 import asyncio
+import time
+from datetime import datetime
+from monitoring.metrics import (
+    AGENT_RUN_SECONDS, TOOL_RESULT_BYTES, TOOL_RESULT_TOKENS, TOOL_SECONDS, record_usage, timed
+)
+from monitoring.tokens import count_tokens
+from monitoring.tracing import TracedModel, span
 
 class Reference(BaseModel):
     title: str
@@ -62,10 +69,28 @@ class OrchestratorInput(BaseModel):
     messages: list[Message]
 
 
+class ToolTiming(BaseModel):
+    tool_name: str
+    tool_call_id: str
+    started_at: str
+    seconds: float
+    args_bytes: int
+    result_bytes: int
+    result_tokens: int
+    retry: bool  # the call failed validation or asked the model to retry
+
+
 class NamedCallback:
+    """
+    Prints tool calls and times them: each call event is paired with its
+    result event by tool_call_id. Use one callback per run, the timings
+    end up in that run's log via log_run.
+    """
 
     def __init__(self, agent):
         self.agent_name = agent.name
+        self.tool_timings: list[ToolTiming] = []
+        self._pending = {}
 
     async def print_function_calls(self, ctx, event):
         # Detect nested streams
@@ -78,6 +103,34 @@ class NamedCallback:
             tool_name = event.part.tool_name
             args = event.part.args
             print(f"TOOL CALL ({self.agent_name}): {tool_name}({args})")
+            self._pending[event.tool_call_id] = (event.part, datetime.now(), time.perf_counter())
+
+        elif isinstance(event, FunctionToolResultEvent):
+            self.record_result(event)
+
+    def record_result(self, event: FunctionToolResultEvent):
+        pending = self._pending.pop(event.tool_call_id, None)
+        if pending is None:
+            return
+        call, started_at, started = pending
+
+        part = event.result
+        retry = not isinstance(part, ToolReturnPart)
+        result_text = part.model_response() if retry else part.model_response_str()
+        timing = ToolTiming(
+            tool_name=call.tool_name,
+            tool_call_id=event.tool_call_id,
+            started_at=started_at.isoformat(),
+            seconds=time.perf_counter() - started,
+            args_bytes=len(call.args_as_json_str().encode("utf-8")),
+            result_bytes=len(result_text.encode("utf-8")),
+            result_tokens=count_tokens(result_text),
+            retry=retry,
+        )
+        self.tool_timings.append(timing)
+
+        TOOL_RESULT_BYTES.observe(timing.result_bytes, tool=timing.tool_name)
+        TOOL_RESULT_TOKENS.inc(timing.result_tokens, tool=timing.tool_name)
 
     async def __call__(self, ctx, event):
         return await self.print_function_calls(ctx, event)
@@ -86,9 +139,26 @@ class NamedCallback:
 
 
 
-def create_agents():
-    es = Elasticsearch("http://localhost:9200")
-    agent_class = Agent_Tools(es_index=es)
+ES_URL = "http://localhost:9200"
+DEFAULT_MODEL = 'openai:gpt-4o-mini'
+
+
+def agent_span(agent):
+    return span(f"invoke_agent {agent.name}", attributes={"gen_ai.agent.name": agent.name})
+
+
+def create_agents(agent_class: AsyncAgent_Tools | None = None, models: dict | None = None):
+    # Pass agent_class to share one set of ES/HTTP clients between agents.
+    # models maps an agent name (orchestrator, search_quality_check, summarize)
+    # to a model name or pydantic-ai Model, e.g. a FunctionModel for offline replays.
+    if agent_class is None:
+        es = AsyncElasticsearch(ES_URL)
+        agent_class = AsyncAgent_Tools(es_index=es)
+
+    models = models or {}
+
+    def agent_model(agent_name):
+        return TracedModel(models.get(agent_name, DEFAULT_MODEL))
 
 
     search_quality_check_instructions = """
@@ -125,7 +195,7 @@ def create_agents():
     search_quality_check_agent = Agent(
         name="search_quality_check",
         instructions=search_quality_check_instructions,
-        model='openai:gpt-4o-mini',
+        model=agent_model("search_quality_check"),
         output_type=SearchEvaluationOutput
     )
 
@@ -145,9 +215,14 @@ def create_agents():
                 ]
             )
 
-        result = await search_quality_check_agent.run(
-            user_prompt=params.model_dump_json()
-        )
+        with span("execute_tool search_quality_check", attributes={"gen_ai.tool.name": "search_quality_check"}), \
+                agent_span(search_quality_check_agent), \
+                timed(TOOL_SECONDS, tool="search_quality_check"), \
+                timed(AGENT_RUN_SECONDS, agent=search_quality_check_agent.name):
+            result = await search_quality_check_agent.run(
+                user_prompt=params.model_dump_json()
+            )
+        record_usage(search_quality_check_agent.name, result.usage())
         return result.output
     
     # fetch more data using the get_data_to_index tool and 
@@ -164,7 +239,7 @@ def create_agents():
         name="summarize",
         instructions=summarizing_instructions,
         # tools= summarize_tool,
-        model='gpt-4o-mini'
+        model=agent_model("summarize")
     )
 
     def format_summarizing_instructions(context, latest_query):
@@ -186,7 +261,9 @@ def create_agents():
         """
 
         callback = NamedCallback(summarize_agent)
-        results = await summarize_agent.run(user_prompt=user_prompt, event_stream_handler=callback)
+        with agent_span(summarize_agent), timed(AGENT_RUN_SECONDS, agent=summarize_agent.name):
+            results = await summarize_agent.run(user_prompt=user_prompt, event_stream_handler=callback)
+        record_usage(summarize_agent.name, results.usage())
 
         return results.output
 
@@ -213,7 +290,7 @@ def create_agents():
         name="orchestrator",
         tools=orchestrator_tools,
         instructions=orchestrator_instructions,
-        model='openai:gpt-4o-mini',
+        model=agent_model("orchestrator"),
         output_type=SearchResultSummary
     )
     
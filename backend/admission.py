@@ -0,0 +1,140 @@
+import asyncio
+import os
+import time
+from collections import defaultdict
+from dataclasses import dataclass
+
+from pydantic import BaseModel
+
+
+class AdmissionConfig(BaseModel):
+    max_concurrency: int = 8        # chats running at once across all clients
+    max_per_client: int = 2         # running + queued chats allowed per client
+    max_queue: int = 16             # chats allowed to wait for a global slot
+    queue_timeout: float = 30.0     # seconds a queued chat waits before 503
+    retry_after: int = 5            # seconds sent back in the Retry-After header
+
+    @classmethod
+    def from_env(cls):
+        return cls(
+            max_concurrency=int(os.getenv("CHAT_MAX_CONCURRENCY", 8)),
+            max_per_client=int(os.getenv("CHAT_MAX_PER_CLIENT", 2)),
+            max_queue=int(os.getenv("CHAT_MAX_QUEUE", 16)),
+            queue_timeout=float(os.getenv("CHAT_QUEUE_TIMEOUT", 30.0)),
+            retry_after=int(os.getenv("CHAT_RETRY_AFTER", 5)),
+        )
+
+
+class AdmissionRejected(Exception):
+    """
+    Raised when a chat cannot be admitted.
+
+    status_code is 429 when the client is over its own limit and 503 when
+    the server as a whole is saturated (queue full or queue wait timed out).
+    """
+
+    def __init__(self, status_code: int, reason: str, retry_after: int):
+        super().__init__(reason)
+        self.status_code = status_code
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+@dataclass
+class Ticket:
+    client_id: str
+    wait_time: float
+    released: bool = False
+
+
+class AdmissionController:
+    """
+    Bounds how many chats run at once, globally and per client.
+
+    A chat that finds no free global slot waits in a bounded queue for at
+    most `queue_timeout` seconds. Everything else is rejected immediately so
+    overloaded clients get a fast 429/503 instead of a slow answer.
+    """
+
+    def __init__(self, config: AdmissionConfig | None = None):
+        self.config = config or AdmissionConfig()
+        self._slots = asyncio.Semaphore(self.config.max_concurrency)
+        self._per_client = defaultdict(int)
+
+        self.active = 0
+        self.queue_depth = 0
+        self.max_queue_depth = 0
+        self.admitted = 0
+        self.rejected = defaultdict(int)
+        self.wait_count = 0
+        self.wait_total = 0.0
+        self.wait_max = 0.0
+
+    def _reject(self, status_code: int, reason: str):
+        self.rejected[reason] += 1
+        raise AdmissionRejected(status_code, reason, self.config.retry_after)
+
+    async def acquire(self, client_id: str) -> Ticket:
+        if self._per_client[client_id] >= self.config.max_per_client:
+            self._reject(429, "client_limit")
+
+        must_wait = self._slots.locked()
+        if must_wait and self.queue_depth >= self.config.max_queue:
+            self._reject(503, "queue_full")
+
+        self._per_client[client_id] += 1
+        start = time.monotonic()
+        # only chats that actually wait for a slot count as queued
+        if must_wait:
+            self.queue_depth += 1
+            self.max_queue_depth = max(self.max_queue_depth, self.queue_depth)
+        try:
+            await asyncio.wait_for(self._slots.acquire(), timeout=self.config.queue_timeout)
+        except asyncio.TimeoutError:
+            self._release_client(client_id)
+            self._reject(503, "queue_timeout")
+        except BaseException:
+            self._release_client(client_id)
+            raise
+        finally:
+            if must_wait:
+                self.queue_depth -= 1
+
+        wait_time = time.monotonic() - start
+        self.active += 1
+        self.admitted += 1
+        self.wait_count += 1
+        self.wait_total += wait_time
+        self.wait_max = max(self.wait_max, wait_time)
+
+        return Ticket(client_id=client_id, wait_time=wait_time)
+
+    def release(self, ticket: Ticket):
+        # safe to call more than once, so every exit path of a chat can release
+        if ticket.released:
+            return
+        ticket.released = True
+        self.active -= 1
+        self._slots.release()
+        self._release_client(ticket.client_id)
+
+    def _release_client(self, client_id: str):
+        self._per_client[client_id] -= 1
+        if self._per_client[client_id] <= 0:
+            del self._per_client[client_id]
+
+    def stats(self) -> dict:
+        return {
+            "active": self.active,
+            "queue_depth": self.queue_depth,
+            "max_queue_depth": self.max_queue_depth,
+            "admitted": self.admitted,
+            "rejected": dict(self.rejected),
+            "wait_time": {
+                "count": self.wait_count,
+                "total": self.wait_total,
+                "avg": self.wait_total / self.wait_count if self.wait_count else 0.0,
+                "max": self.wait_max,
+            },
+            "limits": self.config.model_dump(),
+        }
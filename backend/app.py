@@ -1,12 +1,23 @@
+from contextlib import asynccontextmanager
+from elasticsearch import AsyncElasticsearch
 from fastapi import FastAPI, Request
-from fastapi.responses import StreamingResponse
-from main import run_sync_agent
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+from starlette.background import BackgroundTask
+from main import run_agent_batch
 import json
+import time
 import asyncio
 from jaxn import StreamingJSONParser, JSONParserHandler
-from agents import create_agents, NamedCallback
+from agents import create_agents, NamedCallback, ES_URL, agent_span
+from tools import AsyncAgent_Tools, shutdown_process_pool
 from monitoring.agent_logging import log_run, save_log, create_log_entry, log_streamed_run
 from pydantic import BaseModel
+from backend.admission import AdmissionConfig, AdmissionController, AdmissionRejected
+from backend.ingest import IngestJobManager, IngestRequest
+from backend.cache import AnswerCache
+import os
+from monitoring import metrics
+from monitoring.tracing import configure_from_env, current_span, tracer
 
 class Reference(BaseModel):
     title: str
@@ -27,7 +38,67 @@ class SearchResultSummary(BaseModel):
 
         return output
 
-app = FastAPI()
+# One set of async clients and one agent shared by every chat, built at
+# startup unless use_agent() was called first
+agent_tools: AsyncAgent_Tools | None = None
+agent = None
+ingest_jobs: IngestJobManager | None = None
+
+answer_cache = AnswerCache(
+    ttl=float(os.getenv("ANSWER_CACHE_TTL", 3600)),
+    similarity_threshold=float(os.getenv("ANSWER_CACHE_SIMILARITY", 0.8)),
+)
+
+
+def use_agent(tools: AsyncAgent_Tools, orchestrator):
+    """
+    Serve `orchestrator` with `tools` instead of the default OpenAI agents
+    and Elasticsearch, e.g. stub LLMs for load tests (benchmarks/stub_agent.py).
+    Call it before the app starts.
+    """
+    global agent_tools, agent, ingest_jobs
+    agent_tools, agent = tools, orchestrator
+    ingest_jobs = IngestJobManager(tools)
+    tools.index_listeners.append(answer_cache.invalidate_docs)
+
+# Spans always go to an in-memory buffer; set TRACE_FILE to also keep them on disk
+configure_from_env()
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    if agent is None:
+        tools = AsyncAgent_Tools(es_index=AsyncElasticsearch(ES_URL))
+        use_agent(tools, create_agents(tools))
+
+    # Index and mapping are set up once here instead of on every request
+    status = await agent_tools.bootstrap()
+    if not status.ready:
+        print(f"❌ Search index not ready: {status.error or status.model_dump()}")
+    yield
+    await agent_tools.aclose()
+    shutdown_process_pool()
+
+
+app = FastAPI(lifespan=lifespan)
+admission = AdmissionController(AdmissionConfig.from_env())
+
+
+def get_client_id(request: Request) -> str:
+    # Clients behind a shared proxy can identify themselves explicitly
+    client_id = request.headers.get("x-client-id")
+    if client_id:
+        return client_id
+    return request.client.host if request.client else "unknown"
+
+
+def rejection_response(e: AdmissionRejected) -> JSONResponse:
+    metrics.ADMISSION_REJECTED.inc(reason=e.reason)
+    return JSONResponse(
+        status_code=e.status_code,
+        content={"error": e.reason},
+        headers={"Retry-After": str(e.retry_after)},
+    )
 
 
 class SearchResultArticleHandler(JSONParserHandler):
@@ -70,7 +141,6 @@ async def agent_stream(messages):
     """
 
     try:
-        agent = create_agents()
         agent_callback = NamedCallback(agent)
 
 
@@ -81,18 +151,37 @@ async def agent_stream(messages):
 
         latest_query = messages[-1]["content"] if messages else ""
         context = " ".join([m["content"] for m in messages[:-1]])
+
+        match = answer_cache.lookup(latest_query, messages[:-1])
+        if match is None:
+            metrics.CACHE_REQUESTS.inc(result="miss")
+        else:
+            metrics.CACHE_REQUESTS.inc(result="hit" if match.exact else "near_hit")
+            if not match.exact:
+                print(f"cache: '{latest_query}' served by '{match.entry.query}' (score {match.score:.2f})")
+            # Already complete, so stream it back without pacing
+            yield {
+                "type": "token",
+                "content": match.entry.answer,
+                "latest_query": latest_query,
+                "cached": True,
+                "cache_match": {"query": match.entry.query, "score": match.score, "exact": match.exact},
+            }
+            return
+
         agent_state = {"user_query": latest_query, "conversation_history": messages}
         user_input = f"""
             Answer the user's query based on the following conversation history:
             Context: {context}
             Current query: {latest_query}
         """
-        result = await agent.run(
-            user_input, event_stream_handler=agent_callback
-        ) 
-        
+        with agent_span(agent), metrics.timed(metrics.AGENT_RUN_SECONDS, agent=agent.name):
+            result = await agent.run(
+                user_input, event_stream_handler=agent_callback
+            )
+        metrics.record_usage(agent.name, result.usage())
 
-        log_entry = log_run(agent, result)
+        log_entry = log_run(agent, result, agent_callback.tool_timings)
         save_log(log_entry)
         
         # Assuming result.output is a SearchResultSummary object
@@ -102,11 +191,12 @@ async def agent_stream(messages):
         # Keep the if logic by checking attributes on the final object
         # Process text attribute if it exists
         if hasattr(summary, "text") and summary.text:
-            yield {"type": "token", "content": summary.text, "latest_query": latest_query}
+            yield {"type": "token", "content": summary.text, "latest_query": latest_query, "cached": False}
 
         # Process final_result tool (full output now)
         # Apply format_article on the structured object
         formatted_article = summary.format_article()
+        answer_cache.put(latest_query, messages[:-1], formatted_article)
 
         # Assume formatted_article is the fully formatted string
         chunk_size = 10  # number of characters per chunk, adjust as needed
@@ -118,7 +208,8 @@ async def agent_stream(messages):
             yield {
                 "type": "token",
                 "content": formatted_article[start:end],
-                "latest_query": latest_query
+                "latest_query": latest_query,
+                "cached": False
             }
             start = end
             end = min(end + chunk_size, length)
@@ -127,6 +218,10 @@ async def agent_stream(messages):
 
     
     except Exception as e:
+        metrics.ERRORS.inc(stage="chat")
+        chat_span = current_span()
+        if chat_span is not None:
+            chat_span.record_exception(e)
         yield {"type": "error", "message": str(e)}
 
     # try:
@@ -152,17 +247,154 @@ async def agent_stream(messages):
 
 @app.post("/chat")
 async def chat_endpoint(request: Request):
+    started = time.perf_counter()
     try:
         payload = await request.json()
         messages = payload.get("messages", [])
+    except Exception as e:
+        # Return a simple JSON error if parsing fails
+        return {"error": str(e)}
 
-        async def event_generator():
-            async for event in agent_stream(messages):
-                # Convert event to JSON string + newline
-                yield json.dumps(event) + "\n"
+    # The span covers admission and the whole stream, it ends with the last event
+    chat_span = tracer.start_span("POST /chat", kind="server", attributes={"http.route": "/chat", "chat.messages": len(messages)})
+    trace_headers = {"X-Trace-ID": chat_span.trace_id}
+
+    # Admit before streaming starts so rejections are real HTTP errors
+    try:
+        ticket = await admission.acquire(get_client_id(request))
+    except AdmissionRejected as e:
+        chat_span.set_attribute("admission.rejected", e.reason)
+        chat_span.set_status("ERROR", e.reason)
+        tracer.end_span(chat_span)
+        response = rejection_response(e)
+        response.headers.update(trace_headers)
+        return response
+
+    finished = False
+
+    def finish():
+        # Called when the stream ends and from the background task, which also
+        # runs when the client leaves before the body is iterated; counts once
+        nonlocal finished
+        if finished:
+            return
+        finished = True
+        admission.release(ticket)
+        metrics.CHAT_SECONDS.observe(time.perf_counter() - started)
+        tracer.end_span(chat_span)
 
-        return StreamingResponse(event_generator(), media_type="text/plain")
+    try:
+        metrics.ADMISSION_WAIT_SECONDS.observe(ticket.wait_time)
+        chat_span.set_attribute("admission.wait_seconds", ticket.wait_time)
 
+        async def event_generator():
+            # The slot is held until the whole answer has been streamed
+            first_event = True
+            try:
+                with tracer.use_span(chat_span, end_on_exit=False):
+                    async for event in agent_stream(messages):
+                        if first_event:
+                            metrics.CHAT_TTFT_SECONDS.observe(time.perf_counter() - started)
+                            chat_span.add_event("first_event")
+                            first_event = False
+                        # Convert event to JSON string + newline
+                        yield json.dumps(event) + "\n"
+            finally:
+                finish()
+
+        return StreamingResponse(
+            event_generator(), media_type="text/plain", headers=trace_headers,
+            background=BackgroundTask(finish),
+        )
+    except BaseException:
+        finish()
+        raise
+
+
+@app.post("/chat/batch")
+async def chat_batch_endpoint(request: Request):
+    try:
+        payload = await request.json()
+        questions = payload.get("questions", [])
+        # more runs at once would only be rejected by the per-client limit
+        max_concurrency = max(1, min(int(payload.get("max_concurrency", 4)), admission.config.max_per_client))
     except Exception as e:
-        # Return a simple JSON error if parsing fails
         return {"error": str(e)}
+
+    batch_span = tracer.start_span("POST /chat/batch", kind="server", attributes={"http.route": "/chat/batch", "batch.questions": len(questions)})
+
+    client_id = get_client_id(request)
+
+    async def event_generator():
+        # runs of the batch are child spans of the request; each run is admitted like a chat
+        with tracer.use_span(batch_span):
+            batch = run_agent_batch(questions, max_concurrency=max_concurrency, batch_agent=agent, admission=admission, client_id=client_id)
+            async for item in batch:
+                if "error" in item:
+                    event = {"type": "error", "index": item["index"], "question": item["question"], "message": item["error"]}
+                else:
+                    summary: SearchResultSummary = item["result"].output
+                    event = {
+                        "type": "result",
+                        "index": item["index"],
+                        "question": item["question"],
+                        "content": summary.format_article(),
+                        "run_id": item["run_id"],
+                    }
+                yield json.dumps(event) + "\n"
+
+    # ends the span when the client leaves before the body is iterated; a no-op after the stream ended it
+    return StreamingResponse(
+        event_generator(), media_type="text/plain", headers={"X-Trace-ID": batch_span.trace_id},
+        background=BackgroundTask(tracer.end_span, batch_span),
+    )
+
+
+@app.post("/ingest", status_code=202)
+async def ingest_endpoint(ingest_request: IngestRequest):
+    job = ingest_jobs.submit(ingest_request)
+    return {"job_id": job.job_id, "status": job.status}
+
+
+@app.get("/ingest")
+async def ingest_list():
+    return [job.progress() for job in ingest_jobs.jobs.values()]
+
+
+@app.get("/ingest/{job_id}")
+async def ingest_status(job_id: str):
+    job = ingest_jobs.get(job_id)
+    if job is None:
+        return JSONResponse(status_code=404, content={"error": f"unknown job {job_id}"})
+    return job.progress()
+
+
+@app.get("/ready")
+async def ready_endpoint():
+    status = agent_tools.status
+    if not status.ready:
+        # retry so the backend recovers once Elasticsearch comes up
+        status = await agent_tools.bootstrap()
+    return JSONResponse(status_code=200 if status.ready else 503, content=status.model_dump())
+
+
+@app.get("/metrics")
+async def metrics_endpoint():
+    metrics.ADMISSION_QUEUE_DEPTH.set(admission.queue_depth)
+    metrics.ADMISSION_ACTIVE.set(admission.active)
+    return PlainTextResponse(metrics.render(), media_type="text/plain; version=0.0.4")
+
+
+@app.delete("/cache")
+async def clear_cache(topic: str | None = None):
+    # Without a topic the whole answer cache is dropped
+    if topic:
+        return {"invalidated": answer_cache.invalidate(topic)}
+    invalidated = len(answer_cache)
+    answer_cache.clear()
+    return {"invalidated": invalidated}
+
+
+@app.get("/admission")
+async def admission_stats():
+    return admission.stats()
@@ -0,0 +1,218 @@
+import hashlib
+import re
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+from pydantic import BaseModel
+
+# Words that say nothing about the topic of a question. They are ignored
+# when deciding which cached answers a newly indexed paper makes stale.
+STOPWORDS = {
+    "a", "about", "an", "and", "any", "are", "can", "do", "does", "for", "from",
+    "give", "how", "i", "in", "is", "latest", "me", "new", "of", "on", "or",
+    "paper", "papers", "recent", "research", "show", "summarize", "summary",
+    "tell", "the", "to", "what", "whats", "with",
+}
+
+# Words found in the titles of most ML papers. Sharing only these with a
+# new title does not make an answer stale: "Efficient Language Models for
+# Code" says nothing new about "LoRA for language models". A question made
+# of nothing but these words is matched on them.
+GENERIC_TERMS = {
+    "analysis", "approach", "based", "data", "deep", "efficient", "framework",
+    "improving", "language", "languages", "large", "learning", "machine",
+    "method", "methods", "model", "models", "network", "networks", "neural",
+    "study", "survey", "task", "tasks", "toward", "towards", "training",
+    "using", "via",
+}
+
+
+def normalize_query(text: str) -> str:
+    """
+    Lowercase, drop punctuation and collapse whitespace, so that
+    "Latest research in LoRA?" and "latest research in lora" match.
+    """
+    text = text.lower().replace("'", "")
+    text = re.sub(r"[^\w\s-]", " ", text)
+    return " ".join(text.split())
+
+
+def topic_terms(text: str) -> set[str]:
+    return {t for t in normalize_query(text).split() if t not in STOPWORDS}
+
+
+def match_tokens(text: str) -> set[str]:
+    """Tokens compared for near-duplicate matching: topic terms with plurals folded."""
+    tokens = topic_terms(text) or set(normalize_query(text).split())
+    return {t[:-1] if len(t) > 3 and t.endswith("s") else t for t in tokens}
+
+
+class MinHasher:
+    """
+    MinHash signatures over token sets. The fraction of equal signature
+    positions estimates the Jaccard similarity of the two sets.
+    """
+
+    PRIME = (1 << 61) - 1
+
+    def __init__(self, num_perm: int = 64, seed: int = 1):
+        rng = np.random.default_rng(seed)
+        self.a = rng.integers(1, 1 << 32, size=num_perm, dtype=np.uint64)
+        self.b = rng.integers(0, 1 << 32, size=num_perm, dtype=np.uint64)
+
+    def signature(self, tokens: set[str]) -> np.ndarray:
+        hashes = np.array(
+            [int.from_bytes(hashlib.blake2b(t.encode(), digest_size=4).digest(), "little") for t in sorted(tokens)]
+            or [0],
+            dtype=np.uint64,
+        )
+        # a, b and hashes are < 2**32 so a * h + b cannot overflow uint64
+        permuted = (np.outer(hashes, self.a) + self.b) % np.uint64(self.PRIME)
+        return permuted.min(axis=0)
+
+
+def conversation_fingerprint(messages: list[dict]) -> str:
+    """Hash of the conversation that precedes the latest query."""
+    digest = hashlib.sha256()
+    for m in messages:
+        digest.update(m.get("role", "").encode())
+        digest.update(b"\0")
+        digest.update(normalize_query(m.get("content", "")).encode())
+        digest.update(b"\0")
+    return digest.hexdigest()[:16]
+
+
+class CachedAnswer(BaseModel):
+    query: str
+    fingerprint: str
+    answer: str
+    created_at: float
+    terms: set[str]
+
+
+class CacheMatch(BaseModel):
+    entry: CachedAnswer
+    score: float  # estimated Jaccard similarity of the two queries, 1.0 for exact hits
+    exact: bool
+
+
+class AnswerCache:
+    """
+    Final-answer cache keyed by normalized query and conversation fingerprint.
+
+    Entries expire after `ttl` seconds and at most `max_entries` are kept
+    (least recently used first out). invalidate() drops every answer that
+    shares a topic term, other than GENERIC_TERMS, with newly indexed text.
+
+    lookup() also serves paraphrases: queries in the same conversation whose
+    MinHash similarity is at least `similarity_threshold`.
+    """
+
+    def __init__(self, ttl: float = 3600, max_entries: int = 1000, similarity_threshold: float = 0.8):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self.similarity_threshold = similarity_threshold
+        self._entries: OrderedDict[tuple[str, str], CachedAnswer] = OrderedDict()
+        self._lock = threading.Lock()
+
+        self._hasher = MinHasher()
+        self._signatures: dict[tuple[str, str], np.ndarray] = {}
+        # stacked signatures, rebuilt lazily after the cache changes
+        self._matrix = None
+        self._matrix_keys = []
+
+    @staticmethod
+    def key(query: str, history: list[dict]) -> tuple[str, str]:
+        return normalize_query(query), conversation_fingerprint(history)
+
+    def get(self, query: str, history: list[dict]) -> CachedAnswer | None:
+        return self._get(self.key(query, history))
+
+    def _get(self, key: tuple[str, str]) -> CachedAnswer | None:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            if time.time() - entry.created_at > self.ttl:
+                self._remove(key)
+                return None
+            self._entries.move_to_end(key)
+            return entry
+
+    def lookup(self, query: str, history: list[dict]) -> CacheMatch | None:
+        """Exact hit if there is one, otherwise the most similar cached query above the threshold."""
+        entry = self.get(query, history)
+        if entry is not None:
+            return CacheMatch(entry=entry, score=1.0, exact=True)
+
+        fingerprint = conversation_fingerprint(history)
+        signature = self._hasher.signature(match_tokens(query))
+        with self._lock:
+            if self._matrix is None:
+                self._matrix_keys = list(self._signatures)
+                self._matrix = np.vstack(list(self._signatures.values())) if self._signatures else None
+            if self._matrix is None:
+                return None
+
+            scores = (self._matrix == signature).mean(axis=1)
+            same_conversation = np.array([k[1] == fingerprint for k in self._matrix_keys])
+            scores = np.where(same_conversation, scores, 0.0)
+            best = int(scores.argmax())
+            score = float(scores[best])
+            key = self._matrix_keys[best]
+
+        if score < self.similarity_threshold:
+            return None
+        entry = self._get(key)
+        if entry is None:
+            return None
+        return CacheMatch(entry=entry, score=score, exact=False)
+
+    def put(self, query: str, history: list[dict], answer: str) -> CachedAnswer:
+        normalized, fingerprint = self.key(query, history)
+        entry = CachedAnswer(
+            query=normalized,
+            fingerprint=fingerprint,
+            answer=answer,
+            created_at=time.time(),
+            terms=topic_terms(query),
+        )
+        with self._lock:
+            self._entries[(normalized, fingerprint)] = entry
+            self._entries.move_to_end((normalized, fingerprint))
+            self._signatures[(normalized, fingerprint)] = self._hasher.signature(match_tokens(query))
+            self._matrix = None
+            while len(self._entries) > self.max_entries:
+                self._remove(next(iter(self._entries)))
+        return entry
+
+    def _remove(self, key):
+        # callers hold the lock
+        del self._entries[key]
+        self._signatures.pop(key, None)
+        self._matrix = None
+
+    def invalidate(self, text: str) -> int:
+        """Drop cached answers on the topic of `text`; returns how many were dropped."""
+        terms = topic_terms(text)
+        with self._lock:
+            stale = [k for k, e in self._entries.items() if (e.terms - GENERIC_TERMS or e.terms) & terms]
+            for k in stale:
+                self._remove(k)
+        return len(stale)
+
+    def invalidate_docs(self, doc: list[dict]):
+        """Index listener: newly indexed chunks make answers on their papers' topics stale."""
+        titles = {chunk.get("title", "") for chunk in doc}
+        self.invalidate(" ".join(titles))
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._signatures.clear()
+            self._matrix = None
+
+    def __len__(self):
+        return len(self._entries)
@@ -0,0 +1,149 @@
+import asyncio
+import secrets
+import time
+from typing import Literal
+
+from pydantic import BaseModel, Field, model_validator
+
+from tools import AsyncAgent_Tools
+
+# upper bound on the papers a single job may pull from arXiv
+MAX_INGEST_RESULTS = 200
+
+
+class IngestRequest(BaseModel):
+    query: str | None = None
+    arxiv_ids: list[str] = Field(default_factory=list, max_length=MAX_INGEST_RESULTS)
+    category: str | None = None  # arXiv category, e.g. "cs.CL"
+    max_results: int | None = Field(default=None, ge=1, le=MAX_INGEST_RESULTS)
+
+    @model_validator(mode="after")
+    def check_source(self):
+        sources = [bool(self.query), bool(self.arxiv_ids), bool(self.category)]
+        if sum(sources) != 1:
+            raise ValueError("provide exactly one of query, arxiv_ids or category")
+        return self
+
+
+class IngestJob(BaseModel):
+    job_id: str
+    request: IngestRequest
+    status: Literal["queued", "running", "done", "failed"] = "queued"
+    error: str | None = None
+
+    papers_found: int = 0
+    papers_fetched: int = 0
+    papers_parsed: int = 0
+    papers_failed: int = 0
+    chunks_indexed: int = 0
+
+    created_at: float = Field(default_factory=time.time)
+    started_at: float | None = None
+    finished_at: float | None = None
+
+    def progress(self) -> dict:
+        data = self.model_dump(mode="json")
+
+        elapsed = 0.0
+        if self.started_at is not None:
+            elapsed = (self.finished_at or time.time()) - self.started_at
+        data["elapsed_seconds"] = elapsed
+        data["papers_per_second"] = self.papers_parsed / elapsed if elapsed else 0.0
+        data["chunks_per_second"] = self.chunks_indexed / elapsed if elapsed else 0.0
+
+        return data
+
+
+class IngestJobManager:
+    """
+    Runs ingestion jobs in the background, at most `max_workers` at a time.
+
+    Jobs are kept in memory so their progress can be polled by job ID; only
+    the most recent `max_jobs` are remembered. Each job downloads at most
+    `max_downloads` pdfs at a time.
+    """
+
+    def __init__(self, agent_tools: AsyncAgent_Tools, max_workers: int = 2, max_jobs: int = 100, max_downloads: int = 4):
+        self.agent_tools = agent_tools
+        self.max_jobs = max_jobs
+        self.max_downloads = max_downloads
+        self.jobs: dict[str, IngestJob] = {}
+        self._workers = asyncio.Semaphore(max_workers)
+        self._tasks: set[asyncio.Task] = set()
+
+    def submit(self, request: IngestRequest) -> IngestJob:
+        job = IngestJob(job_id=secrets.token_hex(8), request=request)
+        self.jobs[job.job_id] = job
+        self._forget_old_jobs()
+
+        task = asyncio.create_task(self._run(job))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+        return job
+
+    def get(self, job_id: str) -> IngestJob | None:
+        return self.jobs.get(job_id)
+
+    def _forget_old_jobs(self):
+        finished = [j for j in self.jobs.values() if j.status in ("done", "failed")]
+        for job in finished[:max(0, len(self.jobs) - self.max_jobs)]:
+            del self.jobs[job.job_id]
+
+    async def _run(self, job: IngestJob):
+        async with self._workers:
+            job.status = "running"
+            job.started_at = time.time()
+            try:
+                await self._ingest(job)
+                job.status = "done"
+            except Exception as e:
+                job.status = "failed"
+                job.error = str(e)
+            finally:
+                job.finished_at = time.time()
+
+    async def _ingest(self, job: IngestJob):
+        tools = self.agent_tools
+        request = job.request
+
+        if request.query:
+            search_query = f"all:{request.query}"
+        elif request.category:
+            search_query = f"cat:{request.category}"
+        else:
+            search_query = None
+
+        feed = await tools.fetch_feed(
+            search_query=search_query,
+            id_list=request.arxiv_ids,
+            max_results=request.max_results
+        )
+        job.papers_found = len(feed.entries)
+
+        await tools.ensure_ready()
+
+        downloads = asyncio.Semaphore(self.max_downloads)
+
+        async def ingest_paper(entry):
+            async with downloads:
+                pdf_bytes = await tools.download_pdf(entry)
+            if pdf_bytes is None:
+                job.papers_failed += 1
+                return
+            job.papers_fetched += 1
+
+            doc = await tools.parse_pdf(entry, pdf_bytes)
+            if not doc:
+                job.papers_failed += 1
+                return
+            job.papers_parsed += 1
+
+            job.chunks_indexed += await tools.index_docs(doc)
+
+        # one broken paper must not cancel (or fail) the rest of the job
+        results = await asyncio.gather(*[ingest_paper(entry) for entry in feed.entries], return_exceptions=True)
+        for result in results:
+            if isinstance(result, BaseException):
+                print(f"ingest job {job.job_id}: paper failed: {result!r}")
+                job.papers_failed += 1
@@ -0,0 +1,51 @@
+"""
+Run the ingestion and search benchmarks.
+
+    python -m benchmarks --sizes 10 100 1000 --output bench.json
+    python -m benchmarks --baseline bench.json --threshold 0.2
+
+Exits with status 1 when a benchmark regressed against the baseline.
+"""
+import argparse
+import json
+import sys
+
+from benchmarks.suite import compare, format_comparison, format_results, run_suite
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks")
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100], help="corpus sizes in papers")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--queries", type=int, default=200, help="search queries per corpus size")
+    parser.add_argument("--words-per-paper", type=int, default=3000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--es-url", help="index into and search a local Elasticsearch instead of the embedded index")
+    parser.add_argument("--output", help="save the results as JSON, e.g. to use as the next baseline")
+    parser.add_argument("--baseline", help="JSON results of an earlier run to compare against")
+    parser.add_argument("--threshold", type=float, default=0.2, help="allowed p50 latency growth (0.2 = 20%%)")
+    parser.add_argument("--memory-threshold", type=float, default=0.2, help="allowed peak memory growth")
+    parser.add_argument("--noise-floor", type=float, default=0.001,
+                        help="latency growth in seconds below which no regression is flagged, whatever the percentage")
+    args = parser.parse_args()
+
+    report = run_suite(args.sizes, args.repeats, args.queries, args.words_per_paper, args.seed, args.es_url)
+    print(format_results(report))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        if baseline.get("config") != report["config"]:
+            print("\nwarning: the baseline was run with a different config", baseline.get("config"))
+        rows = compare(report, baseline, args.threshold, args.memory_threshold, args.noise_floor)
+        print("\n" + format_comparison(rows))
+        if any(row["regression"] for row in rows):
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
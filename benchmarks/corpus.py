@@ -0,0 +1,178 @@
+"""
+Repeatable synthetic arXiv corpus for the benchmarks.
+
+Papers look like arXiv records: an id matching the publication month,
+title, authors, date, abstract and a body of paragraphs. Words are drawn
+from a seeded vocabulary with a Zipfian frequency distribution (word of
+rank r has frequency ~ 1/r^s, shorter words ranked first), like natural
+text, so posting list lengths and BM25 statistics behave like a real
+index. The same seed always gives the same papers, feeds and queries.
+
+Papers are generated lazily (iter_papers), so corpora of millions of
+chunks can be streamed into an index without holding them in memory.
+"""
+import itertools
+import random
+import textwrap
+from datetime import date, timedelta
+
+from feedparser import FeedParserDict
+
+from tools import sliding_window
+
+SYLLABLES = ["ka", "lo", "ra", "mi", "te", "su", "no", "vi", "de", "xa", "pe", "qu", "zo", "ne", "bi", "tor",
+             "an", "el", "is", "on", "ur", "tra", "gen", "mod", "ent", "ics", "lan", "net"]
+FIRST_DATE = date(2007, 4, 1)
+LAST_DATE = date(2025, 12, 31)
+FUNCTION_WORDS = 100  # the most frequent ranks, left out of titles and queries
+PDF_LINES_PER_PAGE = 60
+
+
+class ZipfVocabulary:
+
+    def __init__(self, size: int = 50000, exponent: float = 1.07, seed: int = 0):
+        rng = random.Random(seed)
+        words = set()
+        while len(words) < size:
+            words.add("".join(rng.choice(SYLLABLES) for _ in range(rng.choice((1, 2, 2, 3, 3, 3, 4)))))
+        # frequent words are short, as in natural language
+        self.words = sorted(words, key=lambda w: (len(w), w))
+        weights = [1 / rank ** exponent for rank in range(1, size + 1)]
+        self.cum_weights = list(itertools.accumulate(weights))
+        self.content = self.words[FUNCTION_WORDS:]
+        self.content_cum_weights = list(itertools.accumulate(weights[FUNCTION_WORDS:]))
+
+    def sample(self, rng: random.Random, k: int) -> list[str]:
+        return rng.choices(self.words, cum_weights=self.cum_weights, k=k)
+
+    def content_words(self, rng: random.Random, k: int) -> list[str]:
+        """Words past the most frequent ones, the kind titles and queries are made of."""
+        return rng.choices(self.content, cum_weights=self.content_cum_weights, k=k)
+
+
+_vocabularies = {}
+
+
+def get_vocabulary(seed: int = 0) -> ZipfVocabulary:
+    if seed not in _vocabularies:
+        _vocabularies[seed] = ZipfVocabulary(seed=seed)
+    return _vocabularies[seed]
+
+
+def _sentence(vocabulary: ZipfVocabulary, rng: random.Random, n: int) -> str:
+    return " ".join(vocabulary.sample(rng, n)).capitalize() + "."
+
+
+def _name(rng: random.Random) -> str:
+    def word():
+        return "".join(rng.choice(SYLLABLES) for _ in range(rng.randint(2, 3))).capitalize()
+    return f"{word()} {word()}"
+
+
+def make_paper(index: int, vocabulary: ZipfVocabulary, rng: random.Random, words: int) -> dict:
+    published = FIRST_DATE + timedelta(days=rng.randrange((LAST_DATE - FIRST_DATE).days))
+    title = " ".join(vocabulary.content_words(rng, rng.randint(4, 12))).capitalize()
+    abstract = " ".join(_sentence(vocabulary, rng, rng.randint(12, 30)) for _ in range(rng.randint(4, 8)))
+
+    paragraphs = []
+    length = 0
+    # paper lengths vary around `words`
+    target = max(50, int(rng.lognormvariate(0, 0.3) * words))
+    while length < target:
+        sentences = [_sentence(vocabulary, rng, rng.randint(8, 30)) for _ in range(rng.randint(3, 8))]
+        paragraphs.append(" ".join(sentences))
+        length += sum(len(s.split()) for s in sentences)
+
+    return {
+        "id": f"{published:%y%m}.{index:05d}v{rng.choice((1, 1, 1, 2, 3))}",
+        "title": title,
+        "authors": [_name(rng) for _ in range(rng.randint(1, 6))],
+        "published": f"{published.isoformat()}T{rng.randrange(24):02d}:{rng.randrange(60):02d}:00Z",
+        "summary": abstract,
+        "text": title + "\n\n" + abstract + "\n\n" + "\n\n".join(paragraphs),
+    }
+
+
+def iter_papers(papers: int | None = None, words_per_paper: int = 3000, seed: int = 0):
+    """Yield `papers` papers (endless when None)."""
+    vocabulary = get_vocabulary(seed)
+    rng = random.Random(seed)
+    for i in itertools.count() if papers is None else range(papers):
+        yield make_paper(i, vocabulary, rng, words_per_paper)
+
+
+def make_corpus(papers: int, words_per_paper: int = 3000, seed: int = 0) -> list[dict]:
+    return list(iter_papers(papers, words_per_paper, seed))
+
+
+def paper_chunks(paper: dict, size: int = 5000, step: int = 1000) -> list[dict]:
+    """The index documents of a paper: sliding_window chunks with the fields extract_data stores."""
+    return [
+        {
+            "id": paper["id"],
+            "title": paper["title"],
+            "authors": paper["authors"],
+            "published": paper["published"],
+            "summary": paper["summary"],
+            "content": chunk["content"],
+        }
+        for chunk in sliding_window(paper["text"], size, step)
+    ]
+
+
+def iter_chunks(papers, size: int = 5000, step: int = 1000):
+    for paper in papers:
+        yield from paper_chunks(paper, size, step)
+
+
+def make_feed(papers: list[dict]) -> FeedParserDict:
+    """A parsed arXiv API feed listing `papers`, as Agent_Tools.extract_data expects it."""
+    entries = []
+    for paper in papers:
+        entries.append(FeedParserDict(
+            id=f"http://arxiv.org/abs/{paper['id']}",
+            title=paper["title"],
+            authors=[FeedParserDict(name=name) for name in paper["authors"]],
+            published=paper["published"],
+            summary=paper["summary"],
+            links=[
+                FeedParserDict(href=f"http://arxiv.org/abs/{paper['id']}", rel="alternate"),
+                FeedParserDict(href=f"http://arxiv.org/pdf/{paper['id']}", rel="related", type="application/pdf"),
+            ],
+        ))
+    return FeedParserDict(entries=entries)
+
+
+def make_pdf(text: str) -> bytes:
+    """A minimal pdf of `text` (Helvetica, 60 wrapped lines per page) that pdfminer can extract."""
+    lines = [line for paragraph in text.split("\n") for line in textwrap.wrap(paragraph, 90) or [""]]
+    pages = [lines[i:i + PDF_LINES_PER_PAGE] for i in range(0, len(lines), PDF_LINES_PER_PAGE)] or [[]]
+
+    # objects 1-3: catalog, page tree and font, then a page and its content stream per page
+    objects = [b"<< /Type /Catalog /Pages 2 0 R >>", None, b"<< /Type /Font /Subtype /Type1 /BaseFont /Helvetica >>"]
+    kids = []
+    for page in pages:
+        escaped = (line.replace("\\", "\\\\").replace("(", "\\(").replace(")", "\\)") for line in page)
+        stream = ("BT /F1 10 Tf 12 TL 40 760 Td " + " ".join(f"({line}) Tj T*" for line in escaped) + " ET").encode("latin-1", "replace")
+        kids.append(f"{len(objects) + 1} 0 R")
+        objects.append(f"<< /Type /Page /Parent 2 0 R /MediaBox [0 0 612 792] /Resources << /Font << /F1 3 0 R >> >> /Contents {len(objects) + 2} 0 R >>".encode())
+        objects.append(b"<< /Length %d >>\nstream\n" % len(stream) + stream + b"\nendstream")
+    objects[1] = f"<< /Type /Pages /Kids [{' '.join(kids)}] /Count {len(kids)} >>".encode()
+
+    pdf = bytearray(b"%PDF-1.4\n")
+    offsets = []
+    for number, body in enumerate(objects, 1):
+        offsets.append(len(pdf))
+        pdf += b"%d 0 obj\n" % number + body + b"\nendobj\n"
+    xref = len(pdf)
+    pdf += b"xref\n0 %d\n0000000000 65535 f \n" % (len(objects) + 1)
+    pdf += b"".join(b"%010d 00000 n \n" % offset for offset in offsets)
+    pdf += b"trailer\n<< /Size %d /Root 1 0 R >>\nstartxref\n%d\n%%%%EOF\n" % (len(objects) + 1, xref)
+    return bytes(pdf)
+
+
+def make_queries(count: int, seed: int = 0, words: tuple[int, int] = (2, 4)) -> list[str]:
+    """Queries of a few content words, drawn with their corpus frequencies."""
+    vocabulary = get_vocabulary(seed)
+    rng = random.Random(seed + 1)
+    return [" ".join(vocabulary.content_words(rng, rng.randint(*words))) for _ in range(count)]
@@ -0,0 +1,123 @@
+"""
+Generate a synthetic arXiv corpus at index scale and bulk load it.
+
+Papers come from benchmarks/corpus.py and are chunked with the real
+sliding_window. The chunks are bulk loaded through AsyncAgent_Tools.index_docs
+(same mapping and bulk path as ingestion) into a local Elasticsearch or the
+embedded index, and/or written to a .jsonl file. With --queries, search
+latency is measured on the loaded index afterwards.
+
+    python -m benchmarks.generate_corpus --chunks 1000000 --es-url http://localhost:9200 --queries 500
+    python -m benchmarks.generate_corpus --chunks 100000 --queries 200   # embedded index, in this process
+
+A million 5000-character chunks are ~5 GB of text. Use Elasticsearch
+for that, or smaller --chunk-size/--words-per-paper with the embedded index.
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import time
+from types import SimpleNamespace
+
+from elasticsearch import NotFoundError
+from tqdm.auto import tqdm
+
+from benchmarks.corpus import iter_chunks, iter_papers, make_queries
+from embedded_index import EmbeddedElasticsearch
+from monitoring.log_query import Reservoir
+from tools import AsyncAgent_Tools, FetchQuery
+
+SCALE_INDEX = "arxiv_chunks_scale"
+
+
+def batched(iterable, size: int):
+    iterator = iter(iterable)
+    while batch := list(itertools.islice(iterator, size)):
+        yield batch
+
+
+async def bulk_load(tools: AsyncAgent_Tools, chunks, total: int | None = None, batch_size: int = 1000, output=None) -> dict:
+    """Index `chunks` in batches (and append them to the `output` file if given)."""
+    indexed = 0
+    started = time.perf_counter()
+    with tqdm(total=total, unit="chunk") as progress:
+        for batch in batched(chunks, batch_size):
+            if output is not None:
+                output.writelines(json.dumps(doc, ensure_ascii=False) + "\n" for doc in batch)
+            if tools is not None:
+                indexed += await tools.index_docs(batch)
+            progress.update(len(batch))
+    seconds = time.perf_counter() - started
+    return {"indexed": indexed, "seconds": seconds, "chunks_per_second": indexed / seconds if seconds else None}
+
+
+async def search_latency(tools: AsyncAgent_Tools, queries: list[str]) -> dict:
+    latency = Reservoir()
+    hits = 0
+    for query in queries:
+        started = time.perf_counter()
+        hits += bool(await tools.search(FetchQuery(query=query, paper_name="")))
+        latency.add(time.perf_counter() - started)
+    return {"queries": len(queries), "with_hits": hits, **latency.percentiles((50, 90, 99))}
+
+
+async def open_index(es_url: str | None, index_name: str, max_results: int = 3) -> AsyncAgent_Tools:
+    if es_url:
+        from elasticsearch import AsyncElasticsearch
+        es_index = AsyncElasticsearch(es_url, request_timeout=120)
+    else:
+        es_index = EmbeddedElasticsearch()
+    tools = AsyncAgent_Tools(es_index=es_index, max_results=max_results, http_client=SimpleNamespace())
+    tools.index_name = index_name
+    try:
+        await tools.index.indices.delete(index=index_name)
+    except NotFoundError:
+        pass
+    await tools.bootstrap()
+    return tools
+
+
+async def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.generate_corpus")
+    size = parser.add_mutually_exclusive_group(required=True)
+    size.add_argument("--papers", type=int)
+    size.add_argument("--chunks", type=int, help="stop once this many chunks were generated")
+    parser.add_argument("--words-per-paper", type=int, default=3000)
+    parser.add_argument("--chunk-size", type=int, default=5000)
+    parser.add_argument("--chunk-step", type=int, default=1000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--es-url", help="load into this Elasticsearch instead of the embedded index")
+    parser.add_argument("--index", default=SCALE_INDEX, help="index to (re)create")
+    parser.add_argument("--batch-size", type=int, default=1000)
+    parser.add_argument("--output", help="also write the chunks to this .jsonl file")
+    parser.add_argument("--no-index", action="store_true", help="only write --output")
+    parser.add_argument("--queries", type=int, default=0, help="search latency queries to run after loading")
+    parser.add_argument("--max-results", type=int, default=3)
+    args = parser.parse_args()
+
+    chunks = iter_chunks(iter_papers(args.papers, args.words_per_paper, args.seed), args.chunk_size, args.chunk_step)
+    if args.chunks:
+        chunks = itertools.islice(chunks, args.chunks)
+
+    tools = None if args.no_index else await open_index(args.es_url, args.index, args.max_results)
+    output = open(args.output, "w") if args.output else None
+    try:
+        report = {"load": await bulk_load(tools, chunks, args.chunks, args.batch_size, output)}
+        if tools is not None:
+            if hasattr(tools.index.indices, "refresh"):
+                await tools.index.indices.refresh(index=args.index)
+            report["count"] = (await tools.index.count(index=args.index))["count"]
+            if args.queries:
+                report["search"] = await search_latency(tools, make_queries(args.queries, args.seed))
+    finally:
+        if output is not None:
+            output.close()
+        if tools is not None:
+            await tools.index.close()
+
+    print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,260 @@
+"""
+Load generator for the /chat endpoint.
+
+Sends questions from evals/questions_dataset.csv to a running backend
+(--url) or to one it starts itself with stub LLMs and the embedded index
+(benchmarks/stub_agent.create_load_test_app), reads every NDJSON stream to
+the end and reports time to first event, total latency percentiles,
+throughput, errors and the admission queue depth over time (polled from
+/admission).
+
+Closed loop, 16 users sending back to back for 60 seconds:
+
+    python -m benchmarks.load_chat --concurrency 16 --duration 60
+
+Open loop, Poisson arrivals at 5 requests/s:
+
+    python -m benchmarks.load_chat --rate 5 --duration 60
+
+Each virtual user sends its own x-client-id, so the per-client admission
+limit only applies when --clients is lower than the number of users.
+"""
+import argparse
+import asyncio
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from collections import Counter
+from pathlib import Path
+
+import httpx
+
+from evals.retrieval_benchmark import load_questions
+from monitoring.log_query import Reservoir
+
+ROOT = Path(__file__).parents[1]
+
+
+async def chat_request(client: httpx.AsyncClient, url: str, question: str, client_id: str, started_at: float) -> dict:
+    result = {"question": question, "client_id": client_id, "start": time.perf_counter() - started_at,
+              "status": None, "ttfe": None, "seconds": None, "events": 0, "cached": False, "error": None}
+    started = time.perf_counter()
+    payload = {"messages": [{"role": "user", "content": question, "latest_query": question}]}
+    try:
+        async with client.stream("POST", f"{url}/chat", json=payload, headers={"x-client-id": client_id}) as response:
+            result["status"] = response.status_code
+            if response.status_code != 200:
+                body = json.loads(await response.aread() or b"{}")
+                result["error"] = f"http_{response.status_code}:{body.get('error', '')}"
+            else:
+                async for line in response.aiter_lines():
+                    if not line.strip():
+                        continue
+                    if result["ttfe"] is None:
+                        result["ttfe"] = time.perf_counter() - started
+                    event = json.loads(line)
+                    result["events"] += 1
+                    result["cached"] = result["cached"] or bool(event.get("cached"))
+                    if event.get("type") == "error":
+                        result["error"] = "stream_error"
+                if result["events"] == 0 and result["error"] is None:
+                    result["error"] = "empty_stream"
+    except Exception as e:
+        result["error"] = type(e).__name__
+    result["seconds"] = time.perf_counter() - started
+    return result
+
+
+async def poll_admission(client: httpx.AsyncClient, url: str, started_at: float, samples: list, interval: float):
+    while True:
+        try:
+            stats = (await client.get(f"{url}/admission")).json()
+            samples.append({"t": time.perf_counter() - started_at, "active": stats["active"], "queue_depth": stats["queue_depth"]})
+        except (httpx.HTTPError, ValueError, KeyError):
+            pass
+        await asyncio.sleep(interval)
+
+
+async def run_load(
+    url: str,
+    questions: list[str],
+    concurrency: int | None = 8,
+    rate: float | None = None,
+    duration: float = 30.0,
+    max_requests: int | None = None,
+    clients: int | None = None,
+    timeout: float = 300.0,
+    poll_interval: float = 0.5,
+    seed: int = 0,
+) -> dict:
+    """
+    Closed loop with `concurrency` users when `rate` is None, otherwise
+    open loop with Poisson arrivals at `rate` requests per second. New
+    requests stop after `duration` seconds or `max_requests`; requests in
+    flight are always awaited.
+    """
+    rng = random.Random(seed)
+    results = []
+    samples = []
+    sent = 0
+    started_at = time.perf_counter()
+    deadline = started_at + duration
+
+    def next_question() -> str | None:
+        nonlocal sent
+        if time.perf_counter() >= deadline or (max_requests is not None and sent >= max_requests):
+            return None
+        sent += 1
+        return rng.choice(questions)
+
+    def client_id(n: int) -> str:
+        return f"load-{n % clients if clients else n}"
+
+    limits = httpx.Limits(max_connections=None, max_keepalive_connections=100)
+    async with httpx.AsyncClient(timeout=timeout, limits=limits) as client:
+        poller = asyncio.create_task(poll_admission(client, url, started_at, samples, poll_interval))
+
+        async def user(user_id: int):
+            # a closed loop user keeps its client id, an open loop request has its own
+            while (question := next_question()) is not None:
+                results.append(await chat_request(client, url, question, client_id(user_id), started_at))
+
+        try:
+            if rate is None:
+                await asyncio.gather(*[user(i) for i in range(concurrency)])
+            else:
+                tasks = []
+                while (question := next_question()) is not None:
+                    tasks.append(asyncio.create_task(chat_request(client, url, question, client_id(sent), started_at)))
+                    await asyncio.sleep(rng.expovariate(rate))
+                results.extend(await asyncio.gather(*tasks))
+        finally:
+            poller.cancel()
+
+    return summarize(results, samples, time.perf_counter() - started_at, concurrency if rate is None else None, rate)
+
+
+def summarize(results: list[dict], samples: list[dict], wall_seconds: float, concurrency=None, rate=None) -> dict:
+    ok = [r for r in results if r["error"] is None]
+    ttfe, latency = Reservoir(), Reservoir()
+    for r in ok:
+        ttfe.add(r["ttfe"])
+        latency.add(r["seconds"])
+
+    return {
+        "mode": "open" if rate is not None else "closed",
+        "concurrency": concurrency,
+        "rate": rate,
+        "wall_seconds": wall_seconds,
+        "requests": len(results),
+        "ok": len(ok),
+        "cached": sum(r["cached"] for r in ok),
+        "errors": dict(Counter(r["error"] for r in results if r["error"] is not None)),
+        "error_rate": (len(results) - len(ok)) / len(results) if results else 0.0,
+        "throughput_rps": len(ok) / wall_seconds if wall_seconds else 0.0,
+        "ttfe": ttfe.percentiles(),
+        "latency": latency.percentiles(),
+        "queue": {
+            "max_queue_depth": max((s["queue_depth"] for s in samples), default=0),
+            "max_active": max((s["active"] for s in samples), default=0),
+            "samples": samples,
+        },
+        "results": results,
+    }
+
+
+def format_report(report: dict) -> str:
+    def row(name, p):
+        return f"{name:<8} " + "  ".join(f"{q} {v:7.2f}s" if v is not None else f"{q}       -" for q, v in p.items())
+
+    load = f"{report['concurrency']} users" if report["mode"] == "closed" else f"{report['rate']}/s arrivals"
+    lines = [
+        f"{report['requests']} requests ({load}) in {report['wall_seconds']:.1f}s: "
+        f"{report['ok']} ok, {report['cached']} cached, error rate {report['error_rate'] * 100:.1f}%",
+        f"throughput {report['throughput_rps']:.2f} req/s",
+        row("ttfe", report["ttfe"]),
+        row("latency", report["latency"]),
+    ]
+    if report["errors"]:
+        lines.append("errors: " + ", ".join(f"{k} x{v}" for k, v in report["errors"].items()))
+
+    queue = report["queue"]
+    lines.append(f"queue depth max {queue['max_queue_depth']}, active max {queue['max_active']}")
+    for sample in queue["samples"][::max(1, len(queue["samples"]) // 20)]:
+        lines.append(f"  {sample['t']:7.1f}s  active {sample['active']:3d}  queued {sample['queue_depth']:3d}  {'#' * sample['queue_depth']}")
+    return "\n".join(lines)
+
+
+def start_server(port: int, model_seconds: float, cache: bool, workdir: str) -> subprocess.Popen:
+    """Start the backend with the stub agent; run logs land in `workdir`, not monitoring/logs."""
+    env = {
+        **os.environ,
+        "LOAD_TEST_MODEL_SECONDS": str(model_seconds),
+        "PYTHONPATH": str(ROOT),
+    }
+    if not cache:
+        env["ANSWER_CACHE_TTL"] = "0"
+    return subprocess.Popen(
+        [sys.executable, "-m", "uvicorn", "--factory", "benchmarks.stub_agent:create_load_test_app", "--port", str(port), "--log-level", "warning"],
+        cwd=workdir, env=env, stdout=subprocess.DEVNULL, stderr=subprocess.PIPE,
+    )
+
+
+async def wait_ready(url: str, timeout: float = 60.0):
+    deadline = time.monotonic() + timeout
+    async with httpx.AsyncClient() as client:
+        while time.monotonic() < deadline:
+            try:
+                if (await client.get(f"{url}/ready")).status_code == 200:
+                    return
+            except httpx.HTTPError:
+                pass
+            await asyncio.sleep(0.5)
+    raise TimeoutError(f"{url} not ready after {timeout}s")
+
+
+async def main():
+    parser = argparse.ArgumentParser(prog="python -m benchmarks.load_chat")
+    parser.add_argument("--url", help="backend to load; without it a stub backend is started on --port")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--model-seconds", type=float, default=0.5, help="stub LLM latency per response")
+    parser.add_argument("--cache", action="store_true", help="keep the answer cache on in the stub backend")
+    parser.add_argument("--concurrency", type=int, default=8, help="closed loop users")
+    parser.add_argument("--rate", type=float, help="open loop arrivals per second instead of closed loop users")
+    parser.add_argument("--duration", type=float, default=30.0, help="seconds to keep sending new requests")
+    parser.add_argument("--requests", type=int, help="stop after this many requests")
+    parser.add_argument("--clients", type=int, help="distinct x-client-id values (default: one per user/request)")
+    parser.add_argument("--questions", default=ROOT / "evals" / "questions_dataset.csv")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="save the full report, including every request, as JSON")
+    args = parser.parse_args()
+
+    questions = load_questions(args.questions)
+    with tempfile.TemporaryDirectory() as workdir:
+        server = None
+        url = args.url
+        if url is None:
+            url = f"http://127.0.0.1:{args.port}"
+            server = start_server(args.port, args.model_seconds, args.cache, workdir)
+        try:
+            await wait_ready(url)
+            report = await run_load(
+                url, questions, args.concurrency, args.rate, args.duration, args.requests, args.clients, seed=args.seed
+            )
+        finally:
+            if server is not None:
+                server.terminate()
+                server.wait()
+
+    print(format_report(report))
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,125 @@
+"""
+The orchestrator with stub LLMs and a local index, for load tests.
+
+The orchestrator model searches for the user's query, runs
+search_quality_check on the results and answers with the results as
+references, sleeping for a configurable model latency before every
+response. Search is the real tool against the embedded index, seeded with
+the chunks of the logged runs. Nothing leaves the process, so a load test
+measures the serving path (admission, agent loop, tools, streaming)
+instead of OpenAI.
+
+create_load_test_app() is the uvicorn factory benchmarks/load_chat.py
+starts the backend with:
+
+    uvicorn --factory benchmarks.stub_agent:create_load_test_app
+"""
+import asyncio
+import os
+import random
+import re
+from pathlib import Path
+
+from pydantic_ai.messages import ModelResponse, TextPart, ToolCallPart, ToolReturnPart
+
+from agents import create_agents
+from embedded_index import EmbeddedElasticsearch, EmbeddedIndex
+from monitoring.replay import function_model, load_runs, unique_documents
+from tools import AsyncAgent_Tools
+
+LOG_FOLDER = Path(__file__).parents[1] / "evals" / "latest_evals" / "eval_logs"
+SUMMARY_CHARS = 1000
+
+
+class StubLatency:
+    """Model latency drawn uniformly from [0.5, 1.5] x `seconds`."""
+
+    def __init__(self, seconds: float = 0.5, seed: int | None = None):
+        self.seconds = seconds
+        self.random = random.Random(seed)
+
+    async def wait(self):
+        if self.seconds > 0:
+            await asyncio.sleep(self.seconds * self.random.uniform(0.5, 1.5))
+
+
+def latest_query(messages) -> str:
+    for part in messages[0].parts:
+        if part.part_kind == "user-prompt":
+            match = re.search(r"Current query:(.*)", part.content)
+            return (match.group(1) if match else part.content).strip()
+    return ""
+
+
+def last_search_results(messages) -> list[dict]:
+    for message in reversed(messages):
+        for part in message.parts:
+            if isinstance(part, ToolReturnPart) and part.tool_name == "search" and isinstance(part.content, list):
+                return part.content
+    return []
+
+
+def orchestrator_response(messages) -> ModelResponse:
+    step = sum(isinstance(m, ModelResponse) for m in messages)
+    query = latest_query(messages)
+    results = last_search_results(messages)
+
+    if step == 0:
+        name, args = "search", {"query": query, "paper_name": ""}
+    elif step == 1:
+        search_results = [{"title": r.get("title", ""), "snippet": r.get("summary", "")[:200], "url": f"https://arxiv.org/abs/{r.get('id')}"} for r in results]
+        name, args = "search_quality_check", {"params": {"user_query": query, "search_results": search_results}}
+    else:
+        # about as long as the logged answers (median ~1000 characters), the server paces streaming by length
+        summary = " ".join(r.get("summary", "") for r in results)[:SUMMARY_CHARS] or f"No indexed papers match '{query}'."
+        references = [{"title": r.get("title", ""), "url": f"https://arxiv.org/abs/{r.get('id')}"} for r in results]
+        name, args = "final_result", {"title": query, "summary": summary, "references": references}
+    return ModelResponse(parts=[ToolCallPart(name, args, tool_call_id=f"stub_{step}")])
+
+
+def stub_models(latency: StubLatency) -> dict:
+    async def orchestrator(messages, info):
+        await latency.wait()
+        return orchestrator_response(messages)
+
+    async def quality_check(messages, info):
+        await latency.wait()
+        output = {"results_evaluation": [], "overall_quality_score": 0.8, "decision": "Good enough", "suggested_search_terms": []}
+        return ModelResponse(parts=[ToolCallPart(info.output_tools[0].name, output)])
+
+    async def summarize(messages, info):
+        # the stub orchestrator never calls it, it only has to exist without an OpenAI key
+        await latency.wait()
+        return ModelResponse(parts=[TextPart("")])
+
+    return {
+        "orchestrator": function_model(orchestrator, "stub"),
+        "search_quality_check": function_model(quality_check, "stub"),
+        "summarize": function_model(summarize, "stub"),
+    }
+
+
+def load_corpus(folder=LOG_FOLDER) -> list[dict]:
+    return unique_documents(load_runs(folder))
+
+
+def load_test_agent(corpus: list[dict] | None = None, model_seconds: float | None = None):
+    """(AsyncAgent_Tools, orchestrator) backed by stub LLMs and a seeded embedded index."""
+    if model_seconds is None:
+        model_seconds = float(os.getenv("LOAD_TEST_MODEL_SECONDS", 0.5))
+    es = EmbeddedElasticsearch()
+    tools = AsyncAgent_Tools(es_index=es)
+
+    index = EmbeddedIndex(tools.index_name, tools.index_settings)
+    for doc in load_corpus() if corpus is None else corpus:
+        index.add(doc)
+    es.indexes[tools.index_name] = index
+
+    return tools, create_agents(tools, models=stub_models(StubLatency(model_seconds)))
+
+
+def create_load_test_app():
+    """backend.app served by the stub orchestrator; LOAD_TEST_MODEL_SECONDS sets the model latency."""
+    from backend import app as backend
+    backend.use_agent(*load_test_agent())
+    return backend.app
@@ -0,0 +1,240 @@
+"""
+Benchmarks of the ingestion and search hot paths.
+
+Each benchmark runs at several corpus sizes (number of synthetic papers)
+and reports latency percentiles over its repeats, throughput and peak
+Python memory. Memory is measured with tracemalloc in one extra, untimed
+run, because tracing allocations slows everything down.
+
+- sliding_window: chunking every paper text (throughput in chars/s)
+- parse_pdf: AsyncAgent_Tools.parse_pdf over synthetic pdfs of the papers,
+  i.e. pdf_to_chunks in the process pool as the backend ingests (papers/s;
+  peak memory covers the event loop process only)
+- create_elasticsearch_index: AsyncAgent_Tools.create_elasticsearch_index
+  into a fresh index (chunks/s)
+- search: AsyncAgent_Tools.search, latency per query (queries/s)
+"""
+import asyncio
+import platform
+import time
+import tracemalloc
+from datetime import datetime, timezone
+from types import SimpleNamespace
+from unittest import mock
+
+from benchmarks.corpus import make_corpus, make_feed, make_pdf, make_queries
+from embedded_index import EmbeddedElasticsearch
+from evals.retrieval_benchmark import BENCHMARK_INDEX
+from monitoring.log_query import Reservoir
+from tools import CHUNK_SIZE, CHUNK_STEP, Agent_Tools, AsyncAgent_Tools, FetchQuery, shutdown_process_pool, sliding_window
+
+
+def measure(fn, repeats: int) -> dict:
+    """Time `fn` (returning the number of items it processed) over `repeats` runs, then its peak memory."""
+    latency = Reservoir()
+    items = 0
+    total = 0.0
+    fastest = None
+    for _ in range(repeats):
+        started = time.perf_counter()
+        items = fn()
+        seconds = time.perf_counter() - started
+        latency.add(seconds)
+        total += seconds
+        fastest = seconds if fastest is None else min(fastest, seconds)
+
+    tracemalloc.start()
+    try:
+        fn()
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return {
+        "repeats": repeats,
+        "items": items,
+        "throughput": items * repeats / total if total else None,
+        "peak_memory_bytes": peak,
+        # the fastest repeat is the least disturbed by the rest of the machine
+        "min": fastest,
+        **latency.percentiles((50, 90, 99)),
+    }
+
+
+def bench_sliding_window(papers: list[dict], repeats: int) -> dict:
+    def run():
+        for paper in papers:
+            sliding_window(paper["text"], CHUNK_SIZE, CHUNK_STEP)
+        return sum(len(paper["text"]) for paper in papers)
+
+    return measure(run, repeats)
+
+
+def stub_arxiv_to_text(papers: list[dict]):
+    """Patch arxiv_to_text in tools to return the synthetic text of each paper's pdf url."""
+    texts = {f"http://arxiv.org/pdf/{paper['id']}": paper["text"] for paper in papers}
+    return mock.patch("tools.arxiv_to_text", texts.get)
+
+
+def bench_parse_pdf(papers: list[dict], repeats: int) -> dict:
+    entries = make_feed(papers).entries
+    pdfs = [make_pdf(paper["text"]) for paper in papers]
+    tools = AsyncAgent_Tools(es_index=None, http_client=SimpleNamespace())
+
+    async def parse_all():
+        docs = await asyncio.gather(*[tools.parse_pdf(entry, pdf) for entry, pdf in zip(entries, pdfs)])
+        if not all(docs):
+            raise RuntimeError("a synthetic pdf did not parse")
+
+    def run():
+        asyncio.run(parse_all())
+        return len(papers)
+
+    # the process pool starts once per backend, not per request
+    asyncio.run(parse_all())
+    return measure(run, repeats)
+
+
+async def make_index(docs: list[dict], es_index=None) -> AsyncAgent_Tools:
+    tools = AsyncAgent_Tools(es_index=es_index or EmbeddedElasticsearch(), http_client=SimpleNamespace())
+    tools.index_name = BENCHMARK_INDEX
+    if await tools.index.indices.exists(index=tools.index_name):
+        await tools.index.indices.delete(index=tools.index_name)
+    await tools.bootstrap()
+    await tools.create_elasticsearch_index(docs)
+    if hasattr(tools.index.indices, "refresh"):
+        await tools.index.indices.refresh(index=tools.index_name)
+    return tools
+
+
+def bench_create_index(docs: list[dict], repeats: int, es_url: str | None = None) -> dict:
+    def run():
+        async def index():
+            es_index = None
+            if es_url:
+                from elasticsearch import AsyncElasticsearch
+                es_index = AsyncElasticsearch(es_url)
+            tools = await make_index(docs, es_index)
+            await tools.index.close()
+
+        asyncio.run(index())
+        return len(docs)
+
+    return measure(run, repeats)
+
+
+def bench_search(docs: list[dict], queries: list[str], es_url: str | None = None) -> dict:
+    async def run():
+        es_index = None
+        if es_url:
+            from elasticsearch import AsyncElasticsearch
+            es_index = AsyncElasticsearch(es_url)
+        tools = await make_index(docs, es_index)
+
+        latency = Reservoir()
+        started = time.perf_counter()
+        for query in queries:
+            query_started = time.perf_counter()
+            await tools.search(FetchQuery(query=query, paper_name=""))
+            latency.add(time.perf_counter() - query_started)
+        total = time.perf_counter() - started
+
+        tracemalloc.start()
+        try:
+            for query in queries[:50]:
+                await tools.search(FetchQuery(query=query, paper_name=""))
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+            await tools.index.close()
+
+        return {
+            "repeats": len(queries),
+            "items": len(queries),
+            "throughput": len(queries) / total if total else None,
+            "peak_memory_bytes": peak,
+            **latency.percentiles((50, 90, 99)),
+        }
+
+    return asyncio.run(run())
+
+
+def run_suite(
+    sizes: list[int] = (10, 100),
+    repeats: int = 5,
+    queries: int = 200,
+    words_per_paper: int = 3000,
+    seed: int = 0,
+    es_url: str | None = None,
+) -> dict:
+    results = {}
+    try:
+        for size in sizes:
+            papers = make_corpus(size, words_per_paper, seed)
+            with stub_arxiv_to_text(papers):
+                docs = Agent_Tools(es_index=None).extract_data(make_feed(papers))
+
+            print(f"corpus of {size} papers, {len(docs)} chunks")
+            results[f"sliding_window/{size}"] = bench_sliding_window(papers, repeats)
+            results[f"parse_pdf/{size}"] = bench_parse_pdf(papers, repeats)
+            results[f"create_elasticsearch_index/{size}"] = bench_create_index(docs, repeats, es_url)
+            results[f"search/{size}"] = bench_search(docs, make_queries(queries, seed), es_url)
+    finally:
+        shutdown_process_pool()
+
+    return {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "python": platform.python_version(),
+        "machine": platform.machine(),
+        "backend": es_url or "embedded",
+        "config": {"sizes": list(sizes), "repeats": repeats, "queries": queries, "words_per_paper": words_per_paper, "seed": seed},
+        "results": results,
+    }
+
+
+def compare(current: dict, baseline: dict, threshold: float = 0.2, memory_threshold: float = 0.2, noise_floor: float = 0.001) -> list[dict]:
+    """
+    Compare every benchmark present in both reports. A benchmark regresses
+    when its latency or peak memory grew by more than the threshold
+    (0.2 = 20%). Latency is the fastest repeat (p50 for reports without
+    it), and only counts as a regression when it also grew by more than
+    `noise_floor` seconds: sub-millisecond timings jitter by more than 20%
+    between identical runs.
+    """
+    rows = []
+    for name, result in current["results"].items():
+        base = baseline["results"].get(name)
+        if base is None:
+            continue
+        latency = "min" if base.get("min") and result.get("min") is not None else "p50"
+        for metric, limit, floor in ((latency, threshold, noise_floor), ("peak_memory_bytes", memory_threshold, 0)):
+            if not base.get(metric) or result.get(metric) is None:
+                continue
+            change = result[metric] / base[metric] - 1
+            rows.append({
+                "benchmark": name,
+                "metric": metric,
+                "baseline": base[metric],
+                "current": result[metric],
+                "change": change,
+                "regression": change > limit and result[metric] - base[metric] > floor,
+            })
+    return rows
+
+
+def format_results(report: dict) -> str:
+    lines = [f"{'benchmark':<34} {'p50':>10} {'p90':>10} {'p99':>10} {'throughput':>14} {'peak mem':>10}"]
+    for name, r in report["results"].items():
+        lines.append(
+            f"{name:<34} {r['p50'] * 1000:9.2f}ms {r['p90'] * 1000:9.2f}ms {r['p99'] * 1000:9.2f}ms "
+            f"{r['throughput']:12.1f}/s {r['peak_memory_bytes'] / 1e6:8.2f}MB"
+        )
+    return "\n".join(lines)
+
+
+def format_comparison(rows: list[dict]) -> str:
+    lines = []
+    for row in rows:
+        flag = "REGRESSION" if row["regression"] else ""
+        lines.append(f"{row['benchmark']:<34} {row['metric']:<18} {row['change'] * 100:+7.1f}% {flag}")
+    return "\n".join(lines)
@@ -0,0 +1,185 @@
+"""
+In-memory stand-in for the subset of AsyncElasticsearch used by
+AsyncAgent_Tools: ping, indices.exists/create/get_mapping/put_mapping,
+search with a multi_match query, bulk (so elasticsearch.helpers.async_bulk
+works unchanged) and close.
+
+Scoring is BM25 per field with Lucene's defaults (k1=1.2, b=0.75), and
+best_fields takes the best matching field of each document, like
+Elasticsearch does. Meant for offline replays, benchmarks and tests, where
+results should be deterministic and no cluster is needed.
+"""
+import json
+import math
+import re
+from collections import Counter, defaultdict
+from types import SimpleNamespace
+
+from elastic_transport import ApiResponseMeta, HttpHeaders, NodeConfig, SerializerCollection
+from elasticsearch import NotFoundError
+
+TOKEN_RE = re.compile(r"\w+")
+
+
+def tokenize(text) -> list[str]:
+    if isinstance(text, list):
+        text = " ".join(str(t) for t in text)
+    return TOKEN_RE.findall(str(text).lower())
+
+
+def not_found(index_name: str) -> NotFoundError:
+    meta = ApiResponseMeta(404, "1.1", HttpHeaders(), 0.0, NodeConfig("http", "localhost", 9200))
+    body = {"error": {"type": "index_not_found_exception", "index": index_name}, "status": 404}
+    return NotFoundError("index_not_found_exception", meta, body)
+
+
+class FieldIndex:
+    """Inverted index of one text field: term -> {doc position: term frequency}."""
+
+    def __init__(self):
+        self.postings = defaultdict(dict)
+        self.lengths = {}
+        self.total_length = 0
+
+    def add(self, position: int, text):
+        tokens = tokenize(text)
+        for term, tf in Counter(tokens).items():
+            self.postings[term][position] = tf
+        self.lengths[position] = len(tokens)
+        self.total_length += len(tokens)
+
+    def score(self, terms: list[str], num_docs: int, k1: float = 1.2, b: float = 0.75) -> dict[int, float]:
+        scores = defaultdict(float)
+        if not self.lengths:
+            return scores
+        avg_length = self.total_length / len(self.lengths)
+        for term in terms:
+            postings = self.postings.get(term)
+            if not postings:
+                continue
+            idf = math.log(1 + (num_docs - len(postings) + 0.5) / (len(postings) + 0.5))
+            for position, tf in postings.items():
+                norm = k1 * (1 - b + b * self.lengths[position] / avg_length)
+                scores[position] += idf * tf * (k1 + 1) / (tf + norm)
+        return scores
+
+
+class EmbeddedIndex:
+
+    def __init__(self, name: str, body: dict | None = None):
+        self.name = name
+        self.mappings = dict((body or {}).get("mappings", {}))
+        self.docs = []
+        self.fields = defaultdict(FieldIndex)
+
+    def add(self, source: dict, doc_id: str | None = None) -> str:
+        position = len(self.docs)
+        doc_id = doc_id or str(position)
+        self.docs.append((doc_id, source))
+        for field, value in source.items():
+            if isinstance(value, (str, list)):
+                self.fields[field].add(position, value)
+        return doc_id
+
+    def search(self, body: dict) -> dict:
+        query = body.get("query", {"match_all": {}})
+        size = body.get("size", 10)
+
+        if "multi_match" in query:
+            multi_match = query["multi_match"]
+            terms = tokenize(multi_match["query"])
+            per_field = [self.fields[f].score(terms, len(self.docs)) for f in multi_match.get("fields", []) if f in self.fields]
+            scores = defaultdict(float)
+            for field_scores in per_field:
+                for position, score in field_scores.items():
+                    scores[position] = max(scores[position], score)
+        elif "match_all" in query:
+            scores = {position: 1.0 for position in range(len(self.docs))}
+        else:
+            raise ValueError(f"unsupported query: {list(query)}")
+
+        # ties keep insertion order, like Lucene's doc id order
+        ranked = sorted(scores.items(), key=lambda item: (-item[1], item[0]))[:size]
+        hits = [
+            {"_index": self.name, "_id": self.docs[p][0], "_score": score, "_source": self.docs[p][1]}
+            for p, score in ranked
+        ]
+        max_score = hits[0]["_score"] if hits else None
+        return {"hits": {"total": {"value": len(scores), "relation": "eq"}, "max_score": max_score, "hits": hits}}
+
+
+class EmbeddedIndices:
+
+    def __init__(self, client: "EmbeddedElasticsearch"):
+        self.client = client
+
+    async def exists(self, index: str) -> bool:
+        return index in self.client.indexes
+
+    async def create(self, index: str, body: dict | None = None, **kwargs):
+        self.client.indexes[index] = EmbeddedIndex(index, body or {"mappings": kwargs.get("mappings", {})})
+        return {"acknowledged": True, "index": index}
+
+    async def delete(self, index: str):
+        if index not in self.client.indexes:
+            raise not_found(index)
+        del self.client.indexes[index]
+        return {"acknowledged": True}
+
+    async def get_mapping(self, index: str) -> dict:
+        return {index: {"mappings": self.client.get_index(index).mappings}}
+
+    async def put_mapping(self, index: str, body: dict | None = None, **kwargs):
+        self.client.get_index(index).mappings.update(body or kwargs)
+        return {"acknowledged": True}
+
+
+class EmbeddedElasticsearch:
+    """Drop-in for AsyncElasticsearch in AsyncAgent_Tools, see the module docstring."""
+
+    def __init__(self):
+        self.indexes: dict[str, EmbeddedIndex] = {}
+        self.indices = EmbeddedIndices(self)
+        # async_bulk serializes actions with the client's transport serializers
+        self.transport = SimpleNamespace(serializers=SerializerCollection())
+        self._client_meta = ()
+
+    def options(self, **kwargs):
+        return self
+
+    def get_index(self, name: str) -> EmbeddedIndex:
+        if name not in self.indexes:
+            raise not_found(name)
+        return self.indexes[name]
+
+    async def ping(self) -> bool:
+        return True
+
+    async def close(self):
+        pass
+
+    async def index(self, index: str, document: dict, id: str | None = None, **kwargs):
+        if index not in self.indexes:
+            await self.indices.create(index=index)
+        doc_id = self.indexes[index].add(document, id)
+        return {"_index": index, "_id": doc_id, "result": "created"}
+
+    async def bulk(self, operations, index: str | None = None, **kwargs):
+        lines = [json.loads(op) if isinstance(op, (bytes, str)) else op for op in operations]
+        items = []
+        i = 0
+        while i < len(lines):
+            (op_type, meta), = lines[i].items()
+            target = meta.get("_index", index)
+            if op_type == "delete":
+                raise ValueError("delete is not supported by the embedded index")
+            response = await self.index(target, lines[i + 1], id=meta.get("_id"))
+            items.append({op_type: {"_index": target, "_id": response["_id"], "status": 201, "result": "created"}})
+            i += 2
+        return SimpleNamespace(body={"took": 0, "errors": False, "items": items})
+
+    async def search(self, index: str, body: dict | None = None, **kwargs) -> dict:
+        return self.get_index(index).search(body or kwargs)
+
+    async def count(self, index: str, **kwargs) -> dict:
+        return {"count": len(self.get_index(index).docs)}
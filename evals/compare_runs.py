@@ -0,0 +1,165 @@
+"""
+Compare two eval runs question by question.
+
+A run is the evals.csv written by evals/evaluator.py (or a folder holding
+one, like evals/latest_evals or evals/ground_truth). Every row carries the
+evaluated log, so latency (first to last message timestamp), tokens and
+requests come from the same rows as the checks. The runs are aligned on the
+user's question. For every check pass rate and performance metric the
+report gives the mean of both runs, the delta (candidate - baseline) and a
+paired bootstrap confidence interval of the delta, so quality and
+performance regressions show up side by side.
+
+    python -m evals.compare_runs evals/ground_truth evals/latest_evals
+"""
+import argparse
+import ast
+import re
+from pathlib import Path
+
+import numpy as np
+import pandas as pd
+
+from evals.retrieval_benchmark import normalize
+from monitoring.log_query import summarize_run
+
+PERFORMANCE = ["latency_seconds", "input_tokens", "output_tokens", "total_tokens", "requests", "tool_calls"]
+
+
+def find_evals_csv(path) -> Path:
+    path = Path(path)
+    if path.is_dir():
+        candidates = sorted(path.glob("*evals.csv"))
+        if not candidates:
+            raise FileNotFoundError(f"no evals.csv in {path}")
+        return candidates[0]
+    return path
+
+
+def _literal(value):
+    # evals.csv stores the log fields as python reprs
+    if isinstance(value, str):
+        try:
+            return ast.literal_eval(value)
+        except (ValueError, SyntaxError):
+            return value
+    return value
+
+
+def question_of(messages: list[dict]) -> str:
+    for message in messages:
+        for part in message.get("parts", []):
+            if part.get("part_kind") == "user-prompt" and isinstance(part.get("content"), str):
+                match = re.search(r"Current query:(.*)", part["content"])
+                return (match.group(1) if match else part["content"]).strip()
+    return ""
+
+
+def load_run(path) -> pd.DataFrame:
+    """One row per question: check pass rates and performance metrics (averaged over repeated questions)."""
+    df = pd.read_csv(find_evals_csv(path))
+    # the check columns are the boolean ones (evals.evaluator builds eval_agent at import, which needs a key)
+    checks = list(df.select_dtypes(bool).columns)
+    rows = []
+    for record in df.to_dict("records"):
+        entry = {"messages": _literal(record.get("messages")) or [], "usage": _literal(record.get("usage")) or {}}
+        run = summarize_run(entry)
+        rows.append({
+            "question": normalize(question_of(entry["messages"])),
+            **{check: float(record[check]) for check in checks},
+            "latency_seconds": run.duration_seconds,
+            "input_tokens": run.input_tokens,
+            "output_tokens": run.output_tokens,
+            "total_tokens": run.input_tokens + run.output_tokens,
+            "requests": run.requests,
+            "tool_calls": len(run.tool_calls),
+        })
+    return pd.DataFrame(rows).groupby("question").mean()
+
+
+def bootstrap_deltas(baseline: pd.DataFrame, candidate: pd.DataFrame, n_resamples: int = 10000,
+                     confidence: float = 0.95, seed: int = 0) -> pd.DataFrame:
+    """
+    Paired bootstrap over questions for every column both frames share.
+
+    All resamples are drawn at once as an (n_resamples, n_questions) index
+    matrix, so the whole bootstrap is a single gather and mean per column.
+    """
+    columns = [c for c in baseline.columns if c in candidate.columns]
+    base = baseline[columns].to_numpy(dtype=float)
+    diffs = candidate[columns].to_numpy(dtype=float) - base
+
+    rng = np.random.default_rng(seed)
+    resamples = rng.integers(0, len(diffs), size=(n_resamples, len(diffs)))
+    with np.errstate(invalid="ignore"):
+        # nanmean: a run without timestamps has no latency
+        boot = np.nanmean(diffs[resamples], axis=1)
+    tail = (1 - confidence) / 2 * 100
+    low, high = np.nanpercentile(boot, [tail, 100 - tail], axis=0)
+
+    report = pd.DataFrame({
+        "baseline": np.nanmean(base, axis=0),
+        "candidate": np.nanmean(candidate[columns].to_numpy(dtype=float), axis=0),
+        "delta": np.nanmean(diffs, axis=0),
+        "ci_low": low,
+        "ci_high": high,
+    }, index=pd.Index(columns, name="metric"))
+    report["relative"] = report["delta"] / report["baseline"].where(report["baseline"] != 0)
+    report["significant"] = (report["ci_low"] > 0) | (report["ci_high"] < 0)
+    return report
+
+
+def compare_runs(baseline_path, candidate_path, n_resamples: int = 10000, confidence: float = 0.95, seed: int = 0) -> dict:
+    baseline, candidate = load_run(baseline_path), load_run(candidate_path)
+    shared = baseline.index.intersection(candidate.index)
+    report = bootstrap_deltas(baseline.loc[shared], candidate.loc[shared], n_resamples, confidence, seed)
+    performance = [c for c in PERFORMANCE if c in report.index]
+    return {
+        "questions": len(shared),
+        "only_baseline": sorted(baseline.index.difference(candidate.index)),
+        "only_candidate": sorted(candidate.index.difference(baseline.index)),
+        "confidence": confidence,
+        "checks": report.drop(index=performance),
+        "performance": report.loc[performance],
+    }
+
+
+def format_report(result: dict) -> str:
+    def table(df: pd.DataFrame, fmt: str) -> list[str]:
+        lines = []
+        for metric, r in df.iterrows():
+            marker = "*" if r["significant"] else " "
+            relative = f"{r['relative'] * 100:+6.1f}%" if pd.notna(r["relative"]) else "      -"
+            lines.append(
+                f"{marker} {metric:<20} {r['baseline']:{fmt}} -> {r['candidate']:{fmt}}  "
+                f"delta {r['delta']:+{fmt}} [{r['ci_low']:+{fmt}}, {r['ci_high']:+{fmt}}] {relative}"
+            )
+        return lines
+
+    lines = [f"{result['questions']} shared questions, {result['confidence'] * 100:.0f}% bootstrap intervals (* excludes 0)"]
+    for key, label in (("only_baseline", "only in baseline"), ("only_candidate", "only in candidate")):
+        if result[key]:
+            lines.append(f"{label}: " + "; ".join(result[key]))
+    lines += ["", "pass rates"] + table(result["checks"], "6.2f")
+    lines += ["", "performance (per question)"] + table(result["performance"], "9.1f")
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(prog="python -m evals.compare_runs")
+    parser.add_argument("baseline", help="evals.csv, or a folder with one")
+    parser.add_argument("candidate", help="evals.csv, or a folder with one")
+    parser.add_argument("--resamples", type=int, default=10000)
+    parser.add_argument("--confidence", type=float, default=0.95)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--output", help="save the deltas as csv")
+    args = parser.parse_args()
+
+    result = compare_runs(args.baseline, args.candidate, args.resamples, args.confidence, args.seed)
+    print(format_report(result))
+    if args.output:
+        pd.concat([result["checks"], result["performance"]]).to_csv(args.output)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,12 +1,18 @@
+import argparse
+import hashlib
 import json
 import os
 from enum import Enum
+from pathlib import Path
 from pydantic import BaseModel, Field
 from pydantic_ai import Agent
 import asyncio
 from tqdm.auto import tqdm
 import pandas as pd
+from monitoring.agent_logging import read_logs
+from monitoring.condense import DEFAULT_MAX_TOKENS, condense_log
 
+EVALUATIONS_FILE = "evaluations.jsonl"
 
 
 class CheckName(str, Enum):
@@ -97,14 +103,15 @@ user_prompt_format = """
 <LOG>{log}</LOG>
 """.strip()
 
-def format_prompt(file):
+def format_prompt(file, max_log_tokens: int = DEFAULT_MAX_TOKENS):
 
     question = file["messages"][0]["parts"][0]["content"]
     # reference = file["output"]["references"]
 
     answer = file["output"]["summary"]
 
-    logs = file
+    # question, tool calls and shortened results instead of the whole log dict
+    logs = condense_log(file, max_tokens=max_log_tokens)
 
     return user_prompt_format.format(
         instructions=eval_agent._instructions,
@@ -115,31 +122,112 @@ def format_prompt(file):
 
 
 
-async def main():
-    all_results = []
-    #TODO: specify correct directory location of logs
-    directory_path = 'evals/latest_evals/eval_logs/'
-    for file_name in os.listdir(directory_path):
-        full_file_name = os.path.join('evals/latest_evals/eval_logs/', file_name)
-        with open(full_file_name, 'r') as file:
-            file_data = json.load(file)
-
-        user_prompt = format_prompt(file_data)
-        result = await eval_agent.run(user_prompt)
-
-        all_results.append((file_data, result))
-
-    
+def log_hash(entry: dict) -> str:
+    """Content hash of a log entry; an entry is only evaluated once per hash."""
+    data = json.dumps(entry, sort_keys=True, default=str)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()
+
+
+def load_evaluations(path: Path) -> dict:
+    evaluations = {}
+    if not path.exists():
+        return evaluations
+    with path.open(encoding="utf-8") as f_in:
+        for line in f_in:
+            try:
+                record = json.loads(line)
+            except json.JSONDecodeError:
+                # a line cut short by a crash; that log is evaluated again
+                continue
+            evaluations[record["log_hash"]] = record
+    return evaluations
+
+
+def append_evaluation(f_out, record: dict):
+    # flushed and synced per result, so an interrupted run keeps everything finished so far
+    f_out.write(json.dumps(record) + "\n")
+    f_out.flush()
+    os.fsync(f_out.fileno())
+
+
+async def evaluate_logs(
+    directory_path,
+    output_dir,
+    max_concurrency: int = 8,
+    agent: Agent | None = None,
+    max_log_tokens: int = DEFAULT_MAX_TOKENS,
+):
+    """
+    Evaluate every log under `directory_path` with up to `max_concurrency`
+    eval_agent runs at once.
+
+    Each result is appended to <output_dir>/evaluations.jsonl as soon as it
+    finishes, keyed by the log's content hash. Logs whose hash is already in
+    that file are skipped, so an interrupted evaluation resumes where it
+    stopped. Returns every log entry with its evaluation record (or None if
+    its evaluation failed).
+    """
+    agent = agent or eval_agent
+    output_dir = Path(output_dir)
+    output_dir.mkdir(parents=True, exist_ok=True)
+    evaluations_path = output_dir / EVALUATIONS_FILE
+    evaluations = load_evaluations(evaluations_path)
+
+    entries = [(log_hash(entry), entry) for entry in read_logs(directory_path)]
+    todo = {h: entry for h, entry in entries if h not in evaluations}
+    print(f"{len(entries)} logs, {len(entries) - len(todo)} already evaluated")
+
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def evaluate_one(digest, entry):
+        async with semaphore:
+            result = await agent.run(format_prompt(entry, max_log_tokens))
+        return digest, entry, result.output
+
+    failed = 0
+    tasks = [asyncio.create_task(evaluate_one(h, entry)) for h, entry in todo.items()]
+    try:
+        with evaluations_path.open("a", encoding="utf-8") as f_out:
+            for task in tqdm(asyncio.as_completed(tasks), total=len(tasks), desc="evaluating"):
+                try:
+                    digest, entry, eval_result = await task
+                except Exception as e:
+                    failed += 1
+                    print(f"evaluation failed: {e}")
+                    continue
+
+                record = {
+                    "log_hash": digest,
+                    "run_id": entry.get("run_id"),
+                    "checks": {c.check_name.value: c.check_pass for c in eval_result.checklist},
+                    "summary": eval_result.summary,
+                }
+                append_evaluation(f_out, record)
+                evaluations[digest] = record
+    finally:
+        for task in tasks:
+            task.cancel()
+
+    if failed:
+        print(f"{failed} evaluations failed, run again to retry them")
+
+    return [(entry, evaluations.get(h)) for h, entry in entries]
+
+
+def save_results(results, output_dir):
     eval_results = []
 
-    for rec, result in all_results:
+    for rec, evaluation in results:
+        if evaluation is None:
+            continue
         eval_row = rec.copy()
-        eval_result = result.output
-        checks = {c.check_name.value: c.check_pass for c in eval_result.checklist}
-        eval_row.update(checks)
-        eval_row['summary'] = eval_result.summary
+        eval_row.update(evaluation["checks"])
+        eval_row['summary'] = evaluation["summary"]
         eval_results.append(eval_row)
 
+    if not eval_results:
+        print("no evaluations to save.")
+        return
 
     df_eval = pd.DataFrame(eval_results)
 
@@ -151,13 +239,25 @@ async def main():
     'metric': df_eval[eval_columns].mean().index,
     'score': df_eval[eval_columns].mean().values
         })
-    all_metrics.to_csv("evals/latest_evals/all_metrics.csv")
-    
-    df_eval.to_csv("evals/latest_evals/evals.csv")
+    all_metrics.to_csv(Path(output_dir) / "all_metrics.csv")
     
+    df_eval.to_csv(Path(output_dir) / "evals.csv")
+
+
+async def main():
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--logs", default="evals/latest_evals/eval_logs/", help="folder with the logs to evaluate")
+    arg_parser.add_argument("--output", default="evals/latest_evals", help="folder for evaluations.jsonl, evals.csv and all_metrics.csv")
+    arg_parser.add_argument("--concurrency", type=int, default=8)
+    arg_parser.add_argument("--log-tokens", type=int, default=DEFAULT_MAX_TOKENS, help="token budget of the log in each eval prompt")
+    args = arg_parser.parse_args()
+
+    # handles both per-run .json files and .jsonl log segments
+    results = await evaluate_logs(args.logs, args.output, args.concurrency, max_log_tokens=args.log_tokens)
+    save_results(results, args.output)
 
 
 
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    asyncio.run(main())
@@ -0,0 +1,359 @@
+"""
+Run the question set under a grid of agent configurations and compare
+latency, token cost and eval pass rates.
+
+A configuration picks the models of the orchestrator, search_quality_check
+and summarize agents, the chunk size/step papers are indexed with and the
+search max_results. Every (configuration, question) run goes through one
+pool of --concurrency slots, so configurations run in parallel. They share:
+- one arXiv cache: a feed or pdf is downloaded once, whichever run asks first
+- one index per chunking (arxiv_chunks_experiment_<size>_<step>), so papers
+  fetched by one configuration are found by the others with the same chunks
+
+Each run is logged to <output>/<configuration>/eval_logs and judged with
+evals.evaluator, so every configuration also gets the usual evals.csv.
+
+    python -m evals.experiments --orchestrator gpt-4o-mini gpt-5-mini --max-results 3 5 --limit 5 --min-pass-rate 0.7
+"""
+import argparse
+import asyncio
+import itertools
+import json
+import time
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from pathlib import Path
+
+import httpx
+import pandas as pd
+from elasticsearch import AsyncElasticsearch, NotFoundError
+from pydantic import BaseModel
+from pydantic_ai.models.wrapper import WrapperModel
+
+from agents import DEFAULT_MODEL, ES_URL, create_agents
+from embedded_index import EmbeddedElasticsearch
+from evals.evaluator import CheckName, evaluate_logs, save_results
+from evals.retrieval_benchmark import QUESTIONS_FILE, load_questions
+from monitoring.agent_logging import log_run, serializer
+from monitoring.log_query import Reservoir, tool_calls
+from tools import CHUNK_SIZE, CHUNK_STEP, AsyncAgent_Tools
+
+# USD per million tokens: input, cached input, output
+PRICES = {
+    "gpt-4o-mini": (0.15, 0.075, 0.60),
+    "gpt-4o": (2.50, 1.25, 10.00),
+    "gpt-4.1-nano": (0.10, 0.025, 0.40),
+    "gpt-4.1-mini": (0.40, 0.10, 1.60),
+    "gpt-4.1": (2.00, 0.50, 8.00),
+    "gpt-5-nano": (0.05, 0.005, 0.40),
+    "gpt-5-mini": (0.25, 0.025, 2.00),
+    "gpt-5": (1.25, 0.125, 10.00),
+}
+
+# same prompt the backend sends for a question without history
+USER_PROMPT = """
+            Answer the user's query based on the following conversation history:
+            Context:
+            Current query: {question}
+        """
+
+_run_usage: ContextVar[dict | None] = ContextVar("experiment_run_usage", default=None)
+
+
+class ExperimentConfig(BaseModel):
+    orchestrator: str = DEFAULT_MODEL
+    search_quality_check: str = DEFAULT_MODEL
+    summarize: str = DEFAULT_MODEL
+    chunk_size: int = CHUNK_SIZE
+    chunk_step: int = CHUNK_STEP
+    max_results: int = 3
+
+    @property
+    def name(self) -> str:
+        models = "_".join(m.split(":")[-1] for m in (self.orchestrator, self.search_quality_check, self.summarize))
+        return f"{models}_chunk{self.chunk_size}-{self.chunk_step}_k{self.max_results}"
+
+    def models(self) -> dict[str, str]:
+        return {"orchestrator": self.orchestrator, "search_quality_check": self.search_quality_check, "summarize": self.summarize}
+
+
+def expand_grid(**options: list) -> list[ExperimentConfig]:
+    """Every combination of the given ExperimentConfig field values, e.g. expand_grid(max_results=[3, 5])."""
+    names = list(options)
+    return [ExperimentConfig(**dict(zip(names, values))) for values in itertools.product(*options.values())]
+
+
+class MeteredModel(WrapperModel):
+    """Adds the usage of every response to the totals of the run it belongs to, per model."""
+
+    def _add(self, usage):
+        totals = _run_usage.get()
+        if totals is None:
+            return
+        model = totals.setdefault(self.model_name, {"input_tokens": 0, "cache_read_tokens": 0, "output_tokens": 0, "requests": 0})
+        model["input_tokens"] += usage.input_tokens
+        model["cache_read_tokens"] += usage.cache_read_tokens
+        model["output_tokens"] += usage.output_tokens
+        model["requests"] += 1
+
+    async def request(self, *args, **kwargs):
+        response = await super().request(*args, **kwargs)
+        self._add(response.usage)
+        return response
+
+    @asynccontextmanager
+    async def request_stream(self, *args, **kwargs):
+        async with super().request_stream(*args, **kwargs) as response_stream:
+            yield response_stream
+        self._add(response_stream.usage())
+
+
+def cost(usage_by_model: dict, prices: dict = PRICES) -> float | None:
+    """USD for the usage of a run, None if a model has no price."""
+    total = 0.0
+    for model, usage in usage_by_model.items():
+        price = prices.get(model.split(":")[-1])
+        if price is None:
+            return None
+        uncached = usage["input_tokens"] - usage["cache_read_tokens"]
+        total += (uncached * price[0] + usage["cache_read_tokens"] * price[1] + usage["output_tokens"] * price[2]) / 1e6
+    return total
+
+
+class ArxivCache:
+    """arXiv responses shared by all configurations; concurrent requests for the same key wait for one download."""
+
+    def __init__(self):
+        self.responses = {}
+        self.downloads = 0
+
+    async def get(self, key, download):
+        if key not in self.responses:
+            self.downloads += 1
+            self.responses[key] = asyncio.ensure_future(download())
+        try:
+            return await asyncio.shield(self.responses[key])
+        except Exception:
+            # failed downloads are not cached
+            self.responses.pop(key, None)
+            raise
+
+
+class ExperimentTools(AsyncAgent_Tools):
+    """AsyncAgent_Tools of one configuration, with shared arXiv responses and an index per chunking."""
+
+    def __init__(self, es_index, cache: ArxivCache, config: ExperimentConfig, http_client=None):
+        super().__init__(es_index=es_index, max_results=config.max_results, http_client=http_client,
+                         chunk_size=config.chunk_size, chunk_step=config.chunk_step)
+        self.index_name = f"arxiv_chunks_experiment_{config.chunk_size}_{config.chunk_step}"
+        self.cache = cache
+
+    async def fetch_feed(self, search_query=None, id_list=None, max_results=None):
+        fetch = super().fetch_feed
+        key = ("feed", search_query, tuple(id_list or ()), max_results or self.max_results)
+        return await self.cache.get(key, lambda: fetch(search_query, id_list, max_results))
+
+    async def download_pdf(self, entry):
+        download = super().download_pdf
+        return await self.cache.get(("pdf", entry["links"][1]["href"]), lambda: download(entry))
+
+
+async def run_question(agent, question: str, semaphore: asyncio.Semaphore) -> tuple[dict, dict | None]:
+    """One agent run: its metrics, and its log entry (None if it failed)."""
+    async with semaphore:
+        usage = {}
+        _run_usage.set(usage)
+        started = time.perf_counter()
+        try:
+            result = await agent.run(USER_PROMPT.format(question=question))
+            error = None
+        except Exception as e:
+            result, error = None, f"{type(e).__name__}: {e}"
+        seconds = time.perf_counter() - started
+
+    if result is None:
+        return {"question": question, "seconds": seconds, "usage": usage, "error": error}, None
+    # json round trip: the same shape as a log read back from disk
+    entry = json.loads(json.dumps(log_run(agent, result), default=serializer))
+    run = {"question": question, "seconds": seconds, "usage": usage, "error": None, "tool_calls": len(tool_calls(entry))}
+    return run, entry
+
+
+def write_logs(entries: list[dict], folder: Path):
+    folder.mkdir(parents=True, exist_ok=True)
+    for old in folder.glob("*.json"):
+        old.unlink()
+    for i, entry in enumerate(entries):
+        (folder / f"run_{i:04d}.json").write_text(json.dumps(entry))
+
+
+def summarize_config(config: ExperimentConfig, runs: list[dict], pass_rates: dict | None, prices: dict) -> dict:
+    ok = [r for r in runs if r["error"] is None]
+    latency = Reservoir()
+    for r in ok:
+        latency.add(r["seconds"])
+    costs = [cost(r["usage"], prices) for r in ok]
+    tokens = [sum(u["input_tokens"] + u["output_tokens"] for u in r["usage"].values()) for r in ok]
+
+    row = {
+        "config": config.name,
+        **config.model_dump(),
+        "runs": len(runs),
+        "errors": len(runs) - len(ok),
+        **{f"latency_{q}": v for q, v in latency.percentiles((50, 90, 99)).items()},
+        "tokens_per_question": sum(tokens) / len(tokens) if tokens else None,
+        "cost_per_question": sum(costs) / len(costs) if costs and None not in costs else None,
+        "tool_calls_per_question": sum(r["tool_calls"] for r in ok) / len(ok) if ok else None,
+        "pass_rate": None,
+    }
+    if pass_rates:
+        row.update(pass_rates)
+        # failed runs count as failing every check
+        row["pass_rate"] = sum(pass_rates.values()) / len(pass_rates) * len(ok) / len(runs)
+    return row
+
+
+async def judge_runs(entries: list[dict], folder: Path, concurrency: int, judge=None) -> dict | None:
+    """Pass rate per check over the runs logged in `folder`, as evals.evaluator computes them."""
+    if not entries:
+        return None
+    write_logs(entries, folder / "eval_logs")
+    results = await evaluate_logs(folder / "eval_logs", folder, concurrency, agent=judge)
+    save_results(results, folder)
+    evaluations = [e for _, e in results if e is not None]
+    if not evaluations:
+        return None
+    checks = [c.value for c in CheckName]
+    return {c: sum(bool(e["checks"].get(c)) for e in evaluations) / len(evaluations) for c in checks}
+
+
+async def run_experiments(
+    configs: list[ExperimentConfig],
+    questions: list[str],
+    es_index,
+    output_dir,
+    concurrency: int = 8,
+    http_client=None,
+    model_factory=None,
+    judge=None,
+    evaluate: bool = True,
+    prices: dict = PRICES,
+) -> list[dict]:
+    """
+    Run every question under every configuration and return one summary row
+    per configuration. `model_factory` turns a configured model name into a
+    model (default: the name itself, resolved by pydantic-ai); `judge`
+    replaces evals.evaluator.eval_agent.
+    """
+    output_dir = Path(output_dir)
+    cache = ArxivCache()
+    semaphore = asyncio.Semaphore(concurrency)
+    model_factory = model_factory or (lambda name: name)
+    own_client = http_client is None
+    if own_client:
+        http_client = httpx.AsyncClient(timeout=60, follow_redirects=True)
+
+    agents = []
+    for config in configs:
+        tools = ExperimentTools(es_index, cache, config, http_client)
+        await tools.bootstrap()
+        models = {agent: MeteredModel(model_factory(name)) for agent, name in config.models().items()}
+        agents.append(create_agents(tools, models=models))
+
+    tasks = [[asyncio.create_task(run_question(agent, q, semaphore)) for q in questions] for agent in agents]
+    rows = []
+    for config, config_tasks in zip(configs, tasks):
+        results = [await task for task in config_tasks]
+        runs = [run for run, _ in results]
+        entries = [entry for _, entry in results if entry is not None]
+        folder = output_dir / config.name
+        folder.mkdir(parents=True, exist_ok=True)
+        (folder / "runs.json").write_text(json.dumps(runs, indent=2))
+        pass_rates = await judge_runs(entries, folder, concurrency, judge) if evaluate else None
+        rows.append(summarize_config(config, runs, pass_rates, prices))
+
+    if own_client:
+        await http_client.aclose()
+    print(f"arXiv downloads: {cache.downloads}")
+    return rows
+
+
+def pick_best(rows: list[dict], min_pass_rate: float | None = None) -> dict | None:
+    """The configuration with the lowest median latency among those meeting the quality bar."""
+    candidates = [
+        r for r in rows
+        if r["latency_p50"] is not None
+        and (min_pass_rate is None or (r["pass_rate"] is not None and r["pass_rate"] >= min_pass_rate))
+    ]
+    return min(candidates, key=lambda r: r["latency_p50"], default=None)
+
+
+def format_table(rows: list[dict], best: dict | None = None) -> str:
+    def fmt(value, spec):
+        return f"{value:{spec}}" if value is not None else "-"
+
+    lines = [f"{'':2}{'config':<60} {'p50 s':>7} {'p90 s':>7} {'p99 s':>7} {'tokens':>8} {'$/q':>8} {'calls':>6} {'pass':>6} {'err':>4}"]
+    for r in rows:
+        marker = "->" if best is not None and r["config"] == best["config"] else ""
+        lines.append(
+            f"{marker:<2}{r['config']:<60} {fmt(r['latency_p50'], '7.2f')} {fmt(r['latency_p90'], '7.2f')} "
+            f"{fmt(r['latency_p99'], '7.2f')} {fmt(r['tokens_per_question'], '8.0f')} {fmt(r['cost_per_question'], '8.4f')} "
+            f"{fmt(r['tool_calls_per_question'], '6.1f')} {fmt(r['pass_rate'], '6.2f')} {r['errors']:>4}"
+        )
+    return "\n".join(lines)
+
+
+async def main():
+    parser = argparse.ArgumentParser(prog="python -m evals.experiments")
+    parser.add_argument("--orchestrator", nargs="+", default=[DEFAULT_MODEL])
+    parser.add_argument("--quality-check", nargs="+", default=[DEFAULT_MODEL], help="search_quality_check models")
+    parser.add_argument("--summarize", nargs="+", default=[DEFAULT_MODEL])
+    parser.add_argument("--chunk-size", nargs="+", type=int, default=[CHUNK_SIZE])
+    parser.add_argument("--chunk-step", nargs="+", type=int, default=[CHUNK_STEP])
+    parser.add_argument("--max-results", nargs="+", type=int, default=[3])
+    parser.add_argument("--questions", default=QUESTIONS_FILE)
+    parser.add_argument("--limit", type=int, help="only the first N questions")
+    parser.add_argument("--concurrency", type=int, default=8, help="agent runs (and judge calls) at a time")
+    parser.add_argument("--es-url", default=ES_URL)
+    parser.add_argument("--embedded", action="store_true", help="in-process index instead of Elasticsearch")
+    parser.add_argument("--fresh", action="store_true", help="drop the experiment indexes first")
+    parser.add_argument("--no-judge", action="store_true", help="skip the eval pass rates")
+    parser.add_argument("--min-pass-rate", type=float, help="quality bar for picking the fastest configuration")
+    parser.add_argument("--prices", help="json of model -> [input, cached input, output] USD per million tokens")
+    parser.add_argument("--output", default="evals/experiments")
+    args = parser.parse_args()
+
+    configs = expand_grid(
+        orchestrator=args.orchestrator, search_quality_check=args.quality_check, summarize=args.summarize,
+        chunk_size=args.chunk_size, chunk_step=args.chunk_step, max_results=args.max_results,
+    )
+    questions = load_questions(args.questions)[:args.limit]
+    prices = {**PRICES, **(json.loads(Path(args.prices).read_text()) if args.prices else {})}
+    print(f"{len(configs)} configurations x {len(questions)} questions")
+
+    es_index = EmbeddedElasticsearch() if args.embedded else AsyncElasticsearch(args.es_url)
+    if args.fresh:
+        for size, step in {(c.chunk_size, c.chunk_step) for c in configs}:
+            try:
+                await es_index.indices.delete(index=f"arxiv_chunks_experiment_{size}_{step}")
+            except NotFoundError:
+                pass
+
+    try:
+        rows = await run_experiments(
+            configs, questions, es_index, args.output, args.concurrency, evaluate=not args.no_judge, prices=prices
+        )
+    finally:
+        await es_index.close()
+
+    best = pick_best(rows, args.min_pass_rate)
+    print(format_table(rows, best))
+    if best is None:
+        print("no configuration meets the quality bar")
+    else:
+        print(f"fastest configuration meeting the bar: {best['config']}")
+    pd.DataFrame(rows).to_csv(Path(args.output) / "experiments.csv", index=False)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,242 @@
+"""
+LLM-free retrieval benchmark.
+
+Every question of evals/questions_dataset.csv is sent through
+AsyncAgent_Tools.search (the real query body and index mapping) against
+the embedded index or a local Elasticsearch, and the ranked papers are
+scored with recall@k, MRR and nDCG@k.
+
+The dataset has no relevance labels, so by default they come from the
+logged runs: the papers an agent cited in its final references for that
+question are the relevant ones. The corpus is the set of chunks the logged
+searches returned, or a --corpus .jsonl of chunk documents (e.g. the same
+papers chunked differently). A --labels .jsonl of
+{"question": ..., "relevant": [arxiv ids]} overrides the logged labels.
+
+Search returns chunks; for each k the top k chunks are collapsed into
+papers (first rank wins), which is what the agent sees with
+max_results=k.
+
+    python -m evals.retrieval_benchmark --k 3 5 10
+"""
+import argparse
+import asyncio
+import csv
+import json
+import math
+import re
+import time
+from pathlib import Path
+from types import SimpleNamespace
+
+from elasticsearch import NotFoundError
+
+from embedded_index import EmbeddedElasticsearch
+from monitoring.log_query import Reservoir, query_entries
+from monitoring.replay import RecordedRun, unique_documents
+from tools import AsyncAgent_Tools, FetchQuery
+
+EVALS_DIR = Path(__file__).parent
+QUESTIONS_FILE = EVALS_DIR / "questions_dataset.csv"
+LOG_FOLDERS = [EVALS_DIR / "latest_evals" / "eval_logs", EVALS_DIR / "ground_truth" / "ground_truth_eval_logs"]
+BENCHMARK_INDEX = "arxiv_chunks_benchmark"
+
+ARXIV_ID = re.compile(r"arxiv\.org/(?:abs|pdf)/([^/?#\s]+?)(?:\.pdf)?$")
+
+
+def normalize(question: str) -> str:
+    return " ".join(question.lower().split())
+
+
+def load_questions(path=QUESTIONS_FILE) -> list[str]:
+    # answers in the csv span several lines, only rows with a question count
+    with open(path, newline="") as f:
+        rows = csv.DictReader(f, skipinitialspace=True)
+        return [row["questions"].strip() for row in rows if (row.get("questions") or "").strip()]
+
+
+def logged_question(run: RecordedRun) -> str:
+    """The user's question out of the orchestrator prompt."""
+    match = re.search(r"Current query:(.*)", run.user_prompt)
+    return (match.group(1) if match else run.user_prompt).strip()
+
+
+def arxiv_id(url: str) -> str | None:
+    match = ARXIV_ID.search(url.strip())
+    return match.group(1) if match else None
+
+
+def labels_from_runs(runs: list[RecordedRun]) -> dict[str, set[str]]:
+    """Question -> arXiv ids the agent cited for it, over all logged runs."""
+    labels = {}
+    for run in runs:
+        output = run.final_output or {}
+        ids = {arxiv_id(r.get("url", "")) for r in output.get("references", [])} - {None}
+        if ids:
+            labels.setdefault(normalize(logged_question(run)), set()).update(ids)
+    return labels
+
+
+def load_labels(path) -> dict[str, set[str]]:
+    with open(path) as f:
+        records = [json.loads(line) for line in f if line.strip()]
+    return {normalize(r["question"]): set(r["relevant"]) for r in records}
+
+
+def load_corpus(path) -> list[dict]:
+    with open(path) as f:
+        return [json.loads(line) for line in f if line.strip()]
+
+
+def ranked_papers(chunks: list[dict]) -> list[str]:
+    papers = []
+    for chunk in chunks:
+        if chunk.get("id") not in papers:
+            papers.append(chunk.get("id"))
+    return papers
+
+
+def recall_at_k(ranked: list[str], relevant: set[str]) -> float:
+    return len(relevant.intersection(ranked)) / len(relevant)
+
+
+def reciprocal_rank(ranked: list[str], relevant: set[str]) -> float:
+    for rank, paper in enumerate(ranked, start=1):
+        if paper in relevant:
+            return 1 / rank
+    return 0.0
+
+
+def ndcg_at_k(ranked: list[str], relevant: set[str], k: int) -> float:
+    dcg = sum(1 / math.log2(rank + 1) for rank, paper in enumerate(ranked, start=1) if paper in relevant)
+    ideal = sum(1 / math.log2(rank + 1) for rank in range(1, min(len(relevant), k) + 1))
+    return dcg / ideal
+
+
+def score_query(chunks: list[dict], relevant: set[str], ks: list[int]) -> dict:
+    scores = {}
+    for k in ks:
+        ranked = ranked_papers(chunks[:k])
+        scores[k] = {
+            "recall": recall_at_k(ranked, relevant),
+            "mrr": reciprocal_rank(ranked, relevant),
+            "ndcg": ndcg_at_k(ranked, relevant, k),
+        }
+    return scores
+
+
+async def run_benchmark(
+    questions: list[str],
+    labels: dict[str, set[str]],
+    corpus: list[dict],
+    es_index=None,
+    ks: list[int] = (3, 5, 10),
+) -> dict:
+    """
+    Index `corpus` into a fresh benchmark index on `es_index` (embedded by
+    default) and score every labeled question. Returns the mean metrics per
+    k, search latency percentiles, the index size and per-query results.
+    """
+    ks = sorted(ks)
+    tools = AsyncAgent_Tools(es_index=es_index or EmbeddedElasticsearch(), max_results=ks[-1], http_client=SimpleNamespace())
+    tools.index_name = BENCHMARK_INDEX
+    try:
+        await tools.index.indices.delete(index=tools.index_name)
+    except NotFoundError:
+        pass
+    await tools.bootstrap()
+
+    started = time.perf_counter()
+    indexed = await tools.index_docs(corpus)
+    if hasattr(tools.index.indices, "refresh"):
+        await tools.index.indices.refresh(index=tools.index_name)
+    index_seconds = time.perf_counter() - started
+
+    latency = Reservoir()
+    results = []
+    try:
+        for question in questions:
+            relevant = labels.get(normalize(question))
+            if not relevant:
+                continue
+            started = time.perf_counter()
+            chunks = await tools.search(FetchQuery(query=question, paper_name=""))
+            seconds = time.perf_counter() - started
+            latency.add(seconds)
+            results.append({
+                "question": question,
+                "relevant": sorted(relevant),
+                "retrieved": ranked_papers(chunks),
+                "seconds": seconds,
+                "scores": score_query(chunks, relevant, ks),
+            })
+    finally:
+        await tools.index.close()
+
+    return {
+        "queries": len(results),
+        "unlabeled": len(questions) - len(results),
+        "metrics": {
+            k: {
+                metric: sum(r["scores"][k][metric] for r in results) / len(results) if results else None
+                for metric in ("recall", "mrr", "ndcg")
+            }
+            for k in ks
+        },
+        "latency": latency.percentiles((50, 90, 99)),
+        "index": {
+            "chunks": indexed,
+            "papers": len({doc.get("id") for doc in corpus}),
+            "source_bytes": sum(len(json.dumps(doc, ensure_ascii=False).encode("utf-8")) for doc in corpus),
+            "index_seconds": index_seconds,
+        },
+        "results": results,
+    }
+
+
+def format_report(report: dict) -> str:
+    index = report["index"]
+    lines = [
+        f"{report['queries']} labeled queries ({report['unlabeled']} without labels skipped)",
+        f"index: {index['chunks']} chunks, {index['papers']} papers, "
+        f"{index['source_bytes'] / 1e6:.2f} MB source, indexed in {index['index_seconds']:.2f}s",
+        "",
+        f"{'k':>4} {'recall':>8} {'mrr':>8} {'ndcg':>8}",
+    ]
+    for k, m in report["metrics"].items():
+        if m["recall"] is None:
+            continue
+        lines.append(f"{k:>4} {m['recall']:8.3f} {m['mrr']:8.3f} {m['ndcg']:8.3f}")
+    lines.append("")
+    lines.append("search latency: " + "  ".join(
+        f"{q} {v * 1000:.1f}ms" for q, v in report["latency"].items() if v is not None
+    ))
+    return "\n".join(lines)
+
+
+async def main():
+    arg_parser = argparse.ArgumentParser(description="Score search against labeled questions, no LLM calls")
+    arg_parser.add_argument("--questions", default=QUESTIONS_FILE)
+    arg_parser.add_argument("--logs", nargs="+", default=LOG_FOLDERS, help="logged runs the labels and corpus come from")
+    arg_parser.add_argument("--labels", help="jsonl of {question, relevant} overriding the logged labels")
+    arg_parser.add_argument("--corpus", help="jsonl of chunk documents to index instead of the logged chunks")
+    arg_parser.add_argument("--k", type=int, nargs="+", default=[3, 5, 10])
+    arg_parser.add_argument("--es-url", help="benchmark a local Elasticsearch instead of the embedded index")
+    arg_parser.add_argument("--json", action="store_true")
+    args = arg_parser.parse_args()
+
+    runs = [RecordedRun(entry) for folder in args.logs for entry in query_entries(folder)]
+    labels = load_labels(args.labels) if args.labels else labels_from_runs(runs)
+    corpus = load_corpus(args.corpus) if args.corpus else unique_documents(runs)
+
+    es_index = None
+    if args.es_url:
+        from elasticsearch import AsyncElasticsearch
+        es_index = AsyncElasticsearch(args.es_url)
+
+    report = await run_benchmark(load_questions(args.questions), labels, corpus, es_index, args.k)
+    print(json.dumps(report, indent=2) if args.json else format_report(report))
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
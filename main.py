@@ -1,9 +1,15 @@
+import argparse
 import asyncio
-from agents import create_agents, NamedCallback
+import atexit
+import csv
+from agents import ES_URL, create_agents, NamedCallback, agent_span
+from elasticsearch import AsyncElasticsearch
 from toyaikit.chat.interface import StdOutputInterface
 from pydantic_ai.messages import ModelMessage
 from toyaikit.chat.runners import PydanticAIRunner
-from monitoring.agent_logging import log_run, save_log, create_log_entry
+from monitoring.agent_logging import log_run, save_log, save_message, create_log_entry
+from tools import AsyncAgent_Tools, shutdown_process_pool
+import secrets
 import asyncio
 from openai import BadRequestError
 
@@ -14,20 +20,15 @@ class LoggingStdOutputInterface(StdOutputInterface):
     def __init__(self):
         super().__init__()
         self._captured_messages = []
+        self.run_id = f"{get_agent().name}_partial_{secrets.token_hex(3)}"
 
     def send_message(self, message: ModelMessage):
         # Call the original StdOutputInterface behavior (prints to stdout)
         # super().send_message(message)
         self._captured_messages.append(message)
         
-        # Save partial log
-        log_entry = create_log_entry(
-            agent=agent,
-            messages=self._captured_messages,
-            usage=None,  # or partial usage if available
-            output=""
-        )
-        save_log(log_entry)
+        # Append only the new message to the partial log
+        save_message(self.run_id, get_agent().name, message)
 
     @property
     def captured_messages(self):
@@ -57,30 +58,136 @@ async def run_agent_with_logging(agent, runner):
     )
 
     # Save log
-    log_file = save_log(log_entry)
-    print(f"Log saved to: {log_file}")
+    run_id = save_log(log_entry)
+    print(f"Log queued as run: {run_id}")
 
     return result
     
-agent = create_agents()
-agent_callback = NamedCallback(agent)
+_agent = None
+_tools = None
+
 
+def get_agent():
+    # Built on first use, so importing main creates no ES/HTTP clients and needs no API key
+    global _agent, _tools
+    if _agent is None:
+        _tools = AsyncAgent_Tools(es_index=AsyncElasticsearch(ES_URL))
+        _agent = create_agents(_tools)
+    return _agent
 
 
 async def run_agent(user_prompt: str):
-    results = await agent.run(
-            user_prompt=user_prompt,
-            event_stream_handler=agent_callback
-    )
+    agent = get_agent()
+    with agent_span(agent):
+        results = await agent.run(
+                user_prompt=user_prompt,
+                event_stream_handler=NamedCallback(agent)
+        )
 
     return results
 
 
+# One loop for every sync call, so the agent's async ES/HTTP clients
+# are not bound to a loop that asyncio.run has already closed
+_runner = None
+
+
+def get_runner() -> asyncio.Runner:
+    global _runner
+    if _runner is None:
+        _runner = asyncio.Runner()
+        atexit.register(close_runner)
+    return _runner
+
+
+def close_runner():
+    """Close the agent's clients on the loop they were used on, then the loop and the process pool."""
+    global _runner, _agent, _tools
+    if _runner is None:
+        return
+    try:
+        if _tools is not None:
+            _runner.run(_tools.aclose())
+    finally:
+        _runner.close()
+        _runner = _agent = _tools = None
+        shutdown_process_pool()
+
+
 def run_sync_agent(user_prompt: str):
-    return asyncio.run(run_agent(user_prompt))
+    return get_runner().run(run_agent(user_prompt))
+
+
+async def run_agent_batch(questions: list[str], max_concurrency: int = 4, batch_agent=None, admission=None, client_id: str = "batch"):
+    """
+    Run many questions through one shared agent with bounded concurrency.
+
+    Args:
+        questions: user prompts, one agent run each.
+        max_concurrency: how many runs may be in flight at once.
+        batch_agent: agent to use, defaults to get_agent().
+        admission: optional AdmissionController; every run then holds its
+            own ticket for client_id, so batch runs count against the same
+            global and per-client limits as chats.
+
+    Yields:
+        One dict per question, in completion order, with its index,
+        question and either the run result and logged run_id or an error.
+    """
+    batch_agent = batch_agent or get_agent()
+    semaphore = asyncio.Semaphore(max_concurrency)
+
+    async def run_one(index, question):
+        async with semaphore:
+            ticket = None
+            if admission is not None:
+                try:
+                    ticket = await admission.acquire(client_id)
+                except Exception as e:
+                    # rejected (client limit, queue full or timeout), the rest of the batch goes on
+                    return {"index": index, "question": question, "error": f"admission: {e}"}
+            try:
+                with agent_span(batch_agent) as run_span:
+                    callback = NamedCallback(batch_agent)
+                    try:
+                        result = await batch_agent.run(
+                            user_prompt=question,
+                            event_stream_handler=callback
+                        )
+                    except Exception as e:
+                        run_span.record_exception(e)
+                        return {"index": index, "question": question, "error": str(e)}
+
+                    run_id = save_log(log_run(batch_agent, result, callback.tool_timings))
+            finally:
+                if ticket is not None:
+                    admission.release(ticket)
+        return {"index": index, "question": question, "result": result, "run_id": run_id}
+
+    tasks = [asyncio.create_task(run_one(i, q)) for i, q in enumerate(questions)]
+    try:
+        for task in asyncio.as_completed(tasks):
+            yield await task
+    finally:
+        # stop outstanding runs if the consumer goes away early
+        for task in tasks:
+            task.cancel()
+
+
+def read_questions(path: str) -> list[str]:
+    with open(path, newline="", encoding="utf-8") as f:
+        return [row["questions"].strip() for row in csv.DictReader(f)]
+
+
+async def run_questions_file(path: str, max_concurrency: int = 4):
+    questions = read_questions(path)
+    async for item in run_agent_batch(questions, max_concurrency=max_concurrency):
+        status = item.get("run_id") or f"ERROR: {item['error']}"
+        print(f"[{item['index']}] {item['question']} -> {status}")
 
 
 async def main():
+    agent = get_agent()
     chat_interface = StdOutputInterface()
     # StdOutputInterface()
 
@@ -100,4 +207,12 @@ async def main():
     # print(output)
 
 if __name__ == "__main__":
-    asyncio.run(main())
\ No newline at end of file
+    arg_parser = argparse.ArgumentParser()
+    arg_parser.add_argument("--batch", help="csv file with a 'questions' column to run in one go")
+    arg_parser.add_argument("--concurrency", type=int, default=4)
+    args = arg_parser.parse_args()
+
+    if args.batch:
+        get_runner().run(run_questions_file(args.batch, args.concurrency))
+    else:
+        asyncio.run(main())
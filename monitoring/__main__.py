@@ -0,0 +1,126 @@
+"""
+Query and aggregate agent logs without loading them all into memory.
+
+    python -m monitoring query --agent orchestrator --tool get_data_to_index
+    python -m monitoring stats --since 2025-12-18 --folder evals/latest_evals/eval_logs
+    python -m monitoring trace <trace_id> --file monitoring/traces/spans.jsonl
+    python -m monitoring replay --folder evals/latest_evals/eval_logs
+    python -m monitoring latency --folder evals/latest_evals/eval_logs
+"""
+import argparse
+import asyncio
+import json
+
+from monitoring.latency import analyze_latency, build_timeline, format_flame, format_folded, format_timeline
+from monitoring.log_query import LogFilter, aggregate_runs, query_entries, query_runs
+from monitoring.tracing import format_trace, read_trace
+
+
+def add_filter_args(parser: argparse.ArgumentParser):
+    parser.add_argument("--folder", default="monitoring/logs", help="log folder (legacy .json files and/or segments)")
+    parser.add_argument("--agent")
+    parser.add_argument("--model")
+    parser.add_argument("--tool", help="only runs that called this tool")
+    parser.add_argument("--since", help="ISO date or datetime, inclusive")
+    parser.add_argument("--until", help="ISO date or datetime, inclusive")
+    parser.add_argument("--errors", action="store_true", help="only runs with errors or retries")
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="python -m monitoring")
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    query = commands.add_parser("query", help="print one JSON line per matching run")
+    add_filter_args(query)
+    query.add_argument("--limit", type=int)
+
+    stats = commands.add_parser("stats", help="aggregate matching runs in a single pass")
+    add_filter_args(stats)
+
+    trace = commands.add_parser("trace", help="print the span tree of one trace")
+    trace.add_argument("trace_id", help="trace_id of a stored run log or X-Trace-ID response header")
+    trace.add_argument("--file", default="monitoring/traces/spans.jsonl", help="JSONL file written with TRACE_FILE")
+
+    latency = commands.add_parser("latency", help="model vs tool time and round trips from message timestamps")
+    add_filter_args(latency)
+    latency.add_argument("--folded", action="store_true", help="print folded stacks for flamegraph tools instead")
+    latency.add_argument("--json", action="store_true", help="print the full percentile report as JSON")
+    latency.add_argument("--timelines", action="store_true", help="print the timeline of every matching run")
+
+    replay = commands.add_parser("replay", help="re-run logged runs offline with recorded model responses")
+    add_filter_args(replay)
+    replay.add_argument("--limit", type=int)
+    replay.add_argument("--es-url", help="replay against this Elasticsearch instead of the embedded index")
+    replay.add_argument("--seed-index", action="store_true", help="index every recorded chunk before replaying")
+    replay.add_argument("--recorded-latency", action="store_true", help="sleep for the recorded model latency of each step")
+
+    return parser
+
+
+def get_filter(args) -> LogFilter:
+    return LogFilter(
+        agent=args.agent,
+        model=args.model,
+        tool=args.tool,
+        since=args.since,
+        until=args.until,
+        errors_only=args.errors,
+    )
+
+
+def format_percentiles(stats: dict) -> str:
+    return "  ".join(f"{k} {v:.2f}" for k, v in stats.items() if k.startswith("p") and v is not None)
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+
+    if args.command == "query":
+        for i, run in enumerate(query_runs(args.folder, get_filter(args))):
+            if args.limit is not None and i >= args.limit:
+                break
+            print(run.model_dump_json())
+
+    elif args.command == "stats":
+        print(json.dumps(aggregate_runs(args.folder, get_filter(args)), indent=2))
+
+    elif args.command == "trace":
+        spans = read_trace(args.file, args.trace_id)
+        print(format_trace(spans) if spans else f"no spans for trace {args.trace_id} in {args.file}")
+
+    elif args.command == "latency":
+        if args.timelines:
+            for entry in query_entries(args.folder, get_filter(args)):
+                print(format_timeline(build_timeline(entry)))
+            return
+        report = analyze_latency(args.folder, get_filter(args))
+        if args.folded:
+            print(format_folded(report))
+        elif args.json:
+            print(json.dumps(report, indent=2))
+        else:
+            print(format_flame(report))
+            print(f"\n{report['runs']} runs ({report['split_runs']} split into model and tool time)")
+            print(f"run seconds: {format_percentiles(report['run_seconds'])}")
+            print(f"round trips: {format_percentiles(report['round_trips'])}")
+            for name, stage in report["stages"].items():
+                print(f"{name}: {format_percentiles(stage)}")
+
+    elif args.command == "replay":
+        # imported here so query/stats do not load the agents and tools
+        from monitoring.replay import load_runs, replay_runs
+        from embedded_index import EmbeddedElasticsearch
+
+        if args.es_url:
+            from elasticsearch import AsyncElasticsearch
+            es_index = AsyncElasticsearch(args.es_url)
+        else:
+            es_index = EmbeddedElasticsearch()
+
+        runs = load_runs(args.folder, get_filter(args), args.limit)
+        report = asyncio.run(replay_runs(runs, es_index, args.seed_index, args.recorded_latency))
+        print(json.dumps(report, indent=2))
+
+
+if __name__ == "__main__":
+    main()
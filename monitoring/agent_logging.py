@@ -14,6 +14,9 @@ from pydantic_ai.messages import ModelMessagesTypeAdapter
 from datetime import datetime
 from pydantic import BaseModel, HttpUrl
 from agents import SearchResultSummary
+from monitoring.log_writer import get_log_writer
+from monitoring.log_store import iter_logs
+from monitoring.tracing import current_span
 
 UsageTypeAdapter = pydantic.TypeAdapter(RunUsage)
 
@@ -29,7 +32,8 @@ def create_log_entry(
     agent: Agent,
     messages: List[ModelMessage],
     usage: RunUsage,
-    output: SearchResultSummary
+    output: SearchResultSummary,
+    tool_timings: list | None = None
 ):
     tools = []
     
@@ -47,12 +51,14 @@ def create_log_entry(
         "tools": tools,
         "messages": dict_messages,
         "usage": dict_usage,
+        "tool_timings": [t.model_dump() for t in tool_timings or []],
         "output": output,
     }
 
 def log_run(
     agent: Agent,
-    result: AgentRunResult
+    result: AgentRunResult,
+    tool_timings: list | None = None
 ):
     output: SearchResultSummary = result.output
     usage = result.usage()
@@ -62,7 +68,8 @@ def log_run(
         agent=agent,
         messages=messages,
         usage=usage,
-        output=output.model_dump(mode="json")
+        output=output.model_dump(mode="json"),
+        tool_timings=tool_timings
     )
 
     return log
@@ -81,23 +88,57 @@ def find_last_timestamp(messages):
             return msg['timestamp']
         
 
-def save_log(entry: dict):
-    logs_folder = Path('monitoring/logs')
-    logs_folder.mkdir(exist_ok=True)
-
-    ts = find_last_timestamp(entry['messages'])
+def make_run_id(entry: dict, ts: datetime):
     ts_str = ts.strftime("%Y%m%d_%H%M%S")
     rand_hex = secrets.token_hex(3)
-    print("DEBUG output type:", type(entry["output"]), entry["output"])
     agent_name = entry['agent_name'].replace(" ", "_").lower()
 
-    filename = f"{agent_name}_{ts_str}_{rand_hex}.json"
-    filepath = logs_folder / filename
+    return f"{agent_name}_{ts_str}_{rand_hex}"
+
+
+def trace_context() -> dict:
+    # links a stored log to the spans of the request that produced it
+    span = current_span()
+    if span is None:
+        return {}
+    return {"trace_id": span.trace_id, "span_id": span.span_id}
+
+
+def save_log(entry: dict):
+    """
+    Queue a run log for the background writer and return its run_id.
+
+    Entries are appended to compressed segments in monitoring/logs; the
+    write happens off the calling thread.
+    """
+    ts = find_last_timestamp(entry['messages']) or datetime.now()
+    entry = {"kind": "run", "run_id": make_run_id(entry, ts), "timestamp": ts.isoformat(), **trace_context(), **entry}
+    get_log_writer(serializer=serializer).write(entry)
+
+    return entry["run_id"]
+
+
+def save_message(run_id: str, agent_name: str, message: ModelMessage):
+    """Append a single message of a run that is still in progress."""
+    entry = {
+        "kind": "message",
+        "run_id": run_id,
+        "timestamp": datetime.now().isoformat(),
+        "agent_name": agent_name,
+        **trace_context(),
+        "message": ModelMessagesTypeAdapter.dump_python([message])[0],
+    }
+    get_log_writer(serializer=serializer).write(entry)
 
-    with filepath.open("w", encoding="utf-8") as f_out:
-        json.dump(entry, f_out, indent=2, default=serializer)
 
-    return filepath
+def read_logs(folder):
+    """
+    Yield the run logs under `folder`, from both the legacy one-file-per-run
+    .json files and the segments written by save_log. Entries are yielded
+    one at a time with their agent config filled back in.
+    """
+    return iter_logs(folder)
+
 
 async def log_streamed_run(
     agent: Agent,
@@ -114,4 +155,4 @@ async def log_streamed_run(
         output=output
     )
 
-    return log
\ No newline at end of file
+    return log
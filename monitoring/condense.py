@@ -0,0 +1,142 @@
+"""
+Compact text rendering of a run log for eval and judge prompts.
+
+Instead of the whole log dict (system prompt, tool definitions and every
+5000 character chunk), the condensed log keeps the question, the tool
+calls in order with their arguments, the tool results truncated and with
+repeated search hits replaced by a back reference, the final output and
+usage. Results are shortened step by step until the text fits the token
+budget.
+"""
+import hashlib
+import json
+
+from monitoring.tokens import count_tokens
+
+DEFAULT_MAX_TOKENS = 4000
+DEFAULT_MAX_RESULT_CHARS = 400
+
+
+def _shorten(text: str, limit: int) -> str:
+    text = " ".join(str(text).split())
+    if len(text) <= limit:
+        return text
+    return text[:max(limit, 0)] + f"... [{len(text) - limit} more chars]"
+
+
+def _compact_json(value) -> str:
+    if isinstance(value, str):
+        try:
+            value = json.loads(value)
+        except json.JSONDecodeError:
+            return value
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=str)
+
+
+def _doc_key(doc: dict) -> str:
+    data = f"{doc.get('id')}\0{doc.get('content', '')}"
+    return hashlib.sha1(data.encode("utf-8")).hexdigest()
+
+
+def _question(messages: list[dict]) -> str:
+    for message in messages:
+        for part in message.get("parts", []):
+            if part.get("part_kind") == "user-prompt":
+                content = part.get("content")
+                return content if isinstance(content, str) else _compact_json(content)
+    return ""
+
+
+def _steps(messages: list[dict]) -> list[dict]:
+    """Tool calls in call order, each with its return or retry prompt."""
+    steps = []
+    by_id = {}
+    for message in messages:
+        for part in message.get("parts", []):
+            kind = part.get("part_kind")
+            if kind == "tool-call":
+                step = {"tool": part.get("tool_name"), "args": part.get("args"), "kind": None, "result": None}
+                steps.append(step)
+                by_id[part.get("tool_call_id")] = step
+            elif kind in ("tool-return", "retry-prompt"):
+                step = by_id.get(part.get("tool_call_id"))
+                if step is not None:
+                    step["kind"] = kind
+                    step["result"] = part.get("content")
+    return steps
+
+
+def _render_result(step: dict, index: int, seen: dict, limit: int) -> list[str]:
+    result = step["result"]
+    if step["kind"] is None:
+        return ["   -> (no result)"]
+    if step["kind"] == "retry-prompt":
+        return [f"   -> retry: {_shorten(_compact_json(result), limit)}"]
+
+    if isinstance(result, list) and all(isinstance(d, dict) for d in result):
+        lines = [f"   -> {len(result)} results"]
+        for j, doc in enumerate(result, start=1):
+            key = _doc_key(doc)
+            title = _shorten(doc.get("title", ""), 120)
+            if key in seen:
+                lines.append(f"     - [{doc.get('id')}] {title} (same as {seen[key]})")
+                continue
+            seen[key] = f"#{index}.{j}"
+            lines.append(f"     - #{index}.{j} [{doc.get('id')}] {title}")
+            if limit > 0 and doc.get("content"):
+                lines.append(f"       {_shorten(doc['content'], limit)}")
+        return lines
+
+    if result is None:
+        return ["   -> None"]
+    return [f"   -> {_shorten(_compact_json(result), max(limit, 200))}"]
+
+
+def render_log(entry: dict, max_result_chars: int = DEFAULT_MAX_RESULT_CHARS) -> str:
+    messages = entry.get("messages") or []
+    lines = [f"QUESTION: {_question(messages)}", "TOOL CALLS:"]
+
+    seen = {}
+    steps = _steps(messages)
+    for index, step in enumerate(steps, start=1):
+        args = _shorten(_compact_json(step["args"] or {}), max(max_result_chars, 200))
+        lines.append(f"{index}. {step['tool']}({args})")
+        if step["tool"] != "final_result":
+            lines.extend(_render_result(step, index, seen, max_result_chars))
+    if not steps:
+        lines.append("(none)")
+
+    if entry.get("output") is not None:
+        lines.append(f"OUTPUT: {_compact_json(entry['output'])}")
+    usage = entry.get("usage") or {}
+    if usage:
+        lines.append(
+            f"USAGE: {usage.get('requests')} requests, {usage.get('input_tokens')} input tokens, "
+            f"{usage.get('output_tokens')} output tokens"
+        )
+    return "\n".join(lines)
+
+
+def condense_log(entry: dict, max_tokens: int = DEFAULT_MAX_TOKENS, max_result_chars: int = DEFAULT_MAX_RESULT_CHARS) -> str:
+    """
+    Render `entry` (a run log, or any dict with "messages" in the logged
+    format and optionally "output" and "usage") within `max_tokens`
+    tiktoken tokens.
+
+    Tool results are shortened first (halving the characters kept per
+    result down to none); if that is still too long the text is cut.
+    """
+    limit = max_result_chars
+    while True:
+        text = render_log(entry, limit)
+        if count_tokens(text) <= max_tokens:
+            return text
+        if limit == 0:
+            break
+        limit //= 2
+
+    # still over budget, e.g. a very long output; cut proportionally
+    keep = int(len(text) * max_tokens / count_tokens(text))
+    while keep > 0 and count_tokens(text[:keep]) > max_tokens - 10:
+        keep = int(keep * 0.9)
+    return text[:keep] + "\n[... log truncated to fit the token budget]"
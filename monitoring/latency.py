@@ -0,0 +1,195 @@
+"""
+Latency analytics reconstructed from the timestamps in stored run logs.
+
+A run is a sequence of LLM round trips: the model answers a request with
+tool calls, the tools run, and their returns form the next request. The
+user prompt and tool-return parts are timestamped when they are created,
+so the time between two requests is one round trip (model + tools).
+
+Response timestamps are the provider's creation time (whole seconds, at
+the start of generation), so they cannot split a round trip. Logs that
+carry tool_timings (written with NamedCallback timings) are split into
+model time and time per tool. Older logs report the round trip as
+"round_trip:<tools>". A round trip whose only call is final_result is
+all model time.
+"""
+from collections import defaultdict
+
+from pydantic import BaseModel
+
+from monitoring.log_query import LogFilter, Reservoir, parse_timestamp, query_entries
+
+OUTPUT_TOOLS = {"final_result"}
+
+
+class TimelineStep(BaseModel):
+    index: int
+    start: str
+    seconds: float
+    tool_calls: list[str]
+    model_seconds: float | None   # None when the round trip cannot be split
+    stages: dict[str, float]      # wall time per stage, sums to seconds
+    calls: dict[str, list[float]] = {}  # seconds of each tool invocation
+
+
+class RunTimeline(BaseModel):
+    run_id: str | None
+    agent_name: str | None
+    start: str | None
+    seconds: float
+    round_trips: int
+    split: bool  # every round trip was split into model and tool time
+    steps: list[TimelineStep]
+
+
+def _request_end(message: dict):
+    timestamps = [parse_timestamp(p.get("timestamp")) for p in message.get("parts", [])]
+    timestamps = [t for t in timestamps if t is not None]
+    return max(timestamps) if timestamps else None
+
+
+def _make_step(index: int, response: dict, start, end, timings: dict) -> TimelineStep:
+    seconds = max((end - start).total_seconds(), 0.0)
+    call_parts = [p for p in response.get("parts", []) if p.get("part_kind") == "tool-call"]
+    names = [p.get("tool_name") for p in call_parts]
+    tool_parts = [p for p in call_parts if p.get("tool_name") not in OUTPUT_TOOLS]
+
+    step = TimelineStep(index=index, start=start.isoformat(), seconds=seconds, tool_calls=names, model_seconds=None, stages={})
+    if not tool_parts:
+        step.model_seconds = seconds
+        step.stages = {"model": seconds}
+        return step
+
+    measured = [timings.get(p.get("tool_call_id")) for p in tool_parts]
+    if any(t is None for t in measured):
+        step.stages = {"round_trip:" + "+".join(sorted({p["tool_name"] for p in tool_parts})): seconds}
+        return step
+
+    # parallel calls overlap: the step waited for the slowest one, which is
+    # shared between the tools in proportion to their own durations
+    tool_wall = min(max(t["seconds"] for t in measured), seconds)
+    total_tool = sum(t["seconds"] for t in measured) or 1.0
+    step.model_seconds = seconds - tool_wall
+    step.stages = {"model": step.model_seconds}
+    for t in measured:
+        stage = f"tool:{t['tool_name']}"
+        step.stages[stage] = step.stages.get(stage, 0.0) + tool_wall * t["seconds"] / total_tool
+        step.calls.setdefault(stage, []).append(t["seconds"])
+    return step
+
+
+def build_timeline(entry: dict) -> RunTimeline:
+    timings = {t["tool_call_id"]: t for t in entry.get("tool_timings") or []}
+    steps = []
+    round_trips = 0
+    first = last = None
+    pending = None  # the response waiting for the request that carries its tool returns
+
+    for message in entry.get("messages", []):
+        if message.get("kind") == "response":
+            round_trips += 1
+            pending = message
+            continue
+
+        end = _request_end(message)
+        if end is None:
+            continue
+        if pending is not None and last is not None:
+            steps.append(_make_step(len(steps), pending, last, end, timings))
+        pending = None
+        first = first or end
+        last = end
+
+    return RunTimeline(
+        run_id=entry.get("run_id"),
+        agent_name=entry.get("agent_name"),
+        start=first.isoformat() if first else None,
+        seconds=(last - first).total_seconds() if first else 0.0,
+        round_trips=round_trips,
+        split=all(s.model_seconds is not None for s in steps),
+        steps=steps,
+    )
+
+
+class LatencyAggregator:
+
+    def __init__(self, sample_size: int = 10000):
+        self.runs = 0
+        self.split_runs = 0
+        self.run_seconds = Reservoir(sample_size)
+        self.round_trips = Reservoir(sample_size)
+        self.model_seconds_per_run = Reservoir(sample_size)
+        self.stage_totals = defaultdict(float)
+        self.stage_samples = defaultdict(lambda: Reservoir(sample_size))
+
+    def add(self, timeline: RunTimeline):
+        self.runs += 1
+        self.run_seconds.add(timeline.seconds)
+        self.round_trips.add(timeline.round_trips)
+        if timeline.split:
+            self.split_runs += 1
+            self.model_seconds_per_run.add(sum(s.model_seconds for s in timeline.steps))
+
+        for step in timeline.steps:
+            for stage, seconds in step.stages.items():
+                self.stage_totals[stage] += seconds
+                # tools are sampled per invocation, everything else per round trip
+                for sample in step.calls.get(stage, [seconds]):
+                    self.stage_samples[stage].add(sample)
+
+    def result(self) -> dict:
+        total = sum(self.stage_totals.values())
+        return {
+            "runs": self.runs,
+            "split_runs": self.split_runs,
+            "run_seconds": self.run_seconds.percentiles(),
+            "round_trips": self.round_trips.percentiles((50, 90, 99)),
+            "model_seconds_per_run": self.model_seconds_per_run.percentiles(),
+            "stages": {
+                stage: {
+                    "total_seconds": seconds,
+                    "share": seconds / total if total else 0.0,
+                    "samples": self.stage_samples[stage].seen,
+                    **self.stage_samples[stage].percentiles((50, 90, 99)),
+                }
+                for stage, seconds in sorted(self.stage_totals.items(), key=lambda item: -item[1])
+            },
+        }
+
+
+def analyze_latency(folder, log_filter: LogFilter | None = None) -> dict:
+    aggregator = LatencyAggregator()
+    for entry in query_entries(folder, log_filter):
+        aggregator.add(build_timeline(entry))
+    return aggregator.result()
+
+
+def format_flame(report: dict, width: int = 40) -> str:
+    """Text flame summary: every stage as a bar proportional to its share of all run time."""
+    stages = report["stages"]
+    total = sum(s["total_seconds"] for s in stages.values())
+    label_width = max([len(name) + 2 for name in stages] + [len("all runs")])
+
+    lines = [f"{'all runs':<{label_width}} {total:10.1f}s 100.0% {'█' * width}"]
+    for name, stage in stages.items():
+        bar = "█" * round(stage["share"] * width)
+        lines.append(f"{'  ' + name:<{label_width}} {stage['total_seconds']:10.1f}s {stage['share'] * 100:5.1f}% {bar}")
+    return "\n".join(lines)
+
+
+def format_folded(report: dict) -> str:
+    """Folded stacks (milliseconds), the input format of flamegraph.pl and speedscope."""
+    return "\n".join(
+        f"all;{name.replace(':', ';', 1)} {round(stage['total_seconds'] * 1000)}"
+        for name, stage in report["stages"].items()
+    )
+
+
+def format_timeline(timeline: RunTimeline) -> str:
+    lines = [f"{timeline.run_id}  {timeline.seconds:.1f}s  {timeline.round_trips} round trips"]
+    offset = 0.0
+    for step in timeline.steps:
+        stages = "  ".join(f"{name} {seconds:.2f}s" for name, seconds in step.stages.items())
+        lines.append(f"  +{offset:7.2f}s  [{', '.join(step.tool_calls)}]  {stages}")
+        offset += step.seconds
+    return "\n".join(lines)
@@ -0,0 +1,255 @@
+"""
+Streaming queries and aggregations over the agent logs.
+
+Entries are read lazily with log_store.iter_logs, so both the legacy
+per-run .json files and the segmented format work. Every aggregate is
+computed in a single pass with memory bounded by the number of distinct
+tools/days plus a fixed size sample for percentiles.
+"""
+import random
+from collections import Counter
+from datetime import datetime
+
+from pydantic import BaseModel
+
+from monitoring.log_store import iter_logs
+
+
+def parse_timestamp(value) -> datetime | None:
+    if not value:
+        return None
+    if isinstance(value, datetime):
+        return value
+    try:
+        return datetime.fromisoformat(str(value).replace("Z", "+00:00"))
+    except ValueError:
+        return None
+
+
+def message_timestamps(entry: dict) -> list[datetime]:
+    timestamps = []
+    for message in entry.get("messages", []):
+        ts = parse_timestamp(message.get("timestamp"))
+        if ts is not None:
+            timestamps.append(ts)
+        for part in message.get("parts", []):
+            ts = parse_timestamp(part.get("timestamp"))
+            if ts is not None:
+                timestamps.append(ts)
+    return timestamps
+
+
+def tool_calls(entry: dict) -> list[str]:
+    return [
+        part.get("tool_name")
+        for message in entry.get("messages", [])
+        for part in message.get("parts", [])
+        if part.get("part_kind") == "tool-call"
+    ]
+
+
+def has_error(entry: dict) -> bool:
+    if entry.get("error"):
+        return True
+    for message in entry.get("messages", []):
+        for part in message.get("parts", []):
+            if part.get("part_kind") == "retry-prompt":
+                return True
+    return not entry.get("output")
+
+
+class RunSummary(BaseModel):
+    run_id: str | None
+    trace_id: str | None = None
+    timestamp: str | None
+    agent_name: str | None
+    model: str | None
+    tool_calls: list[str]
+    tool_timings: list[dict] = []  # per invocation, only in logs written with NamedCallback timings
+    input_tokens: int
+    output_tokens: int
+    requests: int
+    duration_seconds: float | None
+    error: bool
+
+
+def summarize_run(entry: dict) -> RunSummary:
+    timestamps = message_timestamps(entry)
+    start = min(timestamps) if timestamps else parse_timestamp(entry.get("timestamp"))
+    duration = (max(timestamps) - min(timestamps)).total_seconds() if len(timestamps) > 1 else None
+    usage = entry.get("usage") or {}
+
+    return RunSummary(
+        run_id=entry.get("run_id"),
+        trace_id=entry.get("trace_id"),
+        timestamp=start.isoformat() if start else None,
+        agent_name=entry.get("agent_name"),
+        model=entry.get("model"),
+        tool_calls=tool_calls(entry),
+        tool_timings=entry.get("tool_timings") or [],
+        input_tokens=usage.get("input_tokens") or 0,
+        output_tokens=usage.get("output_tokens") or 0,
+        requests=usage.get("requests") or 0,
+        duration_seconds=duration,
+        error=has_error(entry),
+    )
+
+
+class LogFilter(BaseModel):
+    agent: str | None = None
+    model: str | None = None
+    tool: str | None = None
+    since: str | None = None   # ISO date or datetime, inclusive
+    until: str | None = None   # ISO date or datetime, inclusive
+    errors_only: bool = False
+
+    def matches(self, run: RunSummary) -> bool:
+        if self.agent and run.agent_name != self.agent:
+            return False
+        if self.model and run.model != self.model:
+            return False
+        if self.tool and self.tool not in run.tool_calls:
+            return False
+        if self.errors_only and not run.error:
+            return False
+        if run.timestamp and self.since and run.timestamp[:len(self.since)] < self.since:
+            return False
+        if run.timestamp and self.until and run.timestamp[:len(self.until)] > self.until:
+            return False
+        return True
+
+
+def query_runs(folder, log_filter: LogFilter | None = None):
+    """Lazily yield a RunSummary for every run under `folder` that matches the filter."""
+    log_filter = log_filter or LogFilter()
+    entries = iter_logs(folder, agent=log_filter.agent, since=log_filter.since, until=log_filter.until)
+    for entry in entries:
+        run = summarize_run(entry)
+        if log_filter.matches(run):
+            yield run
+
+
+def query_entries(folder, log_filter: LogFilter | None = None):
+    """Like query_runs, but yields the matching log entries themselves."""
+    log_filter = log_filter or LogFilter()
+    entries = iter_logs(folder, agent=log_filter.agent, since=log_filter.since, until=log_filter.until)
+    for entry in entries:
+        if log_filter.matches(summarize_run(entry)):
+            yield entry
+
+
+class Reservoir:
+    """Fixed size uniform sample of a stream, used for approximate percentiles."""
+
+    def __init__(self, size: int = 10000, seed: int = 0):
+        self.size = size
+        self.seen = 0
+        self.values = []
+        self._random = random.Random(seed)
+
+    def add(self, value: float):
+        self.seen += 1
+        if len(self.values) < self.size:
+            self.values.append(value)
+        else:
+            i = self._random.randrange(self.seen)
+            if i < self.size:
+                self.values[i] = value
+
+    def percentile(self, q: float) -> float | None:
+        if not self.values:
+            return None
+        ordered = sorted(self.values)
+        rank = q / 100 * (len(ordered) - 1)
+        low = int(rank)
+        high = min(low + 1, len(ordered) - 1)
+        return ordered[low] + (ordered[high] - ordered[low]) * (rank - low)
+
+    def percentiles(self, qs=(50, 90, 95, 99)) -> dict:
+        return {f"p{q}": self.percentile(q) for q in qs}
+
+
+class ToolTimeAggregator:
+
+    def __init__(self, sample_size: int = 10000):
+        self.sample_size = sample_size
+        self.calls = Counter()
+        self.seconds = Counter()
+        self.result_tokens = Counter()
+        self.samples = {}
+
+    def add(self, timing: dict):
+        tool = timing["tool_name"]
+        self.calls[tool] += 1
+        self.seconds[tool] += timing["seconds"]
+        self.result_tokens[tool] += timing.get("result_tokens") or 0
+        if tool not in self.samples:
+            self.samples[tool] = Reservoir(self.sample_size)
+        self.samples[tool].add(timing["seconds"])
+
+    def result(self) -> dict:
+        """Per tool stats, the tool with the most total time first."""
+        total = sum(self.seconds.values())
+        return {
+            tool: {
+                "calls": self.calls[tool],
+                "total_seconds": seconds,
+                "share_of_tool_time": seconds / total if total else 0.0,
+                "mean_seconds": seconds / self.calls[tool],
+                **{f"{k}_seconds": v for k, v in self.samples[tool].percentiles((50, 95)).items()},
+                "result_tokens_per_call": self.result_tokens[tool] / self.calls[tool],
+            }
+            for tool, seconds in self.seconds.most_common()
+        }
+
+
+class RunAggregator:
+
+    def __init__(self, sample_size: int = 10000):
+        self.runs = 0
+        self.errors = 0
+        self.tool_calls = Counter()
+        self.runs_per_day = Counter()
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.tokens = Reservoir(sample_size)
+        self.durations = Reservoir(sample_size)
+        self.tool_time = ToolTimeAggregator(sample_size)
+
+    def add(self, run: RunSummary):
+        self.runs += 1
+        self.errors += run.error
+        self.tool_calls.update(run.tool_calls)
+        if run.timestamp:
+            self.runs_per_day[run.timestamp[:10]] += 1
+        self.input_tokens += run.input_tokens
+        self.output_tokens += run.output_tokens
+        self.tokens.add(run.input_tokens + run.output_tokens)
+        if run.duration_seconds is not None:
+            self.durations.add(run.duration_seconds)
+        for timing in run.tool_timings:
+            self.tool_time.add(timing)
+
+    def result(self) -> dict:
+        return {
+            "runs": self.runs,
+            "errors": self.errors,
+            "tool_calls": dict(self.tool_calls.most_common()),
+            "tool_calls_per_run": sum(self.tool_calls.values()) / self.runs if self.runs else 0.0,
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+            "tokens_per_run": {
+                "mean": (self.input_tokens + self.output_tokens) / self.runs if self.runs else 0.0,
+                **self.tokens.percentiles(),
+            },
+            "duration_seconds": self.durations.percentiles(),
+            "tool_time": self.tool_time.result(),
+            "runs_per_day": dict(sorted(self.runs_per_day.items())),
+        }
+
+
+def aggregate_runs(folder, log_filter: LogFilter | None = None) -> dict:
+    aggregator = RunAggregator()
+    for run in query_runs(folder, log_filter):
+        aggregator.add(run)
+    return aggregator.result()
@@ -0,0 +1,173 @@
+"""
+On-disk layout of the agent logs written by LogWriter.
+
+    monitoring/logs/
+        configs/<hash>.json                       agent config, stored once
+        index.jsonl                               run_id -> segment, offset, timestamp, usage
+        <YYYY-MM-DD>/<agent>/segment_*.jsonl.gz   one gzip member per entry
+
+Each entry references its agent config (system prompt, provider, model,
+tools) by content hash instead of repeating it. Because every entry is its
+own gzip member, a run can be read from its index offset without
+decompressing the rest of the segment, and the segment as a whole is
+still a valid gzip file.
+"""
+import gzip
+import hashlib
+import json
+from pathlib import Path
+
+CONFIG_FIELDS = ("system_prompt", "provider", "model", "tools")
+CONFIGS_DIR = "configs"
+INDEX_FILE = "index.jsonl"
+
+
+def config_hash(config: dict, serializer=None) -> str:
+    data = json.dumps(config, sort_keys=True, default=serializer)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()[:16]
+
+
+def split_config(entry: dict) -> tuple[dict, dict]:
+    """Return (entry without the agent config fields, the agent config)."""
+    config = {k: entry[k] for k in CONFIG_FIELDS if k in entry}
+    stripped = {k: v for k, v in entry.items() if k not in CONFIG_FIELDS}
+    return stripped, config
+
+
+def partition_dir(root: Path, entry: dict) -> Path:
+    date = str(entry.get("timestamp") or "")[:10] or "undated"
+    agent_name = str(entry.get("agent_name", "unknown")).replace(" ", "_").lower()
+    return root / date / agent_name
+
+
+def index_record(entry: dict, segment: str, offset: int, length: int) -> dict:
+    usage = entry.get("usage") or {}
+    return {
+        "run_id": entry.get("run_id"),
+        "kind": entry.get("kind", "run"),
+        "agent_name": entry.get("agent_name"),
+        "timestamp": entry.get("timestamp"),
+        "trace_id": entry.get("trace_id"),
+        "segment": segment,
+        "offset": offset,
+        "length": length,
+        "input_tokens": usage.get("input_tokens"),
+        "output_tokens": usage.get("output_tokens"),
+        "requests": usage.get("requests"),
+    }
+
+
+class ConfigCache:
+    """Loads agent configs by hash, reading each config file at most once."""
+
+    def __init__(self, root: Path):
+        self.root = Path(root)
+        self._configs = {}
+
+    def get(self, digest: str) -> dict:
+        if digest not in self._configs:
+            path = self.root / CONFIGS_DIR / f"{digest}.json"
+            try:
+                with path.open(encoding="utf-8") as f_in:
+                    self._configs[digest] = json.load(f_in)
+            except FileNotFoundError:
+                self._configs[digest] = {}
+        return self._configs[digest]
+
+    def rehydrate(self, entry: dict) -> dict:
+        digest = entry.pop("config_hash", None)
+        if digest is None:
+            return entry
+        return {**self.get(digest), **entry}
+
+
+def find_root(segment_path: Path) -> Path:
+    # segments live at <root>/<date>/<agent>/segment_*.jsonl.gz
+    return Path(segment_path).parents[2]
+
+
+def iter_segment(path: Path):
+    """Yield the raw (not rehydrated) entries of one .jsonl or .jsonl.gz segment."""
+    opener = gzip.open if path.suffix == ".gz" else open
+    with opener(path, "rt", encoding="utf-8") as f_in:
+        for line in f_in:
+            if line.strip():
+                yield json.loads(line)
+
+
+def iter_index(root: str | Path):
+    path = Path(root) / INDEX_FILE
+    if not path.exists():
+        return
+    with path.open(encoding="utf-8") as f_in:
+        for line in f_in:
+            if line.strip():
+                yield json.loads(line)
+
+
+def _legacy_partition(path: Path) -> tuple[str, str]:
+    # legacy files are named <agent>_<YYYYmmdd>_<HHMMSS>_<hex>.json
+    parts = path.stem.rsplit("_", 3)
+    if len(parts) == 4 and len(parts[1]) == 8:
+        day = parts[1]
+        return f"{day[:4]}-{day[4:6]}-{day[6:]}", parts[0]
+    return "", ""
+
+
+def _outside(date: str, since: str | None, until: str | None) -> bool:
+    # partitions and filters are compared as YYYY-MM-DD strings
+    if not date:
+        return False
+    return bool((since and date < since[:10]) or (until and date > until[:10]))
+
+
+def iter_logs(folder: str | Path, agent: str | None = None, since: str | None = None, until: str | None = None):
+    """
+    Lazily yield run logs under `folder`, one at a time, from both legacy
+    one-file-per-run .json files and segments, with agent configs filled
+    back in.
+
+    `agent`, `since` and `until` prune whole date/agent partitions (and
+    legacy files by name) before anything is read; callers still need to
+    filter entries for exact timestamps.
+    """
+    folder = Path(folder)
+    configs = {}
+    for path in sorted(folder.rglob("*")):
+        relative = path.relative_to(folder).parts
+        if CONFIGS_DIR in relative[:-1] or not path.is_file():
+            continue
+
+        if path.suffix == ".json":
+            date, agent_name = _legacy_partition(path)
+            if _outside(date, since, until) or (agent and agent_name and agent_name != agent):
+                continue
+            with path.open(encoding="utf-8") as f_in:
+                entry = json.load(f_in)
+            entry.setdefault("run_id", path.stem)
+            yield entry
+
+        elif path.name.startswith("segment_") and path.name.endswith((".jsonl", ".jsonl.gz")):
+            root = find_root(path)
+            date, agent_name = path.parent.parent.name, path.parent.name
+            if _outside(date, since, until) or (agent and agent_name != agent):
+                continue
+            if root not in configs:
+                configs[root] = ConfigCache(root)
+            for entry in iter_segment(path):
+                if entry.get("kind", "run") == "run":
+                    yield configs[root].rehydrate(entry)
+
+
+def read_run(root: str | Path, run_id: str) -> dict | None:
+    """Read one run using the sidecar index instead of scanning the segments."""
+    root = Path(root)
+    for record in iter_index(root):
+        if record["run_id"] == run_id and record["kind"] == "run":
+            with (root / record["segment"]).open("rb") as f_in:
+                f_in.seek(record["offset"])
+                data = f_in.read(record["length"])
+            if record["segment"].endswith(".gz"):
+                data = gzip.decompress(data)
+            return ConfigCache(root).rehydrate(json.loads(data))
+    return None
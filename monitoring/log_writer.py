@@ -0,0 +1,269 @@
+"""
+Background writer for agent logs.
+
+Entries are put on an in-process queue and a daemon thread appends them to
+compressed segment files partitioned by date and agent (see log_store for
+the layout), so logging never blocks the request path. Segments rotate by
+size and age, and fsync is done once per batch of entries.
+"""
+import atexit
+import gzip
+import json
+import os
+import queue
+import secrets
+import threading
+import time
+from datetime import datetime
+from pathlib import Path
+
+from monitoring.log_store import CONFIGS_DIR, INDEX_FILE, config_hash, index_record, partition_dir, split_config
+from monitoring.metrics import ERRORS
+
+_STOP = object()
+
+
+class Segment:
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.file = path.open("ab")
+        self.opened = time.monotonic()
+        self.size = self.file.tell()
+
+
+class LogWriter:
+
+    def __init__(
+        self,
+        folder: str | Path = "monitoring/logs",
+        max_segment_bytes: int = 64 * 1024 * 1024,
+        max_segment_age: float = 3600,
+        fsync_interval: float = 1.0,
+        batch_size: int = 256,
+        max_queue: int = 10000,
+        compress: bool = True,
+        serializer=None,
+    ):
+        self.folder = Path(folder)
+        self.max_segment_bytes = max_segment_bytes
+        self.max_segment_age = max_segment_age
+        self.fsync_interval = fsync_interval
+        self.batch_size = batch_size
+        self.compress = compress
+        self.serializer = serializer
+
+        self.dropped = 0
+        self._queue = queue.Queue(maxsize=max_queue)
+        self._thread = None
+        self._start_lock = threading.Lock()
+
+        self._segments: dict[Path, Segment] = {}
+        self._index = None
+        self._known_configs = set()
+        self._last_fsync = 0.0
+        self._dirty = False
+
+    def write(self, entry: dict) -> bool:
+        """Queue an entry for writing. Never blocks; returns False if the entry was dropped."""
+        self._ensure_started()
+        try:
+            self._queue.put_nowait(entry)
+            return True
+        except queue.Full:
+            self.dropped += 1
+            ERRORS.inc(stage="log_writer")
+            return False
+
+    def flush(self, timeout: float | None = None):
+        """
+        Block until everything queued so far has been written and fsynced,
+        or until `timeout`. Raises RuntimeError if the writer thread dies first.
+        """
+        if self._thread is None:
+            return
+        self._ensure_started()
+        done = threading.Event()
+        self._queue.put(done)
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            wait = 0.1 if deadline is None else min(0.1, max(deadline - time.monotonic(), 0))
+            if done.wait(wait):
+                return
+            if not self._thread.is_alive():
+                raise RuntimeError("log writer thread stopped before the flush completed")
+            if deadline is not None and time.monotonic() >= deadline:
+                return
+
+    def close(self, timeout: float | None = 10):
+        if self._thread is None:
+            return
+        if self._thread.is_alive():
+            self._queue.put(_STOP)
+            self._thread.join(timeout)
+        self._thread = None
+
+    @property
+    def segment_paths(self) -> list[Path]:
+        return list(self._segments)
+
+    def _ensure_started(self):
+        # also restarts a thread that died, so entries are not queued for nobody
+        if self._thread is not None and self._thread.is_alive():
+            return
+        with self._start_lock:
+            if self._thread is None or not self._thread.is_alive():
+                if self._thread is not None:
+                    ERRORS.inc(stage="log_writer")
+                (self.folder / CONFIGS_DIR).mkdir(parents=True, exist_ok=True)
+                self._thread = threading.Thread(target=self._run, name="log-writer", daemon=True)
+                self._thread.start()
+
+    def _run(self):
+        while True:
+            try:
+                # wake up to fsync data that is still only in the OS buffers
+                batch = [self._queue.get(timeout=self.fsync_interval if self._dirty else None)]
+            except queue.Empty:
+                self._safe_sync(force=True)
+                continue
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            stop = False
+            flushed = []
+            for item in batch:
+                if item is _STOP:
+                    stop = True
+                elif isinstance(item, threading.Event):
+                    flushed.append(item)
+                else:
+                    try:
+                        self._append(item)
+                    except Exception:
+                        # one bad entry (or a failing serializer) must not stop the thread
+                        ERRORS.inc(stage="log_writer")
+
+            self._safe_sync(force=stop or bool(flushed))
+            for event in flushed:
+                event.set()
+
+            if stop:
+                try:
+                    self._close_all()
+                except Exception:
+                    ERRORS.inc(stage="log_writer")
+                return
+
+    def _safe_sync(self, force: bool = False):
+        try:
+            self._sync(force)
+        except Exception:
+            ERRORS.inc(stage="log_writer")
+
+    def _append(self, entry: dict):
+        stripped, config = split_config(entry)
+        if config:
+            stripped["config_hash"] = self._store_config(config)
+
+        data = (json.dumps(stripped, default=self.serializer) + "\n").encode("utf-8")
+        if self.compress:
+            # one gzip member per entry, so each entry can be read from its offset
+            data = gzip.compress(data)
+
+        segment = self._segment_for(partition_dir(self.folder, entry), len(data))
+        offset = segment.size
+        segment.file.write(data)
+        segment.size += len(data)
+
+        record = index_record(entry, segment.path.relative_to(self.folder).as_posix(), offset, len(data))
+        if self._index is None:
+            self._index = (self.folder / INDEX_FILE).open("a", encoding="utf-8")
+        self._index.write(json.dumps(record) + "\n")
+
+    def _store_config(self, config: dict) -> str:
+        digest = config_hash(config, self.serializer)
+        if digest not in self._known_configs:
+            path = self.folder / CONFIGS_DIR / f"{digest}.json"
+            if not path.exists():
+                with path.open("w", encoding="utf-8") as f_out:
+                    json.dump(config, f_out, indent=2, default=self.serializer)
+            self._known_configs.add(digest)
+        return digest
+
+    def _segment_for(self, directory: Path, incoming: int) -> Segment:
+        segment = self._find_open_segment(directory)
+        if segment is not None:
+            too_big = segment.size + incoming > self.max_segment_bytes and segment.size > 0
+            too_old = time.monotonic() - segment.opened > self.max_segment_age
+            if not (too_big or too_old):
+                return segment
+            self._close_segment(segment)
+
+        directory.mkdir(parents=True, exist_ok=True)
+        ts = datetime.now().strftime("%H%M%S")
+        suffix = ".jsonl.gz" if self.compress else ".jsonl"
+        segment = Segment(directory / f"segment_{ts}_{secrets.token_hex(3)}{suffix}")
+        self._segments[segment.path] = segment
+        return segment
+
+    def _find_open_segment(self, directory: Path) -> Segment | None:
+        for path, segment in self._segments.items():
+            if path.parent == directory:
+                return segment
+        return None
+
+    def _files(self):
+        files = [s.file for s in self._segments.values()]
+        if self._index is not None:
+            files.append(self._index)
+        return files
+
+    def _sync(self, force: bool = False):
+        # segments of partitions that stopped receiving entries (e.g. yesterday's) are closed here
+        for segment in list(self._segments.values()):
+            if time.monotonic() - segment.opened > self.max_segment_age:
+                self._close_segment(segment)
+
+        files = self._files()
+        if not files:
+            return
+        for f in files:
+            f.flush()
+        self._dirty = True
+        now = time.monotonic()
+        if force or now - self._last_fsync >= self.fsync_interval:
+            for f in files:
+                os.fsync(f.fileno())
+            self._last_fsync = now
+            self._dirty = False
+
+    def _close_segment(self, segment: Segment):
+        segment.file.flush()
+        os.fsync(segment.file.fileno())
+        segment.file.close()
+        del self._segments[segment.path]
+
+    def _close_all(self):
+        for segment in list(self._segments.values()):
+            self._close_segment(segment)
+        if self._index is not None:
+            self._index.flush()
+            os.fsync(self._index.fileno())
+            self._index.close()
+            self._index = None
+        self._dirty = False
+
+
+_default_writer = None
+
+
+def get_log_writer(serializer=None) -> LogWriter:
+    global _default_writer
+    if _default_writer is None:
+        _default_writer = LogWriter(serializer=serializer)
+        atexit.register(_default_writer.close)
+    return _default_writer
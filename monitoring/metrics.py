@@ -0,0 +1,170 @@
+"""
+In-process metrics rendered in the Prometheus text exposition format.
+
+Metrics are module level objects so any part of the app can record into
+them; the backend serves render() at /metrics.
+"""
+import math
+import threading
+import time
+from contextlib import contextmanager
+
+LATENCY_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 120, 300)
+SIZE_BUCKETS = (100, 1000, 5000, 10000, 25000, 50000, 100000, 250000, 1000000)
+
+REGISTRY = []
+
+
+def _label_key(labels: dict) -> tuple:
+    return tuple(sorted(labels.items()))
+
+
+def _format_labels(key: tuple, extra: dict | None = None) -> str:
+    items = list(key) + list((extra or {}).items())
+    if not items:
+        return ""
+    escaped = []
+    for name, value in items:
+        value = str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+        escaped.append(f'{name}="{value}"')
+    return "{" + ",".join(escaped) + "}"
+
+
+def _format_value(value: float) -> str:
+    if value == math.inf:
+        return "+Inf"
+    return repr(float(value))
+
+
+class Metric:
+    kind = ""
+
+    def __init__(self, name: str, description: str):
+        self.name = name
+        self.description = description
+        self._lock = threading.Lock()
+        REGISTRY.append(self)
+
+    def render(self) -> list[str]:
+        lines = [f"# HELP {self.name} {self.description}", f"# TYPE {self.name} {self.kind}"]
+        lines.extend(self._samples())
+        return lines
+
+    def _samples(self) -> list[str]:
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name, description):
+        super().__init__(name, description)
+        self._values = {}
+
+    def inc(self, value: float = 1, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            self._values[key] = self._values.get(key, 0) + value
+
+    def value(self, **labels) -> float:
+        return self._values.get(_label_key(labels), 0)
+
+    def _samples(self):
+        with self._lock:
+            return [f"{self.name}{_format_labels(k)} {_format_value(v)}" for k, v in self._values.items()]
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, **labels):
+        with self._lock:
+            self._values[_label_key(labels)] = value
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(self, name, description, buckets=LATENCY_BUCKETS):
+        super().__init__(name, description)
+        self.buckets = tuple(sorted(buckets)) + (math.inf,)
+        self._series = {}
+
+    def observe(self, value: float, **labels):
+        key = _label_key(labels)
+        with self._lock:
+            series = self._series.get(key)
+            if series is None:
+                series = self._series[key] = {"counts": [0] * len(self.buckets), "sum": 0.0, "count": 0}
+            for i, bound in enumerate(self.buckets):
+                if value <= bound:
+                    series["counts"][i] += 1
+                    break
+            series["sum"] += value
+            series["count"] += 1
+
+    def count(self, **labels) -> int:
+        series = self._series.get(_label_key(labels))
+        return series["count"] if series else 0
+
+    def _samples(self):
+        lines = []
+        with self._lock:
+            for key, series in self._series.items():
+                cumulative = 0
+                for bound, count in zip(self.buckets, series["counts"]):
+                    cumulative += count
+                    le = {"le": _format_value(bound) if bound == math.inf else repr(bound)}
+                    lines.append(f"{self.name}_bucket{_format_labels(key, le)} {cumulative}")
+                lines.append(f"{self.name}_sum{_format_labels(key)} {_format_value(series['sum'])}")
+                lines.append(f"{self.name}_count{_format_labels(key)} {series['count']}")
+        return lines
+
+
+def render() -> str:
+    lines = []
+    for metric in REGISTRY:
+        lines.extend(metric.render())
+    return "\n".join(lines) + "\n"
+
+
+@contextmanager
+def timed(histogram: Histogram, **labels):
+    """
+    Observe the wall time of the block into `histogram`.
+
+    Exceptions are counted in ERRORS under the histogram's stage and re-raised.
+    """
+    start = time.perf_counter()
+    try:
+        yield
+    except Exception:
+        ERRORS.inc(stage=histogram.name.removesuffix("_seconds"))
+        raise
+    finally:
+        histogram.observe(time.perf_counter() - start, **labels)
+
+
+CHAT_SECONDS = Histogram("chat_request_seconds", "End-to-end /chat time until the last event is streamed")
+CHAT_TTFT_SECONDS = Histogram("chat_time_to_first_token_seconds", "Time from /chat request to the first streamed event")
+ADMISSION_WAIT_SECONDS = Histogram("admission_wait_seconds", "Time a chat waited in the admission queue")
+ADMISSION_QUEUE_DEPTH = Gauge("admission_queue_depth", "Chats currently waiting for a slot")
+ADMISSION_ACTIVE = Gauge("admission_active", "Chats currently running")
+ADMISSION_REJECTED = Counter("admission_rejected_total", "Chats rejected by admission control")
+
+TOOL_SECONDS = Histogram("tool_call_seconds", "Wall time of each orchestrator tool call")
+TOOL_RESULT_BYTES = Histogram("tool_result_bytes", "Size of each tool result sent back to the model", buckets=SIZE_BUCKETS)
+TOOL_RESULT_TOKENS = Counter("tool_result_tokens_total", "Estimated tokens of tool results sent back to the model")
+AGENT_RUN_SECONDS = Histogram("agent_run_seconds", "Wall time of each agent run (one or more LLM calls)")
+ES_REQUEST_SECONDS = Histogram("es_request_seconds", "Elasticsearch request time")
+ARXIV_FETCH_SECONDS = Histogram("arxiv_fetch_seconds", "arXiv API and PDF download time")
+PDF_EXTRACTION_SECONDS = Histogram("pdf_extraction_seconds", "PDF text extraction and chunking time")
+
+LLM_TOKENS = Counter("llm_tokens_total", "Tokens used by LLM calls")
+CACHE_REQUESTS = Counter("answer_cache_requests_total", "Answer cache lookups by result (hit/miss)")
+ERRORS = Counter("errors_total", "Errors by stage")
+
+
+def record_usage(agent_name: str, usage):
+    LLM_TOKENS.inc(usage.input_tokens or 0, agent=agent_name, kind="input")
+    LLM_TOKENS.inc(usage.output_tokens or 0, agent=agent_name, kind="output")
@@ -0,0 +1,287 @@
+"""
+Offline replay of logged runs.
+
+Each logged run is re-driven through the real orchestrator pipeline
+(create_agents, AsyncAgent_Tools, NamedCallback, tracing) with the LLMs
+replaced by FunctionModels:
+
+- the orchestrator replays the recorded model responses in order, so it
+  makes the same tool calls with the same arguments and ends with the
+  same final_result;
+- search_quality_check returns the recorded evaluations;
+- search and indexing run for real against the embedded index (or a local
+  Elasticsearch), and get_data_to_index serves papers from a corpus built
+  from the chunks the logged searches returned, so nothing touches the
+  network.
+
+Latency is reported per stage from the trace spans, and every replayed
+search is compared with the recorded one, so retrieval and serving
+changes can be benchmarked deterministically without LLM calls.
+"""
+import asyncio
+import time
+from collections import defaultdict
+from types import SimpleNamespace
+
+from pydantic_ai.messages import (
+    ModelMessagesTypeAdapter, ModelRequest, ModelResponse, TextPart, ToolCallPart, ToolReturnPart
+)
+from pydantic_ai.models.function import DeltaToolCall, FunctionModel
+
+from agents import NamedCallback, create_agents
+from benchmarks.corpus import make_feed
+from embedded_index import EmbeddedIndex
+from monitoring.log_query import LogFilter, Reservoir, query_entries
+from monitoring.tracing import InMemoryExporter, span, tracer
+from tools import AsyncAgent_Tools
+
+
+class RecordedRun:
+
+    def __init__(self, entry: dict):
+        self.run_id = entry.get("run_id")
+        self.messages = ModelMessagesTypeAdapter.validate_python(entry["messages"])
+        self.responses = [m for m in self.messages if isinstance(m, ModelResponse)]
+
+        self.user_prompt = ""
+        self.tool_returns = defaultdict(list)
+        # seconds the model took for each response, from the message timestamps
+        self.model_latency = []
+        last_request_at = None
+        for message in self.messages:
+            if isinstance(message, ModelRequest):
+                for part in message.parts:
+                    if part.part_kind == "user-prompt" and not self.user_prompt:
+                        self.user_prompt = part.content
+                    if isinstance(part, ToolReturnPart):
+                        self.tool_returns[part.tool_name].append(part.content)
+                timestamps = [p.timestamp for p in message.parts if hasattr(p, "timestamp")]
+                last_request_at = max(timestamps) if timestamps else last_request_at
+            else:
+                latency = (message.timestamp - last_request_at).total_seconds() if last_request_at else 0.0
+                self.model_latency.append(max(latency, 0.0))
+
+    @property
+    def final_output(self) -> dict | None:
+        for response in reversed(self.responses):
+            for part in response.parts:
+                if isinstance(part, ToolCallPart) and part.tool_name == "final_result":
+                    return part.args_as_dict()
+        return None
+
+    @property
+    def documents(self) -> list[dict]:
+        return [doc for result in self.tool_returns["search"] if isinstance(result, list) for doc in result]
+
+
+def function_model(respond, model_name: str) -> FunctionModel:
+    """
+    A FunctionModel that answers plain and streamed requests with the
+    ModelResponse of `respond(messages, info)`. Streamed, text parts come
+    as text and tool calls as DeltaToolCalls with JSON arguments.
+    """
+
+    async def stream(messages, info):
+        response = await respond(messages, info)
+        for i, part in enumerate(response.parts):
+            if isinstance(part, TextPart):
+                yield part.content
+            elif isinstance(part, ToolCallPart):
+                yield {i: DeltaToolCall(name=part.tool_name, json_args=part.args_as_json_str(), tool_call_id=part.tool_call_id)}
+
+    return FunctionModel(respond, stream_function=stream, model_name=model_name)
+
+
+def load_runs(folder, log_filter: LogFilter | None = None, limit: int | None = None) -> list[RecordedRun]:
+    runs = []
+    for entry in query_entries(folder, log_filter):
+        runs.append(RecordedRun(entry))
+        if limit is not None and len(runs) >= limit:
+            break
+    return runs
+
+
+class ReplayModel:
+    """FunctionModel functions that replay the recorded responses of one run."""
+
+    def __init__(self, run: RecordedRun, recorded_latency: bool = False):
+        self.run = run
+        self.recorded_latency = recorded_latency
+
+    async def _next(self, messages) -> ModelResponse:
+        step = sum(isinstance(m, ModelResponse) for m in messages)
+        # a replay that needs more steps than recorded repeats the final answer
+        step = min(step, len(self.run.responses) - 1)
+        if self.recorded_latency:
+            await asyncio.sleep(self.run.model_latency[step])
+        return self.run.responses[step]
+
+    async def respond(self, messages, info):
+        response = await self._next(messages)
+        # with the recorded usage, non-streamed replays report the tokens the run used
+        return ModelResponse(parts=[p for p in response.parts if isinstance(p, (TextPart, ToolCallPart))], usage=response.usage)
+
+    def model(self) -> FunctionModel:
+        return function_model(self.respond, "replay")
+
+
+class RecordedOutputs:
+    """Sub-agent model that returns the recorded outputs of a tool, in order."""
+
+    def __init__(self, outputs: list):
+        self.outputs = outputs
+        self.calls = 0
+
+    async def respond(self, messages, info):
+        output = self.outputs[min(self.calls, len(self.outputs) - 1)] if self.outputs else {}
+        self.calls += 1
+        # a fixed id, so recordings of a replay are byte identical
+        return ModelResponse(parts=[ToolCallPart(info.output_tools[0].name, output, tool_call_id="call_0")])
+
+    def model(self) -> FunctionModel:
+        return function_model(self.respond, "replay")
+
+
+class ReplayTools(AsyncAgent_Tools):
+    """
+    AsyncAgent_Tools whose arXiv side is served from a local corpus of
+    recorded chunks. Indexing and search go through the real code paths.
+    """
+
+    def __init__(self, es_index, corpus: list[dict], max_results=None):
+        super().__init__(es_index=es_index, max_results=max_results, http_client=SimpleNamespace())
+        self.papers = defaultdict(list)
+        for chunk in corpus:
+            self.papers[chunk["id"]].append(chunk)
+        # papers are matched to fetch queries by title and abstract
+        self.catalog = EmbeddedIndex("catalog")
+        for arxiv_id, chunks in self.papers.items():
+            self.catalog.add({"title": chunks[0].get("title", ""), "summary": chunks[0].get("summary", "")}, arxiv_id)
+
+    async def aclose(self):
+        await self.index.close()
+
+    async def fetch_feed(self, search_query=None, id_list=None, max_results=None):
+        max_results = max_results or self.max_results
+        if id_list:
+            ids = [i for i in id_list if i in self.papers]
+        else:
+            query = (search_query or "").split(":", 1)[-1]
+            body = {"size": max_results, "query": {"multi_match": {"query": query, "fields": ["title", "summary"]}}}
+            ids = [hit["_id"] for hit in self.catalog.search(body)["hits"]["hits"]]
+        return make_feed([self.papers[i][0] for i in ids[:max_results]])
+
+    async def extract_paper(self, entry):
+        return list(self.papers[entry.id.split("/")[-1]])
+
+
+def unique_documents(runs: list[RecordedRun]) -> list[dict]:
+    seen = set()
+    docs = []
+    for run in runs:
+        for doc in run.documents:
+            key = (doc.get("id"), doc.get("content"))
+            if key not in seen:
+                seen.add(key)
+                docs.append(doc)
+    return docs
+
+
+def stage_name(span_name: str) -> str:
+    if span_name.startswith("chat "):
+        return "model"
+    kind, _, target = span_name.partition(" ")
+    prefixes = {"execute_tool": "tool", "elasticsearch": "es", "invoke_agent": "agent"}
+    return f"{prefixes[kind]}:{target}" if kind in prefixes else span_name
+
+
+def search_overlap(recorded: list, replayed: list) -> float | None:
+    """Mean Jaccard overlap of the (id, content) sets returned by each search call."""
+    pairs = list(zip(recorded, replayed))
+    if not pairs:
+        return None
+    scores = []
+    for old, new in pairs:
+        old_keys = {(d.get("id"), d.get("content")) for d in old or []}
+        new_keys = {(d.get("id"), d.get("content")) for d in new or []}
+        union = old_keys | new_keys
+        scores.append(len(old_keys & new_keys) / len(union) if union else 1.0)
+    return sum(scores) / len(scores)
+
+
+async def replay_run(run: RecordedRun, tools: AsyncAgent_Tools, recorded_latency: bool = False) -> dict:
+    models = {
+        "orchestrator": ReplayModel(run, recorded_latency).model(),
+        "search_quality_check": RecordedOutputs(run.tool_returns["search_quality_check"]).model(),
+        "summarize": RecordedOutputs([]).model(),
+    }
+    agent = create_agents(tools, models=models)
+    callback = NamedCallback(agent)
+
+    started = time.perf_counter()
+    with span(f"replay {run.run_id}", attributes={"replay.run_id": run.run_id}) as root:
+        try:
+            result = await agent.run(run.user_prompt, event_stream_handler=callback)
+        except Exception as e:
+            return {"run_id": run.run_id, "trace_id": root.trace_id, "error": str(e)}
+
+    replayed = defaultdict(list)
+    for message in result.new_messages():
+        for part in message.parts:
+            if isinstance(part, ToolReturnPart):
+                replayed[part.tool_name].append(part.content)
+
+    return {
+        "run_id": run.run_id,
+        "trace_id": root.trace_id,
+        "seconds": time.perf_counter() - started,
+        "tool_calls": [t.tool_name for t in callback.tool_timings],
+        "search_overlap": search_overlap(run.tool_returns["search"], replayed["search"]),
+        "same_output": result.output.model_dump(mode="json") == run.final_output,
+    }
+
+
+async def replay_runs(runs: list[RecordedRun], es_index, seed_index: bool = False, recorded_latency: bool = False) -> dict:
+    """
+    Replay `runs` one after another against `es_index` (EmbeddedElasticsearch
+    or a real AsyncElasticsearch) and report per-run results and per-stage
+    latency percentiles.
+    """
+    tools = ReplayTools(es_index, unique_documents(runs))
+    await tools.bootstrap()
+    if seed_index:
+        await tools.index_docs(unique_documents(runs))
+
+    exporter = InMemoryExporter(max_spans=None)
+    tracer.exporters.append(exporter)
+    try:
+        results = [await replay_run(run, tools, recorded_latency) for run in runs]
+    finally:
+        tracer.exporters.remove(exporter)
+        await tools.aclose()
+
+    trace_ids = {r["trace_id"] for r in results}
+    totals = defaultdict(float)
+    counts = defaultdict(int)
+    samples = defaultdict(Reservoir)
+    for s in exporter.spans:
+        if s.trace_id not in trace_ids or s.name.startswith("replay "):
+            continue
+        stage = stage_name(s.name)
+        totals[stage] += s.duration
+        counts[stage] += 1
+        samples[stage].add(s.duration)
+
+    stages = {
+        stage: {"calls": counts[stage], "total_seconds": totals[stage], **samples[stage].percentiles((50, 95))}
+        for stage in sorted(totals, key=totals.get, reverse=True)
+    }
+    overlaps = [r["search_overlap"] for r in results if r.get("search_overlap") is not None]
+    return {
+        "runs": len(results),
+        "errors": sum("error" in r for r in results),
+        "seconds": sum(r.get("seconds", 0.0) for r in results),
+        "mean_search_overlap": sum(overlaps) / len(overlaps) if overlaps else None,
+        "stages": stages,
+        "results": results,
+    }
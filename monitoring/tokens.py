@@ -0,0 +1,26 @@
+"""
+Token counting with tiktoken, falling back to a ~4 characters per token
+estimate when the encoding cannot be loaded (tiktoken downloads it on
+first use, which fails offline).
+"""
+import math
+from functools import lru_cache
+
+import tiktoken
+
+DEFAULT_MODEL = "gpt-4o-mini"
+
+
+@lru_cache(maxsize=None)
+def get_encoding(model: str = DEFAULT_MODEL):
+    try:
+        return tiktoken.encoding_for_model(model)
+    except Exception:
+        return None
+
+
+def count_tokens(text: str, model: str = DEFAULT_MODEL) -> int:
+    encoding = get_encoding(model)
+    if encoding is None:
+        return math.ceil(len(text) / 4)
+    return len(encoding.encode(text, disallowed_special=()))
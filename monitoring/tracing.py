@@ -0,0 +1,244 @@
+"""
+Lightweight tracing with OpenTelemetry span semantics.
+
+Every span has a 32 hex digit trace_id, a 16 hex digit span_id, the
+span_id of its parent, a kind (server/client/internal), start and end
+times in unix nanoseconds, attributes and a status. The current span is
+kept in a contextvar, so spans nest across awaits and into asyncio tasks
+started inside them (e.g. parallel tool calls).
+
+Finished spans are handed to the tracer's exporters: an in-memory ring
+buffer by default, and a JSONL file when TRACE_FILE is set.
+"""
+import json
+import os
+import secrets
+import threading
+import time
+from collections import deque
+from contextlib import asynccontextmanager, contextmanager
+from contextvars import ContextVar
+from pathlib import Path
+
+from pydantic_ai.models.wrapper import WrapperModel
+
+_current_span = ContextVar("current_span", default=None)
+
+
+class Span:
+
+    def __init__(self, name: str, trace_id: str, parent_span_id: str | None = None, kind: str = "internal", attributes: dict | None = None):
+        self.name = name
+        self.trace_id = trace_id
+        self.span_id = secrets.token_hex(8)
+        self.parent_span_id = parent_span_id
+        self.kind = kind
+        self.attributes = dict(attributes or {})
+        self.events = []
+        self.status_code = "UNSET"
+        self.status_description = None
+        self.start_time = time.time_ns()
+        self.end_time = None
+
+    def set_attribute(self, key: str, value):
+        self.attributes[key] = value
+
+    def set_attributes(self, attributes: dict):
+        self.attributes.update(attributes)
+
+    def add_event(self, name: str, attributes: dict | None = None):
+        self.events.append({"name": name, "time_unix_nano": time.time_ns(), "attributes": attributes or {}})
+
+    def set_status(self, code: str, description: str | None = None):
+        self.status_code = code
+        self.status_description = description
+
+    def record_exception(self, exc: BaseException):
+        self.add_event("exception", {"exception.type": type(exc).__name__, "exception.message": str(exc)})
+        self.set_status("ERROR", str(exc))
+
+    @property
+    def duration(self) -> float | None:
+        if self.end_time is None:
+            return None
+        return (self.end_time - self.start_time) / 1e9
+
+    def to_dict(self) -> dict:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_span_id": self.parent_span_id,
+            "kind": self.kind,
+            "start_time_unix_nano": self.start_time,
+            "end_time_unix_nano": self.end_time,
+            "duration_seconds": self.duration,
+            "status": {"code": self.status_code, "description": self.status_description},
+            "attributes": self.attributes,
+            "events": self.events,
+        }
+
+
+class InMemoryExporter:
+    """Keeps the last `max_spans` finished spans, mostly for tests and debugging."""
+
+    def __init__(self, max_spans: int = 10000):
+        self.spans = deque(maxlen=max_spans)
+
+    def export(self, span: Span):
+        self.spans.append(span)
+
+    def get_trace(self, trace_id: str) -> list[Span]:
+        return [s for s in list(self.spans) if s.trace_id == trace_id]
+
+    def clear(self):
+        self.spans.clear()
+
+
+class JsonlExporter:
+    """Appends one JSON line per finished span."""
+
+    def __init__(self, path: str | Path):
+        self.path = Path(path)
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        self._lock = threading.Lock()
+
+    def export(self, span: Span):
+        line = json.dumps(span.to_dict(), default=str) + "\n"
+        with self._lock:
+            with self.path.open("a", encoding="utf-8") as f_out:
+                f_out.write(line)
+
+
+class Tracer:
+
+    def __init__(self, exporters: list | None = None):
+        self.exporters = exporters if exporters is not None else [InMemoryExporter()]
+
+    def start_span(self, name: str, kind: str = "internal", attributes: dict | None = None, parent: Span | None = None) -> Span:
+        """Start a span without making it current; children default to the current span."""
+        parent = parent or _current_span.get()
+        trace_id = parent.trace_id if parent else secrets.token_hex(16)
+        return Span(name, trace_id, parent.span_id if parent else None, kind, attributes)
+
+    def end_span(self, span: Span):
+        if span.end_time is not None:
+            return
+        span.end_time = time.time_ns()
+        if span.status_code == "UNSET":
+            span.status_code = "OK"
+        for exporter in self.exporters:
+            exporter.export(span)
+
+    @contextmanager
+    def use_span(self, span: Span, end_on_exit: bool = True):
+        token = _current_span.set(span)
+        try:
+            yield span
+        except BaseException as e:
+            span.record_exception(e)
+            raise
+        finally:
+            try:
+                _current_span.reset(token)
+            except ValueError:
+                # closed from another context, e.g. a streaming generator finalized elsewhere
+                pass
+            if end_on_exit:
+                self.end_span(span)
+
+    @contextmanager
+    def span(self, name: str, kind: str = "internal", attributes: dict | None = None):
+        with self.use_span(self.start_span(name, kind, attributes)) as span:
+            yield span
+
+
+tracer = Tracer()
+
+
+def span(name: str, kind: str = "internal", attributes: dict | None = None):
+    return tracer.span(name, kind, attributes)
+
+
+def current_span() -> Span | None:
+    return _current_span.get()
+
+
+def current_trace_id() -> str | None:
+    span = _current_span.get()
+    return span.trace_id if span else None
+
+
+def configure_from_env():
+    """Add a JSONL exporter when TRACE_FILE is set."""
+    path = os.getenv("TRACE_FILE")
+    if path and not any(isinstance(e, JsonlExporter) and e.path == Path(path) for e in tracer.exporters):
+        tracer.exporters.append(JsonlExporter(path))
+
+
+def read_trace(path: str | Path, trace_id: str) -> list[dict]:
+    """All spans of one trace from a JSONL trace file, in start order."""
+    spans = []
+    with Path(path).open(encoding="utf-8") as f_in:
+        for line in f_in:
+            if trace_id in line:
+                record = json.loads(line)
+                if record["trace_id"] == trace_id:
+                    spans.append(record)
+    return sorted(spans, key=lambda s: s["start_time_unix_nano"])
+
+
+def format_trace(spans: list[dict]) -> str:
+    """Indented span tree with durations, children under their parents."""
+    children = {}
+    ids = {s["span_id"] for s in spans}
+    for s in spans:
+        parent = s["parent_span_id"] if s["parent_span_id"] in ids else None
+        children.setdefault(parent, []).append(s)
+
+    lines = []
+
+    def walk(parent, depth):
+        for s in children.get(parent, []):
+            duration = s.get("duration_seconds")
+            took = f"{duration * 1000:.1f} ms" if duration is not None else "unfinished"
+            error = "  ERROR" if s["status"]["code"] == "ERROR" else ""
+            lines.append(f"{'  ' * depth}{s['name']}  {took}{error}")
+            walk(s["span_id"], depth + 1)
+
+    walk(None, 0)
+    return "\n".join(lines)
+
+
+class TracedModel(WrapperModel):
+    """
+    Model wrapper that puts every LLM request in a client span with
+    GenAI semantic convention attributes (model, token usage).
+    """
+
+    def _attributes(self) -> dict:
+        return {
+            "gen_ai.operation.name": "chat",
+            "gen_ai.system": self.system,
+            "gen_ai.request.model": self.model_name,
+        }
+
+    @staticmethod
+    def _record_usage(span: Span, usage):
+        span.set_attributes({
+            "gen_ai.usage.input_tokens": usage.input_tokens,
+            "gen_ai.usage.output_tokens": usage.output_tokens,
+        })
+
+    async def request(self, *args, **kwargs):
+        with span(f"chat {self.model_name}", kind="client", attributes=self._attributes()) as s:
+            response = await super().request(*args, **kwargs)
+            self._record_usage(s, response.usage)
+            return response
+
+    @asynccontextmanager
+    async def request_stream(self, *args, **kwargs):
+        with span(f"chat {self.model_name}", kind="client", attributes=self._attributes()) as s:
+            async with super().request_stream(*args, **kwargs) as response_stream:
+                yield response_stream
+            self._record_usage(s, response_stream.usage())
@@ -0,0 +1,78 @@
+import asyncio
+
+import pytest
+
+from agents import NamedCallback, agent_span
+from tests.recording import MODES, FixtureMissing, FixtureStore, create_recorded_agents, recorded_model
+
+# a question of questions_dataset.csv, so replays answer it from a logged real run (tests/logged_runs.py)
+AGENT_PROMPT = "summary of classical vision models"
+
+
+def pytest_addoption(parser):
+    parser.addoption(
+        "--record-mode",
+        choices=MODES,
+        default="replay",
+        help="replay: answer LLM, arXiv and ES requests from tests/fixtures (offline); "
+             "record: run against the real services and store their responses; "
+             "live: real services, nothing stored",
+    )
+    parser.addoption(
+        "--update-golden",
+        action="store_true",
+        help="rewrite the golden tool traces (tests/fixtures/tool_traces.json) from this session's runs; "
+             "needs --record-mode=record",
+    )
+
+
+def pytest_configure(config):
+    # replays only repeat the fixtures and live runs leave none behind to replay the new baseline
+    if config.getoption("--update-golden") and config.getoption("--record-mode") != "record":
+        raise pytest.UsageError("--update-golden needs --record-mode=record: golden traces come from recorded real runs")
+
+
+@pytest.fixture(scope="session")
+def record_mode(request):
+    return request.config.getoption("--record-mode")
+
+
+@pytest.fixture(scope="session")
+def update_golden(request):
+    return request.config.getoption("--update-golden")
+
+
+@pytest.fixture(scope="session")
+def fixture_store():
+    return FixtureStore()
+
+
+@pytest.fixture(scope="session")
+def session_runner():
+    # one loop for the shared run and everything that reuses its clients
+    with asyncio.Runner() as runner:
+        yield runner
+
+
+@pytest.fixture(scope="session")
+def agent_run(record_mode, fixture_store, session_runner):
+    """One orchestrator run on AGENT_PROMPT, shared by every test that inspects it."""
+    agent = create_recorded_agents(fixture_store, record_mode)
+
+    async def run():
+        with agent_span(agent):
+            return await agent.run(user_prompt=AGENT_PROMPT, event_stream_handler=NamedCallback(agent))
+
+    try:
+        return session_runner.run(run())
+    except FixtureMissing as e:
+        # only replays read fixtures; a missing one means they are out of date
+        pytest.fail(f"{e}; re-record the fixtures, see tests/recording.py")
+
+
+@pytest.fixture(scope="session")
+def judge_model(record_mode, fixture_store):
+    if record_mode == "replay":
+        # a replayed verdict only repeats itself, and no real judge response is recorded
+        pytest.skip("the judge needs a real model: run with --record-mode=record or live")
+    return recorded_model(fixture_store, "live")
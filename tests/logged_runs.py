@@ -0,0 +1,86 @@
+"""
+Builds tests/fixtures from the logged eval runs.
+
+evals/latest_evals/eval_logs holds one real orchestrator run (OpenAI
+models, arXiv, Elasticsearch) of every question in questions_dataset.csv.
+Each run is driven again through the recording layer (RecordingModel,
+RecordedTools, RecordedElasticsearch) the way monitoring/replay.py
+replays it:
+
+- the orchestrator answers with the logged model responses, usage
+  included, so the fixtures hold the real tool calls, answers and token
+  counts;
+- search_quality_check answers with the logged evaluations;
+- get_data_to_index gets its papers from the chunks the logged searches
+  returned (monitoring.replay.ReplayTools), and search runs on the
+  embedded index, so recorded search results are not Elasticsearch's.
+
+The runs are asked the bare question, as the tests ask it; the logged
+runs got it inside the backend's conversation prompt. Then every question
+is replayed from the fixtures to write the golden tool traces:
+
+    python -m tests.logged_runs
+
+There are no logged judge responses, so test_llm_judge only runs with
+--record-mode=record or live. Recording with --record-mode=record
+replaces these fixtures with fresh real runs.
+"""
+import asyncio
+from pathlib import Path
+
+from agents import create_agents
+from embedded_index import EmbeddedElasticsearch
+from evals.retrieval_benchmark import load_questions, logged_question
+from monitoring.replay import RecordedOutputs, RecordedRun, ReplayModel, ReplayTools, load_runs, unique_documents
+from tests.recording import (
+    FixtureStore, RecordedElasticsearch, RecordedTools, RecordingModel, create_recorded_agents, replaying_model
+)
+from tests.tool_trace import save_golden, tool_trace
+from tools import shutdown_process_pool
+
+LOG_FOLDER = Path(__file__).parents[1] / "evals" / "latest_evals" / "eval_logs"
+
+
+def logged_agent(store: FixtureStore, run: RecordedRun, corpus: list[dict]):
+    """The orchestrator from create_agents, replaying `run` and recording every response."""
+    es = RecordedElasticsearch(EmbeddedElasticsearch(), store, record=True)
+    tools = RecordedTools(es, store, record=True, source=ReplayTools(EmbeddedElasticsearch(), corpus))
+    models = {
+        "orchestrator": RecordingModel(ReplayModel(run).model(), store),
+        "search_quality_check": RecordingModel(RecordedOutputs(run.tool_returns["search_quality_check"]).model(), store),
+        # the orchestrator has no tool that runs it
+        "summarize": replaying_model(store),
+    }
+    return create_agents(tools, models=models)
+
+
+async def record(store: FixtureStore, folder=LOG_FOLDER):
+    runs = load_runs(folder)
+    corpus = unique_documents(runs)
+    questions = load_questions()
+
+    for run in runs:
+        question = logged_question(run)
+        if question not in questions:
+            continue
+        result = await logged_agent(store, run, corpus).run(question)
+        steps = tool_trace(result)["round_trips"]
+        if steps != len(run.responses):
+            print(f"warning: {run.run_id} took {steps} steps, the logged run {len(run.responses)}")
+        print(f"recorded {run.run_id}: {question}")
+
+    golden = {}
+    for question in questions:
+        golden[question] = tool_trace(await create_recorded_agents(store, "replay").run(question))
+    save_golden(golden)
+
+
+def main():
+    try:
+        asyncio.run(record(FixtureStore()))
+    finally:
+        shutdown_process_pool()
+
+
+if __name__ == "__main__":
+    main()
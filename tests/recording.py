@@ -0,0 +1,279 @@
+"""
+Record/replay layer for the agent tests.
+
+In record mode the agent runs against the real services and every
+external response is stored as a fixture under tests/fixtures, keyed by
+a hash of the request:
+
+- llm: the model response for a request (messages without timestamps,
+  usage or provider details, plus the tool names offered to the model)
+- arxiv_feed: the feed entries for a fetch_feed query
+- arxiv_paper: the extracted chunks of a paper, i.e. the PDF text
+- es_search: the search response for an index, query body and the
+  documents bulk indexed so far in the session
+
+In replay mode the same requests are answered from the fixtures, with an
+embedded index standing in for Elasticsearch, so the run is offline and
+deterministic. A request without a fixture raises FixtureMissing, which
+fails the test: after a prompt or tool change, re-record with
+--record-mode=record. The committed fixtures are converted from logged
+real runs, see tests/logged_runs.py.
+"""
+import gzip
+import hashlib
+import json
+import os
+from contextlib import asynccontextmanager
+from pathlib import Path
+from types import SimpleNamespace
+
+from feedparser import FeedParserDict
+from pydantic_ai.messages import ModelMessagesTypeAdapter, ModelResponse, TextPart, ToolCallPart
+from pydantic_ai.models import infer_model
+from pydantic_ai.models.function import FunctionModel
+from pydantic_ai.models.wrapper import WrapperModel
+
+from agents import DEFAULT_MODEL, ES_URL, create_agents
+from embedded_index import EmbeddedElasticsearch
+from monitoring.replay import function_model
+from tools import AsyncAgent_Tools
+
+FIXTURES_DIR = Path(__file__).parent / "fixtures"
+AGENT_NAMES = ("orchestrator", "search_quality_check", "summarize")
+MODES = ("replay", "record", "live")
+
+
+class FixtureMissing(Exception):
+
+    def __init__(self, kind: str, key: str):
+        super().__init__(f"no recorded {kind} fixture for request {key}")
+        self.kind = kind
+        self.key = key
+
+
+def request_key(*parts) -> str:
+    data = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(data.encode("utf-8")).hexdigest()[:32]
+
+
+class FixtureStore:
+    """One gzipped JSON file per recorded response: <root>/<kind>/<key>.json.gz"""
+
+    def __init__(self, root=FIXTURES_DIR):
+        self.root = Path(root)
+
+    def path(self, kind: str, key: str) -> Path:
+        return self.root / kind / f"{key}.json.gz"
+
+    def get(self, kind: str, key: str):
+        path = self.path(kind, key)
+        if not path.exists():
+            raise FixtureMissing(kind, key)
+        with gzip.open(path, "rt", encoding="utf-8") as f:
+            return json.load(f)
+
+    def put(self, kind: str, key: str, value):
+        path = self.path(kind, key)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        tmp = path.with_suffix(".tmp")
+        # mtime=0 keeps re-recorded fixtures byte identical
+        with open(tmp, "wb") as raw, gzip.GzipFile(fileobj=raw, mode="wb", mtime=0) as f:
+            f.write(json.dumps(value, indent=1, ensure_ascii=False, sort_keys=True).encode("utf-8"))
+        os.replace(tmp, path)
+
+
+# --- LLM ---------------------------------------------------------------
+
+def _json_value(value):
+    if isinstance(value, str):
+        try:
+            return json.loads(value)
+        except json.JSONDecodeError:
+            return value
+    return value
+
+
+def canonical_messages(messages) -> list[dict]:
+    """The parts of `messages` that define a model request, without run specific metadata."""
+    canonical = []
+    for message in ModelMessagesTypeAdapter.dump_python(list(messages), mode="json"):
+        parts = []
+        for part in message["parts"]:
+            if part["part_kind"] == "thinking":
+                continue
+            kept = {k: part[k] for k in ("part_kind", "tool_name", "tool_call_id", "content") if part.get(k) is not None}
+            if "args" in part:
+                kept["args"] = _json_value(part["args"])
+            parts.append(kept)
+        canonical.append({"kind": message["kind"], "instructions": message.get("instructions"), "parts": parts})
+    return canonical
+
+
+def llm_key(messages, model_request_parameters) -> str:
+    tools = sorted(t.name for t in model_request_parameters.function_tools)
+    outputs = sorted(t.name for t in model_request_parameters.output_tools)
+    return request_key(canonical_messages(messages), tools, outputs)
+
+
+def dump_response(response: ModelResponse) -> dict:
+    data = ModelMessagesTypeAdapter.dump_python([response], mode="json")[0]
+    # not replayed; without it re-recording the same response gives the same file
+    data.pop("timestamp", None)
+    return data
+
+
+def load_response(data: dict) -> ModelResponse:
+    response = ModelMessagesTypeAdapter.validate_python([data])[0]
+    # the recorded usage is kept for the token counts of non-streamed replays
+    return ModelResponse(parts=[p for p in response.parts if isinstance(p, (TextPart, ToolCallPart))], usage=response.usage)
+
+
+class RecordingModel(WrapperModel):
+    """Stores the response of the wrapped model for every request."""
+
+    def __init__(self, wrapped, store: FixtureStore):
+        super().__init__(wrapped)
+        self.store = store
+
+    async def request(self, messages, model_settings, model_request_parameters):
+        response = await super().request(messages, model_settings, model_request_parameters)
+        self.store.put("llm", llm_key(messages, model_request_parameters), dump_response(response))
+        return response
+
+    @asynccontextmanager
+    async def request_stream(self, messages, model_settings, model_request_parameters, run_context=None):
+        async with super().request_stream(messages, model_settings, model_request_parameters, run_context) as stream:
+            yield stream
+        self.store.put("llm", llm_key(messages, model_request_parameters), dump_response(stream.get()))
+
+
+def replaying_model(store: FixtureStore) -> FunctionModel:
+    """A model that answers every request with its recorded response."""
+
+    async def respond(messages, info):
+        return load_response(store.get("llm", llm_key(messages, info.model_request_parameters)))
+
+    return function_model(respond, "recorded")
+
+
+# --- Elasticsearch -----------------------------------------------------
+
+def _operation_bytes(operation) -> bytes:
+    # canonical JSON: a replayed paper comes from a fixture stored with sorted
+    # keys, so its documents serialize in a different key order than recorded
+    if isinstance(operation, (bytes, str)):
+        try:
+            operation = json.loads(operation)
+        except ValueError:
+            return operation.encode("utf-8") if isinstance(operation, str) else operation
+    return json.dumps(operation, sort_keys=True).encode("utf-8")
+
+
+class RecordedElasticsearch:
+    """
+    Wraps an Elasticsearch client (AsyncElasticsearch when recording,
+    EmbeddedElasticsearch when replaying). Everything goes to the backend
+    except search in replay mode, which is served from the fixtures. The
+    documents indexed so far are part of the search key, so the same query
+    before and after get_data_to_index maps to different fixtures.
+    """
+
+    def __init__(self, backend, store: FixtureStore, record: bool, state: dict | None = None):
+        self.backend = backend
+        self.store = store
+        self.record = record
+        self.state = state if state is not None else {"indexed": ""}
+
+    def __getattr__(self, name):
+        return getattr(self.backend, name)
+
+    def options(self, **kwargs):
+        return RecordedElasticsearch(self.backend.options(**kwargs), self.store, self.record, self.state)
+
+    async def bulk(self, *args, operations=None, **kwargs):
+        operations = list(operations or [])
+        digest = hashlib.sha256(self.state["indexed"].encode())
+        for operation in operations:
+            digest.update(_operation_bytes(operation))
+        self.state["indexed"] = digest.hexdigest()
+        return await self.backend.bulk(*args, operations=operations, **kwargs)
+
+    async def search(self, index: str, body: dict | None = None, **kwargs):
+        key = request_key(index, body or kwargs, self.state["indexed"])
+        if not self.record:
+            return self.store.get("es_search", key)
+        response = await self.backend.search(index=index, body=body, **kwargs)
+        response = getattr(response, "body", response)
+        self.store.put("es_search", key, response)
+        return response
+
+
+# --- arXiv -------------------------------------------------------------
+
+FEED_FIELDS = ("id", "title", "authors", "published", "summary", "links")
+
+
+class RecordedTools(AsyncAgent_Tools):
+    """
+    AsyncAgent_Tools whose arXiv feeds and extracted papers are recorded or
+    replayed. When recording, `source` (e.g. monitoring.replay.ReplayTools)
+    can stand in for arXiv.
+    """
+
+    def __init__(self, es_index, store: FixtureStore, record: bool, max_results=None, http_client=None, source=None):
+        if (not record or source is not None) and http_client is None:
+            # replays never touch the network
+            http_client = SimpleNamespace(aclose=_noop)
+        super().__init__(es_index=es_index, max_results=max_results, http_client=http_client)
+        self.store = store
+        self.record = record
+        self.source = source
+
+    async def fetch_feed(self, search_query=None, id_list=None, max_results=None):
+        key = request_key(search_query, id_list, max_results or self.max_results)
+        if self.record:
+            fetch = self.source.fetch_feed if self.source else super().fetch_feed
+            feed = await fetch(search_query, id_list, max_results)
+            entries = [{k: entry.get(k) for k in FEED_FIELDS} for entry in feed.entries]
+            self.store.put("arxiv_feed", key, entries)
+        else:
+            entries = self.store.get("arxiv_feed", key)
+        return FeedParserDict(entries=[FeedParserDict(entry) for entry in entries])
+
+    async def extract_paper(self, entry):
+        key = request_key(entry.id, entry["links"][1]["href"])
+        if not self.record:
+            return self.store.get("arxiv_paper", key)
+        doc = await (self.source.extract_paper(entry) if self.source else super().extract_paper(entry))
+        self.store.put("arxiv_paper", key, doc)
+        return doc
+
+
+async def _noop():
+    pass
+
+
+# --- wiring ------------------------------------------------------------
+
+def recorded_model(store: FixtureStore, mode: str, model_name: str = DEFAULT_MODEL):
+    if mode == "live":
+        return model_name
+    if mode == "record":
+        return RecordingModel(infer_model(model_name), store)
+    return replaying_model(store)
+
+
+def create_recorded_agents(store: FixtureStore, mode: str):
+    """The orchestrator from create_agents, wired for `mode` (replay, record or live)."""
+    if mode == "live":
+        return create_agents()
+
+    record = mode == "record"
+    if record:
+        from elasticsearch import AsyncElasticsearch
+        backend = AsyncElasticsearch(ES_URL)
+    else:
+        backend = EmbeddedElasticsearch()
+    tools = RecordedTools(RecordedElasticsearch(backend, store, record), store, record)
+    models = {name: recorded_model(store, mode) for name in AGENT_NAMES}
+    return create_agents(tools, models=models)
@@ -0,0 +1,214 @@
+import asyncio
+
+import pytest
+
+from backend.admission import AdmissionConfig, AdmissionController, AdmissionRejected
+
+
+@pytest.mark.asyncio
+async def test_client_over_limit_gets_429():
+    controller = AdmissionController(AdmissionConfig(max_concurrency=4, max_per_client=1))
+
+    ticket = await controller.acquire("alice")
+    with pytest.raises(AdmissionRejected) as exc:
+        await controller.acquire("alice")
+
+    assert exc.value.status_code == 429
+    assert exc.value.retry_after == controller.config.retry_after
+
+    # other clients are unaffected
+    other = await controller.acquire("bob")
+    controller.release(other)
+    controller.release(ticket)
+    assert controller.stats()["active"] == 0
+
+
+@pytest.mark.asyncio
+async def test_full_queue_gets_503():
+    controller = AdmissionController(AdmissionConfig(max_concurrency=1, max_queue=1, queue_timeout=5))
+
+    running = await controller.acquire("a")
+    waiting = asyncio.create_task(controller.acquire("b"))
+    await asyncio.sleep(0)
+    assert controller.queue_depth == 1
+
+    with pytest.raises(AdmissionRejected) as exc:
+        await controller.acquire("c")
+    assert exc.value.status_code == 503
+    assert exc.value.reason == "queue_full"
+
+    controller.release(running)
+    queued = await waiting
+    controller.release(queued)
+
+    stats = controller.stats()
+    assert stats["admitted"] == 2
+    assert stats["max_queue_depth"] == 1
+    assert stats["rejected"] == {"queue_full": 1}
+
+
+@pytest.mark.asyncio
+async def test_queue_wait_times_out():
+    controller = AdmissionController(AdmissionConfig(max_concurrency=1, queue_timeout=0.05))
+
+    running = await controller.acquire("a")
+    with pytest.raises(AdmissionRejected) as exc:
+        await controller.acquire("b")
+    assert exc.value.reason == "queue_timeout"
+    assert controller.queue_depth == 0
+
+    controller.release(running)
+    # the timed out client does not keep a per-client slot
+    ticket = await controller.acquire("b")
+    controller.release(ticket)
+
+
+@pytest.mark.asyncio
+async def test_only_waiting_chats_count_as_queued():
+    controller = AdmissionController(AdmissionConfig(max_concurrency=2, max_queue=1, queue_timeout=5))
+
+    first = await controller.acquire("a")
+    second = await controller.acquire("b")
+    assert controller.stats()["max_queue_depth"] == 0
+
+    waiting = asyncio.create_task(controller.acquire("c"))
+    await asyncio.sleep(0)
+    assert controller.queue_depth == 1
+
+    controller.release(first)
+    third = await waiting
+    assert controller.queue_depth == 0
+    controller.release(second)
+    controller.release(third)
+
+
+@pytest.mark.asyncio
+async def test_release_is_idempotent():
+    controller = AdmissionController(AdmissionConfig(max_concurrency=1, max_per_client=1))
+
+    ticket = await controller.acquire("a")
+    controller.release(ticket)
+    controller.release(ticket)
+    assert controller.stats()["active"] == 0
+
+    # the slot was returned once, so only one chat fits again
+    again = await controller.acquire("a")
+    assert controller._slots.locked()
+    controller.release(again)
+
+
+@pytest.mark.asyncio
+async def test_every_batch_run_is_admitted():
+    from pydantic_ai import Agent
+    from pydantic_ai.models.function import FunctionModel
+
+    from main import run_agent_batch
+
+    controller = AdmissionController(AdmissionConfig(max_concurrency=2, max_per_client=4, queue_timeout=5))
+    peak = 0
+
+    async def stream(messages, info):
+        nonlocal peak
+        peak = max(peak, controller.active)
+        await asyncio.sleep(0.02)
+        # failing runs skip the run log
+        raise RuntimeError("done")
+        yield ""
+
+    agent = Agent(FunctionModel(stream_function=stream), name="batch")
+    items = [item async for item in run_agent_batch(
+        [f"q{i}" for i in range(6)], max_concurrency=4, batch_agent=agent, admission=controller, client_id="alice",
+    )]
+
+    assert len(items) == 6 and all(item["error"] == "done" for item in items)
+    assert peak == 2
+    assert controller.stats()["active"] == 0
+
+
+@pytest.mark.asyncio
+async def test_rejected_batch_run_reports_an_error():
+    from pydantic_ai import Agent
+    from pydantic_ai.models.function import FunctionModel
+
+    from main import run_agent_batch
+
+    controller = AdmissionController(AdmissionConfig(max_concurrency=4, max_per_client=1))
+    held = await controller.acquire("alice")
+    agent = Agent(FunctionModel(lambda m, i: None), name="batch")
+
+    items = [item async for item in run_agent_batch(["q"], batch_agent=agent, admission=controller, client_id="alice")]
+
+    assert items[0]["error"].startswith("admission:")
+    controller.release(held)
+    assert controller.stats()["active"] == 0
+
+
+def chat_client(monkeypatch, config: AdmissionConfig):
+    """A TestClient for the backend (no lifespan, so no agent) with its own admission controller."""
+    from fastapi.testclient import TestClient
+
+    import backend.app as backend_app
+
+    controller = AdmissionController(config)
+    monkeypatch.setattr(backend_app, "admission", controller)
+    return TestClient(backend_app.app), controller
+
+
+def test_chat_over_client_limit_is_429_with_retry_after(monkeypatch):
+    client, controller = chat_client(monkeypatch, AdmissionConfig(max_per_client=1, retry_after=7))
+    held = asyncio.run(controller.acquire("alice"))
+
+    response = client.post("/chat", json={"messages": []}, headers={"x-client-id": "alice"})
+
+    assert response.status_code == 429
+    assert response.headers["Retry-After"] == "7"
+    assert response.json() == {"error": "client_limit"}
+    controller.release(held)
+
+
+@pytest.mark.parametrize("config, reason", [
+    (AdmissionConfig(max_concurrency=1, max_queue=0), "queue_full"),
+    (AdmissionConfig(max_concurrency=1, queue_timeout=0.01), "queue_timeout"),
+])
+def test_saturated_chat_is_503_with_retry_after(monkeypatch, config, reason):
+    client, controller = chat_client(monkeypatch, config)
+    held = asyncio.run(controller.acquire("alice"))
+
+    response = client.post("/chat", json={"messages": []}, headers={"x-client-id": "bob"})
+
+    assert response.status_code == 503
+    assert response.headers["Retry-After"] == str(config.retry_after)
+    assert response.json() == {"error": reason}
+    controller.release(held)
+
+
+@pytest.mark.asyncio
+async def test_chat_left_before_streaming_is_released_counted_and_traced(monkeypatch):
+    from starlette.requests import Request
+
+    import backend.app as backend_app
+    from monitoring import metrics
+    from monitoring.tracing import InMemoryExporter, tracer
+
+    controller = AdmissionController(AdmissionConfig())
+    monkeypatch.setattr(backend_app, "admission", controller)
+    exporter = InMemoryExporter()
+    tracer.exporters.append(exporter)
+    before = metrics.CHAT_SECONDS.count()
+
+    async def receive():
+        return {"type": "http.request", "body": b'{"messages": []}', "more_body": False}
+
+    request = Request({"type": "http", "method": "POST", "path": "/chat", "headers": [], "client": ("test", 1)}, receive)
+    try:
+        response = await backend_app.chat_endpoint(request)
+        assert controller.active == 1
+        # what Starlette runs when the client disconnects before the body is sent
+        await response.background()
+        await response.background()
+    finally:
+        tracer.exporters.remove(exporter)
+
+    assert controller.active == 0
+    assert metrics.CHAT_SECONDS.count() == before + 1
+    assert [s.name for s in exporter.spans] == ["POST /chat"]
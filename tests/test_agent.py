@@ -1,10 +1,12 @@
-from main import run_sync_agent
 from tests.utils import get_tool_calls
 from agents import SearchResultSummary
 
+# every test inspects the same shared run (agent_run in conftest.py), which
+# is replayed from tests/fixtures unless pytest runs with --record-mode
 
-def test_agent_tool_calls_present():
-    result = run_sync_agent("recent research in transformer models")
+
+def test_agent_tool_calls_present(agent_run):
+    result = agent_run
     # print(result.output)
 
     tool_calls = get_tool_calls(result)
@@ -27,9 +29,8 @@ def test_agent_tool_calls_present():
 
 
     
-def test_agent_adds_references():
-    user_prompt = "recent research in transformer models"
-    result = run_sync_agent(user_prompt)
+def test_agent_adds_references(agent_run):
+    result = agent_run
 
     summary: SearchResultSummary = result.output
     print(summary.format_article())
@@ -40,8 +41,8 @@ def test_agent_adds_references():
     assert len(summary.summary) > 0, "Expected at summary section in the article"
     assert len(summary.references) > 0, "Expected at least one reference in the article"
 
-def test_agent_quality_check_after_search():
-    result = run_sync_agent("recent research in transformer models")
+def test_agent_quality_check_after_search(agent_run):
+    result = agent_run
     # print(result.output)
 
     tool_calls = get_tool_calls(result)
@@ -56,4 +57,4 @@ def test_agent_quality_check_after_search():
 
 
     assert len(tool_calls) > 0, "No tool calls found"
-    assert search_tool_calls == search_quality_check_tool_calls, "Search calls were not checked for quality"
\ No newline at end of file
+    assert search_tool_calls == search_quality_check_tool_calls, "Search calls were not checked for quality"
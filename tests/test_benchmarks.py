@@ -0,0 +1,96 @@
+import random
+from collections import Counter
+
+import pytest
+
+from benchmarks.corpus import get_vocabulary, iter_chunks, iter_papers, make_corpus, make_feed, make_pdf, make_queries
+from benchmarks.generate_corpus import bulk_load, open_index, search_latency
+from benchmarks.suite import compare, run_suite, stub_arxiv_to_text
+from tools import Agent_Tools, AsyncAgent_Tools, FetchQuery, shutdown_process_pool
+
+
+def test_corpus_is_repeatable_and_feeds_extract_data():
+    papers = make_corpus(3, words_per_paper=2000, seed=1)
+    assert papers == make_corpus(3, words_per_paper=2000, seed=1)
+    assert papers != make_corpus(3, words_per_paper=2000, seed=2)
+
+    with stub_arxiv_to_text(papers):
+        docs = Agent_Tools(es_index=None).extract_data(make_feed(papers))
+
+    assert {d["id"] for d in docs} == {p["id"] for p in papers}
+    assert docs[0]["authors"] == papers[0]["authors"]
+    assert docs[0]["content"] == papers[0]["text"][:5000]
+
+
+@pytest.mark.asyncio
+async def test_synthetic_pdf_parses_in_the_process_pool():
+    paper = make_corpus(1, words_per_paper=500, seed=1)[0]
+    entry = make_feed([paper]).entries[0]
+    tools = AsyncAgent_Tools(es_index=None, http_client=object())
+
+    try:
+        docs = await tools.parse_pdf(entry, make_pdf(paper["text"]))
+    finally:
+        shutdown_process_pool()
+
+    assert docs and docs[0]["id"] == paper["id"]
+    assert docs[0]["content"].split()[:20] == paper["text"].split()[:20]
+
+
+def test_suite_reports_every_benchmark_and_compares_to_baseline():
+    report = run_suite(sizes=[2], repeats=1, queries=5, words_per_paper=500)
+
+    assert set(report["results"]) == {
+        "sliding_window/2", "parse_pdf/2", "create_elasticsearch_index/2", "search/2"
+    }
+    search = report["results"]["search/2"]
+    assert search["items"] == 5
+    assert search["p50"] > 0 and search["peak_memory_bytes"] > 0
+
+    # search times every query once, the others report their fastest repeat
+    assert "min" not in search and report["results"]["sliding_window/2"]["min"] > 0
+    slower = {"results": {name: {**r, "p50": r["p50"] * 2, "min": r.get("min", 0) * 2} for name, r in report["results"].items()}}
+    rows = compare(slower, report, threshold=0.5, noise_floor=0)
+    assert all(row["regression"] for row in rows if row["metric"] in ("min", "p50"))
+    assert not any(row["regression"] for row in rows if row["metric"] == "peak_memory_bytes")
+    assert not any(row["regression"] for row in compare(report, report))
+
+
+def test_compare_ignores_growth_below_the_noise_floor():
+    def report(seconds, memory=1000):
+        return {"results": {"search/10": {"min": seconds, "p50": seconds * 2, "peak_memory_bytes": memory}}}
+
+    # +55% on a 0.2ms benchmark is jitter, +55% on 20ms is not
+    assert not any(row["regression"] for row in compare(report(0.00031), report(0.0002)))
+    assert [row["metric"] for row in compare(report(0.031), report(0.02)) if row["regression"]] == ["min"]
+    # reports without min fall back to p50
+    old = {"results": {"search/10": {"p50": 0.02, "peak_memory_bytes": 1000}}}
+    assert compare(report(0.01), old)[0]["metric"] == "p50"
+
+
+def test_vocabulary_is_zipfian():
+    counts = Counter(get_vocabulary().sample(random.Random(0), 100000))
+    ranked = [n for _, n in counts.most_common()]
+
+    # frequency ~ 1/rank: the top word is about twice the second and ten times the tenth
+    assert 1.5 < ranked[0] / ranked[1] < 2.5
+    assert 7 < ranked[0] / ranked[9] < 15
+    assert len(counts) > 5000
+
+
+@pytest.mark.asyncio
+async def test_generated_chunks_bulk_load_and_search():
+    papers = list(iter_papers(5, words_per_paper=800, seed=3))
+    chunks = list(iter_chunks(papers, size=2000, step=500))
+    assert len(chunks) > len(papers)
+    assert all(len(c["content"]) <= 2000 for c in chunks)
+    assert {c["id"] for c in chunks} == {p["id"] for p in papers}
+
+    tools = await open_index(None, "arxiv_chunks_scale_test")
+    loaded = await bulk_load(tools, iter(chunks), len(chunks), batch_size=7)
+    assert loaded["indexed"] == len(chunks)
+    assert (await tools.index.count(index="arxiv_chunks_scale_test"))["count"] == len(chunks)
+
+    results = await tools.search(FetchQuery(query=papers[0]["title"], paper_name=""))
+    assert results[0]["id"] == papers[0]["id"]
+    assert (await search_latency(tools, make_queries(5, seed=3)))["queries"] == 5
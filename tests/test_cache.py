@@ -0,0 +1,79 @@
+from backend.cache import AnswerCache, normalize_query
+
+
+def test_normalized_query_hits_cache():
+    cache = AnswerCache()
+    cache.put("Latest research in LoRA?", [], "# LoRA")
+
+    assert normalize_query("  latest   RESEARCH in lora ") == "latest research in lora"
+    assert cache.get("latest research in lora", []).answer == "# LoRA"
+    assert cache.get("latest research in lora", [{"role": "user", "content": "hi"}]) is None, \
+        "a different conversation must not share the cached answer"
+
+
+def test_entries_expire():
+    cache = AnswerCache(ttl=0)
+    cache.put("lora", [], "# LoRA")
+    assert cache.get("lora", []) is None
+    assert len(cache) == 0
+
+
+def test_newly_indexed_papers_invalidate_their_topic():
+    cache = AnswerCache()
+    cache.put("latest research in LoRA", [], "# LoRA")
+    cache.put("recent research in transformer models", [], "# Transformers")
+
+    cache.invalidate_docs([{"title": "LoRA-FAIR: Federated LoRA Fine-Tuning", "content": "..."}])
+
+    assert cache.get("latest research in LoRA", []) is None
+    assert cache.get("recent research in transformer models", []) is not None
+
+
+def test_generic_title_words_do_not_invalidate_unrelated_answers():
+    cache = AnswerCache()
+    cache.put("LoRA for large language models", [], "# LoRA")
+    cache.put("deep learning for protein folding", [], "# Proteins")
+    cache.put("large language models", [], "# LLMs")
+
+    cache.invalidate_docs([{"title": "Efficient Deep Learning of Large Language Models", "content": "..."}])
+
+    assert cache.get("LoRA for large language models", []) is not None
+    assert cache.get("deep learning for protein folding", []) is not None
+    # a question with only generic terms is still about this paper
+    assert cache.get("large language models", []) is None
+
+
+def test_least_recently_used_entry_is_evicted():
+    cache = AnswerCache(max_entries=2)
+    cache.put("a", [], "A")
+    cache.put("b", [], "B")
+    cache.get("a", [])
+    cache.put("c", [], "C")
+
+    assert cache.get("b", []) is None
+    assert cache.get("a", []) is not None
+
+
+def test_paraphrased_query_is_served_with_its_score():
+    cache = AnswerCache(similarity_threshold=0.8)
+    cache.put("summary of recent LoRA research", [], "# LoRA")
+    cache.put("recent research in transformer models", [], "# Transformers")
+
+    match = cache.lookup("what's new in LoRA?", [])
+    assert match is not None and not match.exact
+    assert match.entry.answer == "# LoRA"
+    assert match.score >= 0.8
+
+    match = cache.lookup("latest transformer model research", [])
+    assert match.entry.answer == "# Transformers"
+
+    assert cache.lookup("diffusion models for protein design", []) is None
+    assert cache.lookup("what's new in LoRA?", [{"role": "user", "content": "hi"}]) is None
+
+
+def test_exact_lookup_scores_one():
+    cache = AnswerCache()
+    cache.put("lora", [], "# LoRA")
+
+    match = cache.lookup("LoRA", [])
+    assert match.exact and match.score == 1.0
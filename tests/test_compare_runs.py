@@ -0,0 +1,59 @@
+from pathlib import Path
+
+import pandas as pd
+
+from evals.compare_runs import bootstrap_deltas, compare_runs, format_report
+
+EVALS = Path(__file__).parents[1] / "evals"
+
+
+def write_run(path, rows):
+    records = []
+    for question, passed, seconds, tokens in rows:
+        messages = [
+            {"kind": "request", "parts": [{"part_kind": "user-prompt", "content": f"Context: earlier\nCurrent query: {question}"}]},
+            {"kind": "response", "timestamp": "2025-12-18T12:00:00+00:00", "parts": [{"part_kind": "tool-call", "tool_name": "search"}]},
+            {"kind": "response", "timestamp": f"2025-12-18T12:00:{seconds:02d}+00:00", "parts": [{"part_kind": "text", "content": "answer"}]},
+        ]
+        usage = {"input_tokens": tokens, "output_tokens": 10, "requests": 2}
+        records.append({"agent_name": "orchestrator", "messages": repr(messages), "usage": repr(usage),
+                        "answer_relevant": passed, "answer_clear": True})
+    pd.DataFrame(records).to_csv(path)
+
+
+def test_compare_aligns_questions_and_reports_deltas(tmp_path):
+    questions = [f"question {i}" for i in range(8)]
+    write_run(tmp_path / "baseline_evals.csv", [(q, i % 2 == 0, 10, 1000) for i, q in enumerate(questions)])
+    write_run(tmp_path / "candidate_evals.csv", [(q, True, 20, 1500) for q in reversed(questions)] + [("new one", True, 5, 10)])
+
+    result = compare_runs(tmp_path / "baseline_evals.csv", tmp_path / "candidate_evals.csv", n_resamples=2000)
+
+    assert result["questions"] == 8
+    assert result["only_candidate"] == ["new one"]
+    checks, performance = result["checks"], result["performance"]
+    assert list(checks.index) == ["answer_relevant", "answer_clear"]
+    assert checks.loc["answer_relevant", "delta"] == 0.5
+    assert checks.loc["answer_relevant", "significant"]
+    assert checks.loc["answer_clear", "delta"] == 0 and not checks.loc["answer_clear", "significant"]
+    assert performance.loc["latency_seconds", "delta"] == 10
+    assert performance.loc["input_tokens", "relative"] == 0.5
+    assert performance.loc["tool_calls", "delta"] == 0
+    assert "* answer_relevant" in format_report(result)
+
+
+def test_bootstrap_interval_covers_the_delta():
+    baseline = pd.DataFrame({"score": [0.0, 1.0] * 50})
+    candidate = pd.DataFrame({"score": [0.0, 1.0] * 50})
+    candidate.iloc[:20] = 1.0
+
+    report = bootstrap_deltas(baseline, candidate, n_resamples=5000, seed=1)
+    row = report.loc["score"]
+    assert row["delta"] == 0.1
+    assert 0 < row["ci_low"] < 0.1 < row["ci_high"] < 0.2
+    assert bootstrap_deltas(baseline, candidate, n_resamples=5000, seed=1).equals(report)
+
+
+def test_committed_runs_align():
+    result = compare_runs(EVALS / "ground_truth", EVALS / "latest_evals", n_resamples=500)
+    assert result["questions"] == 10
+    assert result["performance"].loc["total_tokens", "baseline"] > 0
@@ -0,0 +1,61 @@
+from monitoring.condense import condense_log, render_log
+from monitoring.tokens import count_tokens
+
+
+def search_hits(*ids):
+    return [{"id": i, "title": f"paper {i}", "content": f"content of {i} " * 200} for i in ids]
+
+
+def make_entry():
+    return {
+        "messages": [
+            {"kind": "request", "parts": [
+                {"part_kind": "system-prompt", "content": "long instructions " * 500},
+                {"part_kind": "user-prompt", "content": "What is LoRA?"},
+            ]},
+            {"kind": "response", "parts": [
+                {"part_kind": "tool-call", "tool_name": "search", "tool_call_id": "a", "args": {"query": "lora", "paper_name": ""}},
+            ]},
+            {"kind": "request", "parts": [
+                {"part_kind": "tool-return", "tool_name": "search", "tool_call_id": "a", "content": search_hits("1", "2")},
+            ]},
+            {"kind": "response", "parts": [
+                {"part_kind": "tool-call", "tool_name": "search", "tool_call_id": "b", "args": '{"query": "low rank", "paper_name": ""}'},
+            ]},
+            {"kind": "request", "parts": [
+                {"part_kind": "tool-return", "tool_name": "search", "tool_call_id": "b", "content": search_hits("2", "3")},
+            ]},
+            {"kind": "response", "parts": [
+                {"part_kind": "tool-call", "tool_name": "final_result", "tool_call_id": "c", "args": {"summary": "LoRA adapts models."}},
+            ]},
+        ],
+        "output": {"summary": "LoRA adapts models."},
+        "usage": {"requests": 3, "input_tokens": 1000, "output_tokens": 50},
+    }
+
+
+def test_render_keeps_question_and_tool_order_and_dedups_hits():
+    text = render_log(make_entry())
+    lines = text.splitlines()
+
+    assert lines[0] == "QUESTION: What is LoRA?"
+    assert "long instructions" not in text
+    calls = [line for line in lines if line[:2] in ("1.", "2.", "3.")]
+    assert [c.split("(")[0] for c in calls] == ["1. search", "2. search", "3. final_result"]
+    assert "- [2] paper 2 (same as #1.2)" in text
+    assert "#2.2 [3] paper 3" in text
+    assert sum(line.strip().startswith("content of 2") for line in lines) == 1
+
+
+def test_condense_fits_token_budget():
+    entry = make_entry()
+    assert count_tokens(render_log(entry)) > 300
+
+    text = condense_log(entry, max_tokens=300)
+    assert count_tokens(text) <= 300
+    assert text.startswith("QUESTION: What is LoRA?")
+    assert "3. final_result" in text
+
+    short = condense_log(entry, max_tokens=40)
+    assert count_tokens(short) <= 40
+    assert short.endswith("[... log truncated to fit the token budget]")
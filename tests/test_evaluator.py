@@ -0,0 +1,64 @@
+import asyncio
+import json
+import os
+
+import pytest
+from pydantic_ai import Agent
+from pydantic_ai.messages import ModelResponse, ToolCallPart
+from pydantic_ai.models.function import FunctionModel
+
+# the module level eval_agent needs a key to be constructed, no request is made
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+from evals.evaluator import EVALUATIONS_FILE, CheckName, EvaluationChecklist, evaluate_logs, save_results
+
+
+def write_log(folder, name, question):
+    entry = {
+        "agent_name": "orchestrator",
+        "messages": [{"kind": "request", "parts": [{"part_kind": "user-prompt", "content": question}]}],
+        "output": {"summary": f"answer to {question}"},
+    }
+    (folder / f"{name}.json").write_text(json.dumps(entry))
+
+
+def make_eval_agent(fail_on=None):
+    state = {"running": 0, "max_running": 0, "calls": 0}
+
+    async def judge(messages, info):
+        state["calls"] += 1
+        state["running"] += 1
+        state["max_running"] = max(state["max_running"], state["running"])
+        await asyncio.sleep(0.01)
+        state["running"] -= 1
+        if fail_on and fail_on in str(messages[-1].parts[-1].content):
+            raise RuntimeError("rate limited")
+        checklist = [{"check_name": c.value, "reasoning": "ok", "check_pass": True} for c in CheckName]
+        return ModelResponse(parts=[ToolCallPart(info.output_tools[0].name, {"checklist": checklist, "summary": "good"})])
+
+    return Agent(FunctionModel(judge), output_type=EvaluationChecklist), state
+
+
+@pytest.mark.asyncio
+async def test_evaluations_are_concurrent_and_resumable(tmp_path):
+    logs = tmp_path / "logs"
+    logs.mkdir()
+    for i in range(6):
+        write_log(logs, f"orchestrator_run_{i}", f"question {i}")
+
+    agent, state = make_eval_agent(fail_on="question 3")
+    results = await evaluate_logs(logs, tmp_path, max_concurrency=2, agent=agent)
+
+    assert state["max_running"] == 2
+    assert sum(evaluation is not None for _, evaluation in results) == 5
+    assert len((tmp_path / EVALUATIONS_FILE).read_text().splitlines()) == 5
+
+    # a second run only evaluates the log that failed
+    agent, state = make_eval_agent()
+    results = await evaluate_logs(logs, tmp_path, max_concurrency=2, agent=agent)
+    assert state["calls"] == 1
+    assert all(evaluation is not None for _, evaluation in results)
+
+    save_results(results, tmp_path)
+    assert (tmp_path / "evals.csv").exists()
+    assert "instructions_follow,1.0" in (tmp_path / "all_metrics.csv").read_text()
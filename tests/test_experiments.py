@@ -0,0 +1,108 @@
+import asyncio
+import json
+import os
+
+import httpx
+import pytest
+from pydantic_ai import Agent
+from pydantic_ai.messages import ModelResponse, ToolCallPart
+from pydantic_ai.models.function import FunctionModel
+
+# the module level eval_agent needs a key to be constructed, no request is made
+os.environ.setdefault("OPENAI_API_KEY", "test")
+
+from embedded_index import EmbeddedElasticsearch
+from evals.evaluator import CheckName, EvaluationChecklist
+from evals.experiments import ExperimentConfig, cost, expand_grid, format_table, pick_best, run_experiments
+
+FEED = b"""<?xml version="1.0" encoding="UTF-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom">
+  <entry>
+    <id>http://arxiv.org/abs/2401.00001v1</id>
+    <title>Efficient Transformers</title>
+    <published>2024-01-01T00:00:00Z</published>
+    <summary>A survey of efficient transformers.</summary>
+    <author><name>A. Author</name></author>
+    <link href="http://arxiv.org/abs/2401.00001v1" rel="alternate" type="text/html"/>
+    <link title="pdf" href="http://arxiv.org/pdf/2401.00001v1" rel="related" type="application/pdf"/>
+  </entry>
+</feed>"""
+
+
+def arxiv_client(requests: list):
+    def handler(request):
+        requests.append(str(request.url))
+        if "api/query" in str(request.url):
+            return httpx.Response(200, content=FEED)
+        return httpx.Response(404)
+
+    return httpx.AsyncClient(transport=httpx.MockTransport(handler))
+
+
+def orchestrator(name: str, seconds: float):
+    """Fetches the same feed for every question, searches and answers."""
+    async def respond(messages, info):
+        await asyncio.sleep(seconds)
+        step = sum(isinstance(m, ModelResponse) for m in messages)
+        if step == 0:
+            call = ToolCallPart("get_data_to_index", json.dumps({"query": "transformers", "paper_name": ""}))
+        elif step == 1:
+            call = ToolCallPart("search", json.dumps({"query": "transformers", "paper_name": ""}))
+        else:
+            call = ToolCallPart("final_result", json.dumps({"title": "T", "summary": f"answer by {name.upper()}", "references": []}))
+        return ModelResponse(parts=[call])
+
+    return FunctionModel(respond, model_name=name)
+
+
+def make_judge():
+    # the slow model's answers pass every check, the fast one's fail answer_clear
+    async def judge(messages, info):
+        prompt = str(messages[-1].parts[-1].content)
+        checklist = [
+            {"check_name": c.value, "reasoning": "", "check_pass": not (c == CheckName.answer_clear and "answer by FAST" in prompt)}
+            for c in CheckName
+        ]
+        return ModelResponse(parts=[ToolCallPart(info.output_tools[0].name, {"checklist": checklist, "summary": ""})])
+
+    return Agent(FunctionModel(judge), output_type=EvaluationChecklist)
+
+
+def test_expand_grid_and_cost():
+    configs = expand_grid(orchestrator=["a", "b"], max_results=[3, 5], chunk_size=[2000])
+    assert len(configs) == 4
+    assert {c.chunk_size for c in configs} == {2000}
+    assert len({c.name for c in configs}) == 4
+
+    usage = {"openai:gpt-4o-mini": {"input_tokens": 1_000_000, "cache_read_tokens": 500_000, "output_tokens": 100_000, "requests": 3}}
+    assert cost(usage) == pytest.approx(0.5 * 0.15 + 0.5 * 0.075 + 0.1 * 0.60)
+    assert cost({"unknown": usage["openai:gpt-4o-mini"]}) is None
+
+
+@pytest.mark.asyncio
+async def test_experiments_share_caches_and_pick_the_fastest_good_config(tmp_path):
+    models = {"fast": orchestrator("fast", 0), "slow": orchestrator("slow", 0.05), "qc": FunctionModel(lambda m, i: None, model_name="qc")}
+    configs = expand_grid(orchestrator=["fast", "slow"], search_quality_check=["qc"], summarize=["qc"], max_results=[2])
+    requests = []
+    prices = {"fast": (1.0, 0.5, 2.0), "slow": (2.0, 1.0, 4.0), "qc": (0, 0, 0)}
+
+    rows = await run_experiments(
+        configs, ["q one", "q two", "q three"], EmbeddedElasticsearch(), tmp_path, concurrency=4,
+        http_client=arxiv_client(requests), model_factory=models.get, judge=make_judge(), prices=prices,
+    )
+
+    # six runs, one feed and one pdf download
+    assert len(requests) == 2
+    fast, slow = rows
+    assert fast["runs"] == slow["runs"] == 3 and fast["errors"] == slow["errors"] == 0
+    assert fast["latency_p50"] < slow["latency_p50"]
+    assert 0 < fast["cost_per_question"] < slow["cost_per_question"]
+    assert fast["tool_calls_per_question"] == 3
+    assert fast["answer_clear"] == 0 and slow["answer_clear"] == 1
+    assert slow["pass_rate"] == 1 and fast["pass_rate"] == pytest.approx(6 / 7)
+    assert (tmp_path / configs[0].name / "evals.csv").exists()
+
+    assert pick_best(rows)["config"] == fast["config"]
+    assert pick_best(rows, min_pass_rate=0.9)["config"] == slow["config"]
+    assert pick_best(rows, min_pass_rate=1.1) is None
+    assert f"->{slow['config']}" in format_table(rows, pick_best(rows, 0.9))
@@ -0,0 +1,61 @@
+from tools import Agent_Tools, FetchQuery, MAPPING_VERSION
+
+
+class FakeIndices:
+    def __init__(self):
+        self.mapping = None
+        self.calls = []
+
+    def exists(self, index):
+        self.calls.append("exists")
+        return self.mapping is not None
+
+    def create(self, index, body):
+        self.calls.append("create")
+        self.mapping = body["mappings"]
+
+    def get_mapping(self, index):
+        return {index: {"mappings": self.mapping}}
+
+    def put_mapping(self, index, body):
+        self.calls.append("put_mapping")
+        self.mapping = body
+
+
+class FakeElasticsearch:
+    def __init__(self):
+        self.indices = FakeIndices()
+        self.searches = 0
+
+    def ping(self):
+        return True
+
+    def search(self, index, body):
+        self.searches += 1
+        return {"hits": {"hits": [{"_source": {"title": "LoRA"}}]}}
+
+
+def test_index_is_bootstrapped_once():
+    es = FakeElasticsearch()
+    agent_tools = Agent_Tools(es_index=es)
+
+    for _ in range(3):
+        results = agent_tools.search(FetchQuery(query="lora", paper_name="lora"))
+        assert results == [{"title": "LoRA"}]
+
+    assert es.searches == 3
+    assert es.indices.calls == ["exists", "create"], "index checks should not run on every search"
+    assert agent_tools.status.ready
+    assert agent_tools.status.mapping_version == MAPPING_VERSION
+
+
+def test_outdated_mapping_is_upgraded():
+    es = FakeElasticsearch()
+    es.indices.mapping = {"properties": {"content": {"type": "text"}}}
+    agent_tools = Agent_Tools(es_index=es)
+
+    status = agent_tools.bootstrap()
+
+    assert status.ready
+    assert "put_mapping" in es.indices.calls
+    assert es.indices.mapping["_meta"]["mapping_version"] == MAPPING_VERSION
@@ -0,0 +1,103 @@
+import asyncio
+from types import SimpleNamespace
+
+import pydantic
+import pytest
+
+from backend.ingest import IngestJobManager, IngestRequest
+
+
+class FakeTools:
+    """Stands in for AsyncAgent_Tools; entry n yields n chunks, entry 3 has a broken pdf link."""
+
+    async def fetch_feed(self, search_query=None, id_list=None, max_results=None):
+        self.search_query = search_query
+        return SimpleNamespace(entries=[1, 2, 3])
+
+    async def ensure_ready(self):
+        pass
+
+    async def download_pdf(self, entry):
+        return None if entry == 3 else b"%PDF"
+
+    async def parse_pdf(self, entry, pdf_bytes):
+        return [{"content": "chunk"}] * entry
+
+    async def index_docs(self, doc):
+        return len(doc)
+
+
+def test_ingest_request_needs_exactly_one_source():
+    with pytest.raises(pydantic.ValidationError):
+        IngestRequest()
+    with pytest.raises(pydantic.ValidationError):
+        IngestRequest(query="lora", category="cs.CL")
+    assert IngestRequest(arxiv_ids=["2106.09685"]).arxiv_ids == ["2106.09685"]
+
+
+def test_ingest_request_caps_max_results():
+    with pytest.raises(pydantic.ValidationError):
+        IngestRequest(category="cs.CL", max_results=10_000)
+    with pytest.raises(pydantic.ValidationError):
+        IngestRequest(category="cs.CL", max_results=0)
+    assert IngestRequest(category="cs.CL", max_results=50).max_results == 50
+
+
+@pytest.mark.asyncio
+async def test_ingest_job_reports_progress():
+    tools = FakeTools()
+    manager = IngestJobManager(tools)
+
+    job = manager.submit(IngestRequest(category="cs.CL"))
+    assert job.status == "queued"
+    while job.status in ("queued", "running"):
+        await asyncio.sleep(0.01)
+
+    assert tools.search_query == "cat:cs.CL"
+    progress = manager.get(job.job_id).progress()
+    assert progress["status"] == "done"
+    assert progress["papers_found"] == 3
+    assert progress["papers_fetched"] == 2
+    assert progress["papers_parsed"] == 2
+    assert progress["papers_failed"] == 1
+    assert progress["chunks_indexed"] == 3
+    assert progress["chunks_per_second"] > 0
+
+
+class FlakyTools(FakeTools):
+    """Entry 2 fails to parse; counts downloads in flight."""
+
+    def __init__(self):
+        self.downloading = 0
+        self.peak_downloads = 0
+
+    async def fetch_feed(self, search_query=None, id_list=None, max_results=None):
+        return SimpleNamespace(entries=[1, 2, 4, 5, 6])
+
+    async def download_pdf(self, entry):
+        self.downloading += 1
+        self.peak_downloads = max(self.peak_downloads, self.downloading)
+        await asyncio.sleep(0.01)
+        self.downloading -= 1
+        return b"%PDF"
+
+    async def parse_pdf(self, entry, pdf_bytes):
+        if entry == 2:
+            raise ValueError("broken pdf")
+        return [{"content": "chunk"}] * entry
+
+
+@pytest.mark.asyncio
+async def test_failed_paper_is_counted_and_downloads_are_bounded():
+    tools = FlakyTools()
+    manager = IngestJobManager(tools, max_downloads=2)
+
+    job = manager.submit(IngestRequest(query="lora"))
+    while job.status in ("queued", "running"):
+        await asyncio.sleep(0.01)
+
+    assert job.status == "done"
+    assert job.papers_parsed == 4
+    assert job.papers_failed == 1
+    assert job.chunks_indexed == 1 + 4 + 5 + 6
+    assert tools.peak_downloads == 2
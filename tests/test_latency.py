@@ -0,0 +1,70 @@
+from monitoring.latency import LatencyAggregator, build_timeline, format_flame, format_folded
+
+
+def request(*parts):
+    return {"kind": "request", "parts": list(parts)}
+
+
+def response(*tool_names):
+    parts = [{"part_kind": "tool-call", "tool_name": name, "tool_call_id": f"{name}-{i}"} for i, name in enumerate(tool_names)]
+    return {"kind": "response", "timestamp": "2025-12-18T12:00:00+00:00", "parts": parts}
+
+
+def returned(name, i, second):
+    return {"part_kind": "tool-return", "tool_name": name, "tool_call_id": f"{name}-{i}", "timestamp": f"2025-12-18T12:00:{second:02d}+00:00"}
+
+
+def make_entry(tool_timings=None):
+    return {
+        "run_id": "r",
+        "agent_name": "orchestrator",
+        "messages": [
+            request({"part_kind": "user-prompt", "content": "q", "timestamp": "2025-12-18T12:00:00+00:00"}),
+            response("get_data_to_index"),
+            request(returned("get_data_to_index", 0, 10)),
+            response("search", "search"),
+            request(returned("search", 0, 12), returned("search", 1, 13)),
+            response("final_result"),
+            request(returned("final_result", 0, 20)),
+        ],
+        "tool_timings": tool_timings or [],
+    }
+
+
+def test_timeline_without_tool_timings_keeps_round_trips_whole():
+    timeline = build_timeline(make_entry())
+
+    assert timeline.seconds == 20
+    assert timeline.round_trips == 3
+    assert not timeline.split
+    assert [s.stages for s in timeline.steps] == [
+        {"round_trip:get_data_to_index": 10},
+        {"round_trip:search": 3},
+        {"model": 7},
+    ]
+
+
+def test_timeline_splits_model_and_parallel_tools():
+    timings = [
+        {"tool_name": "get_data_to_index", "tool_call_id": "get_data_to_index-0", "seconds": 8.0},
+        {"tool_name": "search", "tool_call_id": "search-0", "seconds": 1.0},
+        {"tool_name": "search", "tool_call_id": "search-1", "seconds": 1.0},
+    ]
+    timeline = build_timeline(make_entry(timings))
+
+    assert timeline.split
+    assert timeline.steps[0].stages == {"model": 2.0, "tool:get_data_to_index": 8.0}
+    # two parallel searches of 1s each take 1s of wall time
+    assert timeline.steps[1].stages == {"model": 2.0, "tool:search": 1.0}
+    assert timeline.steps[1].calls == {"tool:search": [1.0, 1.0]}
+
+    aggregator = LatencyAggregator()
+    aggregator.add(timeline)
+    report = aggregator.result()
+    assert list(report["stages"]) == ["model", "tool:get_data_to_index", "tool:search"]
+    assert report["stages"]["model"]["total_seconds"] == 11.0
+    assert report["stages"]["tool:search"]["samples"] == 2
+    assert report["model_seconds_per_run"]["p50"] == 11.0
+
+    assert format_flame(report).splitlines()[1].startswith("  model")
+    assert "all;tool;search 1000" in format_folded(report).splitlines()
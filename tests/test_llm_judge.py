@@ -1,15 +1,23 @@
 from pydantic import BaseModel
 from pydantic_ai import Agent
 from pydantic_ai import AgentRunResult
-from main import run_agent
-from tests.utils import get_tool_calls
+from pydantic_ai.messages import ModelMessagesTypeAdapter
 import pytest
 from agents import SearchResultSummary
+from monitoring.condense import condense_log
 
 judge_instructions = """
 you are an expert judge evaluating the performance of an AI search agent.
 """
 
+criteria = [
+    "agent makes at least 1 search call",
+    "agent makes a search_Quality_check call after every search call"
+    "there are at least 3 references provided"
+    "the references are appropriate and relevant to the topic",
+    "the summary contains broader introduction before describing finer details",
+]
+
 class JudgeCriterion(BaseModel):
     criterion_description: str
     passed: bool
@@ -21,11 +29,11 @@ class JudgeFeedback(BaseModel):
     feedback: str
 
 
-def create_judge():
+def create_judge(model="openai:gpt-4o-mini"):
     judge = Agent(
         name="judge",
         instructions=judge_instructions,
-        model="openai:gpt-4o-mini",
+        model=model,
         output_type=JudgeFeedback,
     )
     return judge
@@ -34,11 +42,15 @@ def create_judge():
 async def evaluate_agent_performance(
         criteria: list[str],
         result: AgentRunResult,
-        output_transformer: callable = None
+        output_transformer: callable = None,
+        model="openai:gpt-4o-mini",
 ) -> JudgeFeedback:
-    judge = create_judge()
+    judge = create_judge(model)
 
-    tool_calls = get_tool_calls(result)
+    # the judge sees the run condensed: tool calls in order, results shortened
+    log = condense_log({
+        "messages": ModelMessagesTypeAdapter.dump_python(result.all_messages(), mode="json"),
+    })
 
     output = result.output
     if output_transformer is not None:
@@ -55,10 +67,10 @@ The agent's final output was:
 {output}
 </AGENT_OUTPUT>
 
-Tool calls:
-<TOOL_CALLS>
-{'\n'.join([str(c) for c in tool_calls])}
-</TOOL_CALLS>
+The agent's run (question, tool calls and shortened results):
+<LOG>
+{log}
+</LOG>
     """
 
     print("Judge evaluating with prompt:")
@@ -73,23 +85,13 @@ Tool calls:
     return eval_results.output
 
 
-@pytest.mark.asyncio
-async def test_no_judicial_terms_in_search_queries():
-    criteria = [
-        "agent makes at least 1 search call",
-        "agent makes a search_Quality_check call after every search call"
-        "there are at least 3 references provided"
-        "the references are appropriate and relevant to the topic",
-        "the summary contains broader introduction before describing finer details",
-    ]
-
-    result = await run_agent("recent research in transformer models")
-
-    eval_results = await evaluate_agent_performance(
+def test_no_judicial_terms_in_search_queries(agent_run, judge_model, session_runner):
+    eval_results = session_runner.run(evaluate_agent_performance(
         criteria,
-        result,
-        output_transformer=lambda x: x.format_article()
-    )
+        agent_run,
+        output_transformer=lambda x: x.format_article(),
+        model=judge_model,
+    ))
 
     print(eval_results)
 
@@ -0,0 +1,50 @@
+import json
+
+import httpx
+import pytest
+
+from agents import NamedCallback
+from benchmarks.load_chat import chat_request, summarize
+from benchmarks.stub_agent import load_test_agent
+
+
+@pytest.mark.asyncio
+async def test_stub_agent_answers_from_the_local_index():
+    corpus = [{"id": "2401.00001v1", "title": "LoRA", "summary": "Low rank adaptation.", "content": "lora low rank adaptation"}]
+    tools, agent = load_test_agent(corpus, model_seconds=0)
+
+    result = await agent.run("Current query: what is lora", event_stream_handler=NamedCallback(agent))
+
+    tool_names = [p.tool_name for m in result.new_messages() for p in m.parts if p.part_kind == "tool-call"]
+    assert tool_names == ["search", "search_quality_check", "final_result"]
+    assert result.output.references[0].url == "https://arxiv.org/abs/2401.00001v1"
+    await tools.aclose()
+
+
+def ndjson_backend(request: httpx.Request) -> httpx.Response:
+    question = json.loads(request.content)["messages"][-1]["content"]
+    if question == "busy":
+        return httpx.Response(503, json={"error": "queue_full"})
+    events = [{"type": "token", "content": "# A", "cached": False}, {"type": "token", "content": "nswer", "cached": False}]
+    if question == "broken":
+        events.append({"type": "error", "message": "boom"})
+    return httpx.Response(200, content="".join(json.dumps(e) + "\n" for e in events))
+
+
+@pytest.mark.asyncio
+async def test_chat_requests_are_parsed_and_summarized():
+    async with httpx.AsyncClient(transport=httpx.MockTransport(ndjson_backend)) as client:
+        results = [await chat_request(client, "http://backend", q, "load-1", 0.0) for q in ("lora", "busy", "broken")]
+
+    ok, busy, broken = results
+    assert ok["error"] is None and ok["events"] == 2 and ok["ttfe"] <= ok["seconds"]
+    assert busy["error"] == "http_503:queue_full"
+    assert broken["error"] == "stream_error"
+
+    samples = [{"t": 0.0, "active": 1, "queue_depth": 0}, {"t": 0.5, "active": 8, "queue_depth": 3}]
+    report = summarize(results, samples, wall_seconds=2.0, concurrency=3)
+    assert report["ok"] == 1
+    assert report["errors"] == {"http_503:queue_full": 1, "stream_error": 1}
+    assert report["error_rate"] == pytest.approx(2 / 3)
+    assert report["throughput_rps"] == 0.5
+    assert report["queue"]["max_queue_depth"] == 3
@@ -0,0 +1,58 @@
+import json
+
+from monitoring.log_query import LogFilter, Reservoir, aggregate_runs, query_runs
+from monitoring.log_writer import LogWriter
+
+
+def make_entry(run_id, timestamp, tools, agent_name="orchestrator", tokens=100):
+    messages = [{"kind": "request", "parts": [{"part_kind": "user-prompt", "content": "q", "timestamp": timestamp}]}]
+    for tool in tools:
+        messages.append({"kind": "response", "timestamp": timestamp, "parts": [{"part_kind": "tool-call", "tool_name": tool}]})
+    return {
+        "run_id": run_id,
+        "timestamp": timestamp,
+        "agent_name": agent_name,
+        "model": "gpt-4o-mini",
+        "messages": messages,
+        "usage": {"input_tokens": tokens, "output_tokens": 10, "requests": len(tools)},
+        "output": {"summary": "s"},
+    }
+
+
+def write_mixed_logs(folder):
+    # one legacy per-run file and two runs in the segmented format
+    legacy = make_entry("orchestrator_20251218_121154_24b994", "2025-12-18T12:11:28+00:00", ["search", "final_result"])
+    (folder / "orchestrator_20251218_121154_24b994.json").write_text(json.dumps(legacy))
+
+    writer = LogWriter(folder=folder)
+    writer.write(make_entry("b", "2025-12-19T09:00:00+00:00", ["search", "get_data_to_index", "search"]))
+    writer.write(make_entry("c", "2025-12-20T09:00:00+00:00", ["search"], agent_name="summarize"))
+    writer.close()
+
+
+def test_query_filters_both_formats(tmp_path):
+    write_mixed_logs(tmp_path)
+
+    assert {r.run_id for r in query_runs(tmp_path)} == {"orchestrator_20251218_121154_24b994", "b", "c"}
+    assert [r.run_id for r in query_runs(tmp_path, LogFilter(tool="get_data_to_index"))] == ["b"]
+    assert [r.run_id for r in query_runs(tmp_path, LogFilter(agent="summarize"))] == ["c"]
+    assert [r.run_id for r in query_runs(tmp_path, LogFilter(since="2025-12-19", until="2025-12-19"))] == ["b"]
+
+
+def test_aggregates(tmp_path):
+    write_mixed_logs(tmp_path)
+
+    stats = aggregate_runs(tmp_path)
+    assert stats["runs"] == 3
+    assert stats["tool_calls"] == {"search": 4, "final_result": 1, "get_data_to_index": 1}
+    assert stats["runs_per_day"] == {"2025-12-18": 1, "2025-12-19": 1, "2025-12-20": 1}
+    assert stats["tokens_per_run"]["p50"] == 110
+
+
+def test_reservoir_memory_is_bounded():
+    reservoir = Reservoir(size=100)
+    for i in range(10000):
+        reservoir.add(i)
+
+    assert len(reservoir.values) == 100
+    assert 3000 < reservoir.percentile(50) < 7000
@@ -0,0 +1,129 @@
+import json
+import threading
+import time
+
+import pytest
+
+from monitoring.log_store import iter_index, iter_segment, read_run
+from monitoring.log_writer import LogWriter
+from monitoring.metrics import ERRORS
+
+
+def read_segments(folder):
+    entries = []
+    for path in sorted(folder.rglob("segment_*")):
+        entries.extend(iter_segment(path))
+    return entries
+
+
+def make_entry(run_id, **extra):
+    return {
+        "kind": "run",
+        "run_id": run_id,
+        "timestamp": "2025-12-18T12:11:28",
+        "agent_name": "orchestrator",
+        "system_prompt": ["You are a helpful assistant"],
+        "provider": "openai",
+        "model": "gpt-4o-mini",
+        "tools": ["search"],
+        "messages": [],
+        "usage": {"input_tokens": 10, "output_tokens": 5, "requests": 1},
+        **extra,
+    }
+
+
+def test_entries_are_appended_in_background(tmp_path):
+    writer = LogWriter(folder=tmp_path)
+    for i in range(10):
+        assert writer.write(make_entry(f"run_{i}"))
+    writer.flush(timeout=5)
+
+    assert [e["run_id"] for e in read_segments(tmp_path)] == [f"run_{i}" for i in range(10)]
+    writer.close()
+
+
+def test_segments_are_partitioned_and_share_one_config(tmp_path):
+    writer = LogWriter(folder=tmp_path)
+    writer.write(make_entry("a"))
+    writer.write(make_entry("b", agent_name="summarize", timestamp="2025-12-19T08:00:00"))
+    writer.write(make_entry("c"))
+    writer.close()
+
+    assert len(list((tmp_path / "2025-12-18" / "orchestrator").glob("segment_*.jsonl.gz"))) == 1
+    assert len(list((tmp_path / "2025-12-19" / "summarize").glob("segment_*.jsonl.gz"))) == 1
+    assert len(list((tmp_path / "configs").glob("*.json"))) == 1
+    assert all("system_prompt" not in e for e in read_segments(tmp_path))
+
+
+def test_run_is_found_through_the_index(tmp_path):
+    writer = LogWriter(folder=tmp_path, max_segment_bytes=200)
+    for i in range(5):
+        writer.write(make_entry(f"run_{i}", padding="x" * 100))
+    writer.close()
+
+    assert len(list(tmp_path.rglob("segment_*"))) > 1
+    records = list(iter_index(tmp_path))
+    assert [r["run_id"] for r in records] == [f"run_{i}" for i in range(5)]
+    assert records[0]["input_tokens"] == 10
+
+    run = read_run(tmp_path, "run_3")
+    assert run["run_id"] == "run_3"
+    assert run["system_prompt"] == ["You are a helpful assistant"], "config should be filled back in"
+    assert read_run(tmp_path, "missing") is None
+
+
+def test_full_queue_drops_instead_of_blocking(tmp_path):
+    writer = LogWriter(folder=tmp_path, max_queue=1)
+    results = [writer.write(make_entry(i)) for i in range(1000)]
+    writer.close()
+
+    assert writer.dropped == results.count(False)
+    assert len(read_segments(tmp_path)) == results.count(True)
+
+
+def test_failing_entries_are_counted_and_the_thread_keeps_writing(tmp_path):
+    def serializer(value):
+        raise RuntimeError("cannot serialize")
+
+    before = ERRORS.value(stage="log_writer")
+    writer = LogWriter(folder=tmp_path, serializer=serializer)
+    writer.write(make_entry("a"))
+    writer.write(make_entry("b", extra=object()))
+    writer.write(make_entry("c"))
+    writer.flush(timeout=5)
+
+    assert [e["run_id"] for e in read_segments(tmp_path)] == ["a", "c"]
+    assert ERRORS.value(stage="log_writer") == before + 1
+    assert writer._thread.is_alive()
+    writer.close()
+
+
+def test_dead_writer_thread_is_restarted(tmp_path):
+    writer = LogWriter(folder=tmp_path)
+    writer.write(make_entry("a"))
+    writer.close()
+
+    # a thread that exited on an unexpected error
+    writer._thread = threading.Thread(target=lambda: None)
+    writer._thread.start()
+    writer._thread.join()
+
+    writer.write(make_entry("b"))
+    writer.flush()
+
+    # two segments, close() ended the first one
+    assert {e["run_id"] for e in read_segments(tmp_path)} == {"a", "b"}
+    writer.close()
+
+
+def test_flush_raises_when_the_thread_dies(tmp_path):
+    writer = LogWriter(folder=tmp_path)
+    writer.write(make_entry("a"))
+    writer.close()
+
+    # a writer thread that exits without taking the flush request
+    writer._thread = threading.Thread(target=time.sleep, args=(0.2,))
+    writer._thread.start()
+
+    with pytest.raises(RuntimeError):
+        writer.flush()
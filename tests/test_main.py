@@ -0,0 +1,18 @@
+import main
+
+
+def test_runner_is_created_lazily_and_closed():
+    assert main._runner is None
+
+    runner = main.get_runner()
+    assert main.get_runner() is runner
+    assert runner.run(_answer()) == 42
+
+    main.close_runner()
+    assert main._runner is None
+    # closing twice (e.g. atexit after an explicit close) is a no-op
+    main.close_runner()
+
+
+async def _answer():
+    return 42
@@ -0,0 +1,29 @@
+import pytest
+
+from monitoring import metrics
+
+
+def test_histogram_renders_cumulative_buckets():
+    histogram = metrics.Histogram("test_latency_seconds", "test", buckets=(0.1, 1))
+    histogram.observe(0.05, stage="a")
+    histogram.observe(0.5, stage="a")
+    histogram.observe(5, stage="a")
+
+    lines = histogram.render()
+    assert 'test_latency_seconds_bucket{stage="a",le="0.1"} 1' in lines
+    assert 'test_latency_seconds_bucket{stage="a",le="1"} 2' in lines
+    assert 'test_latency_seconds_bucket{stage="a",le="+Inf"} 3' in lines
+    assert 'test_latency_seconds_count{stage="a"} 3' in lines
+    assert "# TYPE test_latency_seconds histogram" in metrics.render()
+
+
+def test_timed_counts_errors():
+    histogram = metrics.Histogram("test_failing_seconds", "test")
+    before = metrics.ERRORS.value(stage="test_failing")
+
+    with pytest.raises(ValueError):
+        with metrics.timed(histogram, tool="x"):
+            raise ValueError("boom")
+
+    assert histogram.count(tool="x") == 1
+    assert metrics.ERRORS.value(stage="test_failing") == before + 1
@@ -0,0 +1,121 @@
+import json
+
+import httpx
+import pytest
+from pydantic_ai.messages import ModelResponse, ToolCallPart
+from pydantic_ai.models.function import FunctionModel
+
+from agents import NamedCallback, create_agents
+from embedded_index import EmbeddedElasticsearch
+from tests.recording import (
+    FixtureMissing, FixtureStore, RecordedElasticsearch, RecordedTools, RecordingModel, _operation_bytes, replaying_model
+)
+from tests.utils import get_tool_calls
+
+FEED = b"""<?xml version="1.0" encoding="UTF-8"?>
+<feed xmlns="http://www.w3.org/2005/Atom">
+  <entry>
+    <id>http://arxiv.org/abs/2401.00001v1</id>
+    <title>Efficient Transformers</title>
+    <published>2024-01-01T00:00:00Z</published>
+    <summary>A survey of efficient transformers.</summary>
+    <author><name>A. Author</name></author>
+    <link href="http://arxiv.org/abs/2401.00001v1" rel="alternate" type="text/html"/>
+    <link title="pdf" href="http://arxiv.org/pdf/2401.00001v1" rel="related" type="application/pdf"/>
+  </entry>
+</feed>"""
+
+
+class FakeArxiv:
+    """Stands in for the arXiv API while recording: serves FEED, pdfs are not found."""
+
+    def __init__(self):
+        self.requests = 0
+
+    async def get(self, url, params=None):
+        self.requests += 1
+        request = httpx.Request("GET", url, params=params)
+        if "api/query" in url:
+            return httpx.Response(200, content=FEED, request=request)
+        return httpx.Response(404, request=request)
+
+    async def aclose(self):
+        pass
+
+
+def scripted_models(calls: list):
+    """Orchestrator: search, get_data_to_index, search_quality_check, final_result (JSON args, like OpenAI)."""
+    script = [
+        ToolCallPart("search", json.dumps({"query": "transformers", "paper_name": ""}), tool_call_id="c1"),
+        ToolCallPart("get_data_to_index", json.dumps({"query": "transformers", "paper_name": ""}), tool_call_id="c2"),
+        ToolCallPart("search_quality_check", json.dumps({"params": {"user_query": "transformers", "search_results": []}}), tool_call_id="c3"),
+        ToolCallPart("final_result", json.dumps({"title": "T", "summary": "S", "references": [{"title": "T", "url": "u"}]}), tool_call_id="c4"),
+    ]
+
+    async def orchestrator(messages, info):
+        calls.append("orchestrator")
+        step = sum(isinstance(m, ModelResponse) for m in messages)
+        return ModelResponse(parts=[script[step]])
+
+    async def quality_check(messages, info):
+        calls.append("search_quality_check")
+        output = {"results_evaluation": [], "overall_quality_score": 0.9, "decision": "Good enough", "suggested_search_terms": []}
+        return ModelResponse(parts=[ToolCallPart(info.output_tools[0].name, output)])
+
+    return {
+        "orchestrator": FunctionModel(orchestrator),
+        "search_quality_check": FunctionModel(quality_check),
+    }
+
+
+def build(store, record: bool, backend, models, http_client=None):
+    tools = RecordedTools(RecordedElasticsearch(backend, store, record), store, record, http_client=http_client)
+    return create_agents(tools, models=models)
+
+
+@pytest.mark.asyncio
+async def test_recorded_run_replays_offline(tmp_path):
+    store = FixtureStore(tmp_path)
+
+    # record against "live" services: scripted models, an index with one document, a fake arXiv
+    live_calls = []
+    backend = EmbeddedElasticsearch()
+    await backend.index(index="arxiv_chunks", document={"id": "1", "title": "Transformers", "content": "transformers"})
+    arxiv = FakeArxiv()
+    models = {name: RecordingModel(model, store) for name, model in scripted_models(live_calls).items()}
+    recorded = await build(store, True, backend, models, arxiv).run("recent research in transformer models")
+
+    assert arxiv.requests == 2  # the feed and the (missing) pdf
+    assert {p.parent.name for p in tmp_path.glob("*/*.json.gz")} == {"llm", "es_search", "arxiv_feed", "arxiv_paper"}
+
+    # replay with no models, an empty index and no network, streaming like the server does
+    replay_models = {name: replaying_model(store) for name in ("orchestrator", "search_quality_check")}
+    agent = build(store, False, EmbeddedElasticsearch(), replay_models)
+    replayed = await agent.run("recent research in transformer models", event_stream_handler=NamedCallback(agent))
+
+    assert replayed.output == recorded.output
+    assert get_tool_calls(replayed) == get_tool_calls(recorded)
+    searched = [p.content for m in replayed.new_messages() for p in m.parts if getattr(p, "tool_name", None) == "search" and p.part_kind == "tool-return"]
+    assert searched == [[{"id": "1", "title": "Transformers", "content": "transformers"}]]
+    assert len(live_calls) == 5
+
+    # an unrecorded request fails instead of going to the network
+    with pytest.raises(FixtureMissing):
+        await build(store, False, EmbeddedElasticsearch(), replay_models).run("something else")
+
+
+def test_fixtures_are_byte_stable(tmp_path):
+    store = FixtureStore(tmp_path)
+    store.put("llm", "k", {"b": 1, "a": [1, 2]})
+    first = store.path("llm", "k").read_bytes()
+    store.put("llm", "k", {"a": [1, 2], "b": 1})
+
+    assert store.path("llm", "k").read_bytes() == first
+    assert store.get("llm", "k") == json.loads('{"a": [1, 2], "b": 1}')
+
+
+def test_bulk_digest_ignores_key_order():
+    # a replayed paper comes back from its fixture with sorted keys
+    recorded = json.dumps({"title": "T", "content": "c", "id": "1"})
+    replayed = json.dumps({"content": "c", "id": "1", "title": "T"}).encode()
+    assert _operation_bytes(recorded) == _operation_bytes(replayed) == _operation_bytes({"id": "1", "title": "T", "content": "c"})
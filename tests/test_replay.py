@@ -0,0 +1,43 @@
+from pathlib import Path
+
+import pytest
+
+from embedded_index import EmbeddedElasticsearch
+from monitoring.replay import load_runs, replay_runs
+from tools import AsyncAgent_Tools, FetchQuery
+
+EVAL_LOGS = Path(__file__).parents[1] / "evals" / "latest_evals" / "eval_logs"
+
+
+@pytest.mark.asyncio
+async def test_embedded_index_behaves_like_elasticsearch():
+    tools = AsyncAgent_Tools(es_index=EmbeddedElasticsearch())
+    assert (await tools.bootstrap()).ready
+
+    indexed = await tools.index_docs([
+        {"id": "1", "title": "LoRA", "content": "low rank adaptation of large language models"},
+        {"id": "2", "title": "Diffusion", "content": "image diffusion models and language guidance"},
+        {"id": "3", "title": "Speech", "content": "speech recognition"},
+    ])
+    assert indexed == 3
+
+    results = await tools.search(FetchQuery(query="low rank language", paper_name=""))
+    assert [r["id"] for r in results] == ["1", "2"]
+
+    # a deleted index is recreated on the next search, like with a real cluster
+    await tools.index.indices.delete(index=tools.index_name)
+    assert await tools.search(FetchQuery(query="lora", paper_name="")) == []
+    assert tools.status.ready
+
+
+@pytest.mark.asyncio
+async def test_replay_reproduces_logged_run_offline():
+    runs = load_runs(EVAL_LOGS, limit=1)
+    report = await replay_runs(runs, EmbeddedElasticsearch())
+
+    result = report["results"][0]
+    assert report["errors"] == 0
+    assert result["same_output"]
+    assert result["tool_calls"] == ["search", "get_data_to_index", "search", "search_quality_check"]
+    assert result["search_overlap"] == 1.0
+    assert {"model", "tool:search", "es:search", "es:bulk"} <= set(report["stages"])
@@ -0,0 +1,48 @@
+import math
+
+import pytest
+
+from evals.retrieval_benchmark import arxiv_id, load_questions, ndcg_at_k, run_benchmark, score_query
+
+
+def test_load_questions_skips_multiline_answer_rows():
+    questions = load_questions()
+    assert len(questions) == 10
+    assert questions[0] == "give me a summary of the latest research in LoRA?"
+
+
+def test_arxiv_id_from_reference_urls():
+    assert arxiv_id("https://arxiv.org/abs/2411.14961v3") == "2411.14961v3"
+    assert arxiv_id("http://arxiv.org/pdf/2411.14961v3.pdf") == "2411.14961v3"
+    assert arxiv_id("https://example.com/paper") is None
+
+
+def test_scores_collapse_chunks_into_papers():
+    chunks = [{"id": "a"}, {"id": "a"}, {"id": "b"}, {"id": "c"}]
+    scores = score_query(chunks, {"b", "d"}, [2, 4])
+
+    # the top 2 chunks are both from paper a
+    assert scores[2] == {"recall": 0.0, "mrr": 0.0, "ndcg": 0.0}
+    assert scores[4]["recall"] == 0.5
+    assert scores[4]["mrr"] == 0.5
+    assert scores[4]["ndcg"] == pytest.approx((1 / math.log2(3)) / (1 + 1 / math.log2(3)))
+    assert ndcg_at_k(["b", "d"], {"b", "d"}, 2) == 1.0
+
+
+@pytest.mark.asyncio
+async def test_benchmark_on_embedded_index():
+    corpus = [
+        {"id": "1", "title": "LoRA", "content": "low rank adaptation of large language models"},
+        {"id": "2", "title": "Whales", "content": "history of commercial whaling"},
+        {"id": "3", "title": "Greenhouse", "content": "model predictive control for greenhouse climate"},
+    ]
+    labels = {"what is low rank adaptation": {"1"}, "greenhouse climate control": {"3"}}
+    questions = ["What is low rank adaptation", "Greenhouse climate control", "unlabeled question"]
+
+    report = await run_benchmark(questions, labels, corpus, ks=[1, 3])
+
+    assert report["queries"] == 2
+    assert report["unlabeled"] == 1
+    assert report["metrics"][1] == {"recall": 1.0, "mrr": 1.0, "ndcg": 1.0}
+    assert report["index"]["chunks"] == 3
+    assert report["latency"]["p50"] is not None
@@ -0,0 +1,68 @@
+import asyncio
+import json
+
+import pytest
+from pydantic_ai import Agent
+from pydantic_ai.messages import ModelResponse, TextPart, ToolCallPart
+from pydantic_ai.models.function import DeltaToolCall, FunctionModel
+
+from agents import NamedCallback
+from monitoring.log_query import RunAggregator, summarize_run
+
+
+def make_agent():
+    calls = {"n": 0}
+
+    async def stream(messages, info):
+        calls["n"] += 1
+        if calls["n"] == 1:
+            # two tool calls in one response run concurrently
+            yield {0: DeltaToolCall(name="search", json_args=json.dumps({"query": "lora"}), tool_call_id="a")}
+            yield {1: DeltaToolCall(name="search", json_args=json.dumps({"query": "qlora"}), tool_call_id="b")}
+        else:
+            yield "done"
+
+    agent = Agent(FunctionModel(stream_function=stream), name="orchestrator")
+
+    @agent.tool_plain
+    async def search(query: str) -> list[dict]:
+        await asyncio.sleep(0.05 if query == "lora" else 0.01)
+        return [{"title": query, "content": "x" * 400}]
+
+    return agent
+
+
+@pytest.mark.asyncio
+async def test_callback_pairs_calls_with_results():
+    agent = make_agent()
+    callback = NamedCallback(agent)
+    await agent.run("find lora papers", event_stream_handler=callback)
+
+    timings = {t.tool_call_id: t for t in callback.tool_timings}
+    assert set(timings) == {"a", "b"}
+    assert timings["a"].seconds >= 0.05 > timings["b"].seconds
+    assert timings["a"].args_bytes == len('{"query": "lora"}')
+    assert timings["a"].result_bytes > 400
+    assert timings["a"].result_tokens > 0
+    assert not timings["a"].retry
+
+
+def test_aggregator_ranks_tools_by_time():
+    entry = {
+        "run_id": "r",
+        "messages": [],
+        "tool_timings": [
+            {"tool_name": "search", "seconds": 0.5, "result_tokens": 100},
+            {"tool_name": "get_data_to_index", "seconds": 3.0, "result_tokens": 5},
+            {"tool_name": "search", "seconds": 1.5, "result_tokens": 300},
+        ],
+    }
+    aggregator = RunAggregator()
+    aggregator.add(summarize_run(entry))
+
+    tool_time = aggregator.result()["tool_time"]
+    assert list(tool_time) == ["get_data_to_index", "search"]
+    assert tool_time["search"]["calls"] == 2
+    assert tool_time["search"]["total_seconds"] == 2.0
+    assert tool_time["get_data_to_index"]["share_of_tool_time"] == 0.6
+    assert tool_time["search"]["result_tokens_per_call"] == 200
@@ -0,0 +1,80 @@
+import json
+
+import pytest
+from pydantic import BaseModel
+from pydantic_ai import Agent
+from pydantic_ai.messages import ModelResponse, ToolCallPart
+from pydantic_ai.models.function import FunctionModel
+
+from evals.retrieval_benchmark import load_questions
+from tests.recording import FixtureMissing, create_recorded_agents
+from tests.tool_trace import GOLDEN_FILE, TOLERANCES, TraceTolerance, load_golden, regressions, save_golden, tool_trace
+
+
+class Answer(BaseModel):
+    answer: str
+
+
+@pytest.mark.parametrize("question", load_questions())
+def test_tool_trace_within_golden(question, record_mode, fixture_store, session_runner, update_golden):
+    agent = create_recorded_agents(fixture_store, record_mode)
+    try:
+        # not streamed, so replays report the recorded token usage
+        result = session_runner.run(agent.run(question))
+    except FixtureMissing as e:
+        pytest.fail(
+            f"{e}: the orchestrator's requests changed (e.g. a prompt or tool edit), so a replay cannot tell "
+            "whether its steps grew; check with --record-mode=live, then re-record"
+        )
+
+    trace = tool_trace(result)
+    golden = load_golden()
+    if update_golden:
+        golden[question] = trace
+        save_golden(golden)
+        return
+    assert question in golden, f"no golden trace for {question!r} in {GOLDEN_FILE}; write it with --update-golden"
+
+    problems = regressions(trace, golden[question], TOLERANCES[record_mode])
+    assert not problems, "orchestrator trace grew: " + "; ".join(problems)
+
+
+def scripted_run(steps: int):
+    """A run with `steps` search calls before the final result."""
+    async def respond(messages, info):
+        step = sum(isinstance(m, ModelResponse) for m in messages)
+        if step < steps:
+            return ModelResponse(parts=[ToolCallPart("search", json.dumps({"query": f"q{step}"}))])
+        return ModelResponse(parts=[ToolCallPart(info.output_tools[0].name, json.dumps({"answer": "a"}))])
+
+    agent = Agent(FunctionModel(respond), output_type=Answer)
+
+    @agent.tool_plain
+    def search(query: str) -> str:
+        return f"results for {query}"
+
+    return agent.run_sync("question")
+
+
+def test_trace_counts_round_trips_and_tokens():
+    trace = tool_trace(scripted_run(2))
+    assert trace["tools"] == ["search", "search", "final_result"]
+    assert trace["round_trips"] == 3
+    assert trace["tool_calls"] == 3
+    assert trace["total_tokens"] > 0
+
+
+def test_regressions_respect_the_tolerance(tmp_path):
+    baseline = tool_trace(scripted_run(1))
+    longer = tool_trace(scripted_run(2))
+
+    assert regressions(baseline, baseline) == []
+    assert regressions(baseline, longer) == []  # fewer steps is fine
+    problems = regressions(longer, baseline)
+    assert any(p.startswith("round_trips 2 -> 3") for p in problems)
+    assert any(p.startswith("tool_calls 2 -> 3") for p in problems)
+    assert regressions(longer, baseline, TraceTolerance(round_trips=1, tool_calls=1, total_tokens=1.0)) == []
+
+    save_golden({"question": baseline}, tmp_path / "traces.json")
+    assert load_golden(tmp_path / "traces.json") == {"question": baseline}
+    assert load_golden(tmp_path / "missing.json") == {}
@@ -0,0 +1,82 @@
+import asyncio
+
+import pytest
+from pydantic_ai import Agent
+from pydantic_ai.models.function import FunctionModel
+from pydantic_ai.messages import ModelResponse, TextPart
+
+from monitoring.tracing import (
+    InMemoryExporter, JsonlExporter, TracedModel, Tracer, current_trace_id, format_trace, read_trace, tracer
+)
+
+
+def test_spans_nest_and_share_trace():
+    exporter = InMemoryExporter()
+    local = Tracer([exporter])
+
+    with local.span("request", kind="server") as root:
+        with local.span("tool") as child:
+            pass
+
+    assert child.trace_id == root.trace_id
+    assert child.parent_span_id == root.span_id
+    assert root.parent_span_id is None
+    # children finish first
+    assert [s.name for s in exporter.spans] == ["tool", "request"]
+    assert root.status_code == "OK" and root.duration >= child.duration
+
+
+@pytest.mark.asyncio
+async def test_spans_follow_asyncio_tasks():
+    exporter = InMemoryExporter()
+    local = Tracer([exporter])
+
+    async def tool(name):
+        with local.span(name):
+            await asyncio.sleep(0)
+
+    with local.span("request") as root:
+        await asyncio.gather(tool("a"), tool("b"))
+
+    children = [s for s in exporter.spans if s.name in ("a", "b")]
+    assert {s.parent_span_id for s in children} == {root.span_id}
+
+
+def test_exception_marks_span_as_error(tmp_path):
+    path = tmp_path / "spans.jsonl"
+    local = Tracer([JsonlExporter(path)])
+
+    with pytest.raises(ValueError):
+        with local.span("request") as root:
+            with local.span("elasticsearch search", kind="client"):
+                raise ValueError("index missing")
+
+    spans = read_trace(path, root.trace_id)
+    assert [s["name"] for s in spans] == ["request", "elasticsearch search"]
+    assert all(s["status"]["code"] == "ERROR" for s in spans)
+    assert spans[1]["events"][0]["attributes"]["exception.message"] == "index missing"
+
+    tree = format_trace(spans).splitlines()
+    assert tree[0].startswith("request") and tree[1].startswith("  elasticsearch search")
+
+
+@pytest.mark.asyncio
+async def test_traced_model_records_llm_calls():
+    def reply(messages, info):
+        return ModelResponse(parts=[TextPart("done")])
+
+    agent = Agent(TracedModel(FunctionModel(reply)), name="summarize")
+    exporter = InMemoryExporter()
+    tracer.exporters.append(exporter)
+    try:
+        with tracer.span("invoke_agent summarize") as root:
+            await agent.run("hello")
+            assert current_trace_id() == root.trace_id
+    finally:
+        tracer.exporters.remove(exporter)
+
+    llm_calls = [s for s in exporter.get_trace(root.trace_id) if s.kind == "client"]
+    assert len(llm_calls) == 1
+    assert llm_calls[0].parent_span_id == root.span_id
+    assert llm_calls[0].attributes["gen_ai.request.model"] == agent.model.model_name
+    assert llm_calls[0].attributes["gen_ai.usage.output_tokens"] > 0
@@ -0,0 +1,77 @@
+"""
+Golden tool traces of the orchestrator.
+
+A trace is what a run costs in orchestrator round trips: the tool calls
+(tests/utils.get_tool_calls, final_result included), the number of model
+responses and the orchestrator's input + output tokens. The traces of the
+question set are stored in tests/fixtures/tool_traces.json, and a run
+whose round trips, tool calls or tokens grow past the tolerance fails.
+
+The committed traces are those of the logged real runs the fixtures are
+built from (tests/logged_runs.py). Replays catch code changes that alter
+the recorded steps. A changed prompt changes the LLM requests, which have
+no fixtures, so after a prompt edit check with --record-mode=live. Only
+--record-mode=record may rewrite the baseline (--update-golden), so it
+always comes from real runs that the fixtures can replay.
+"""
+import json
+from pathlib import Path
+
+from pydantic import BaseModel
+from pydantic_ai.messages import ModelResponse
+
+from tests.recording import FIXTURES_DIR
+from tests.utils import get_tool_calls
+
+GOLDEN_FILE = FIXTURES_DIR / "tool_traces.json"
+
+
+class TraceTolerance(BaseModel):
+    round_trips: int = 0        # extra orchestrator responses allowed
+    tool_calls: int = 0         # extra tool calls allowed
+    total_tokens: float = 0.0   # relative token increase allowed
+
+
+# replays repeat the recorded responses; live models vary from run to run
+TOLERANCES = {
+    "replay": TraceTolerance(),
+    "record": TraceTolerance(round_trips=1, tool_calls=1, total_tokens=0.25),
+    "live": TraceTolerance(round_trips=1, tool_calls=1, total_tokens=0.25),
+}
+
+
+def tool_trace(result) -> dict:
+    calls = get_tool_calls(result)
+    usage = result.usage()
+    return {
+        "tools": [call.name for call in calls],
+        "round_trips": sum(isinstance(m, ModelResponse) for m in result.new_messages()),
+        "tool_calls": len(calls),
+        "total_tokens": usage.input_tokens + usage.output_tokens,
+    }
+
+
+def regressions(trace: dict, baseline: dict, tolerance: TraceTolerance = TraceTolerance()) -> list[str]:
+    """What grew past the tolerance, as readable messages (empty if nothing did)."""
+    problems = []
+    for metric in ("round_trips", "tool_calls"):
+        allowed = baseline[metric] + getattr(tolerance, metric)
+        if trace[metric] > allowed:
+            problems.append(f"{metric} {baseline[metric]} -> {trace[metric]} (allowed {allowed})")
+    allowed_tokens = baseline["total_tokens"] * (1 + tolerance.total_tokens)
+    if trace["total_tokens"] > allowed_tokens:
+        problems.append(f"total_tokens {baseline['total_tokens']} -> {trace['total_tokens']} (allowed {allowed_tokens:.0f})")
+    if problems:
+        problems.append(f"tools {baseline['tools']} -> {trace['tools']}")
+    return problems
+
+
+def load_golden(path=GOLDEN_FILE) -> dict:
+    path = Path(path)
+    return json.loads(path.read_text()) if path.exists() else {}
+
+
+def save_golden(traces: dict, path=GOLDEN_FILE):
+    path = Path(path)
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_text(json.dumps(traces, indent=2, sort_keys=True) + "\n")
@@ -1,5 +1,7 @@
+import io
 import os
 import sys
+import asyncio
 import requests
 from typing import Any, Dict, Iterable, List
 from tqdm.auto import tqdm
@@ -13,7 +15,17 @@ import feedparser
 from arxiv2text import arxiv_to_text
 # from helper_functions import sliding_window
 
-from elasticsearch import Elasticsearch
+from concurrent.futures import ProcessPoolExecutor
+
+import httpx
+from elasticsearch import AsyncElasticsearch, Elasticsearch, NotFoundError
+from elasticsearch.helpers import async_bulk
+from pdfminer.high_level import extract_text
+
+from monitoring.metrics import (
+    ARXIV_FETCH_SECONDS, ES_REQUEST_SECONDS, PDF_EXTRACTION_SECONDS, TOOL_SECONDS, timed
+)
+from monitoring.tracing import span
 
 # Turn off all logging
 logging.disable(logging.CRITICAL)
@@ -57,20 +69,84 @@ def sliding_window(
     return result
 
 
+def es_span(operation: str, index_name: str):
+    return span(f"elasticsearch {operation}", kind="client", attributes={
+        "db.system": "elasticsearch",
+        "db.operation": operation,
+        "db.elasticsearch.index": index_name,
+    })
+
+
+def tool_span(tool_name: str):
+    return span(f"execute_tool {tool_name}", attributes={"gen_ai.tool.name": tool_name})
+
+
+def pdf_to_chunks(pdf_bytes: bytes, size: int, step: int) -> List[Dict[str, Any]]:
+    """
+    Extract the text of a downloaded PDF and chunk it with sliding_window.
+
+    This is the CPU-heavy part of ingestion, so it lives at module level
+    where it can be shipped to a process pool.
+    """
+    paper_data = extract_text(io.BytesIO(pdf_bytes))
+    if not paper_data:
+        return []
+    return sliding_window(paper_data, size, step)
+
+
+_process_pool = None
+
+def get_process_pool() -> ProcessPoolExecutor:
+    global _process_pool
+    if _process_pool is None:
+        _process_pool = ProcessPoolExecutor(max_workers=os.cpu_count())
+    return _process_pool
+
+
+def shutdown_process_pool():
+    global _process_pool
+    if _process_pool is not None:
+        _process_pool.shutdown(cancel_futures=True)
+        _process_pool = None
+
+
 class FetchQuery(BaseModel):
     query: str
     paper_name: str
 
 
+# Bump when index_settings change so existing indices get their mapping updated
+MAPPING_VERSION = 1
+# characters per chunk and between chunk starts when a paper is indexed
+CHUNK_SIZE = 5000
+CHUNK_STEP = 1000
+
+
+class IndexStatus(BaseModel):
+    elasticsearch: bool = False
+    index: bool = False
+    mapping_version: int | None = None
+    expected_mapping_version: int = MAPPING_VERSION
+    ready: bool = False
+    error: str | None = None
+
+
+def get_mapping_version(mapping_response, index_name):
+    mappings = mapping_response[index_name]["mappings"]
+    return mappings.get("_meta", {}).get("mapping_version")
+
+
 
 class Agent_Tools():
 
-    def __init__(self, es_index, max_results=None):
+    def __init__(self, es_index, max_results=None, chunk_size=CHUNK_SIZE, chunk_step=CHUNK_STEP):
         self.index_name = "arxiv_chunks"
         if max_results is None:
             self.max_results = 3
         else:
             self.max_results = max_results
+        self.chunk_size = chunk_size
+        self.chunk_step = chunk_step
         self.index = es_index
         self.index_settings = {
             "mappings": {
@@ -81,9 +157,45 @@ class Agent_Tools():
                         "published": {"type": "text"},
                         "summary": {"type": "text"},
                         "content": {"type": "text"},
-                }
+                },
+                "_meta": {"mapping_version": MAPPING_VERSION},
             }
         }
+        self.status = IndexStatus()
+        # called with every batch of newly indexed chunks, e.g. to invalidate caches
+        self.index_listeners = []
+
+
+    def bootstrap(self) -> IndexStatus:
+        """
+        Make sure Elasticsearch is reachable and the index exists with the
+        current mapping. Meant to run once at startup rather than per request.
+        """
+        status = IndexStatus()
+        try:
+            status.elasticsearch = self.index.ping()
+            if status.elasticsearch:
+                if not self.index.indices.exists(index=self.index_name):
+                    self.index.indices.create(index=self.index_name, body=self.index_settings)
+                    print(f"✅ Created index: {self.index_name}")
+                status.index = True
+
+                mapping = self.index.indices.get_mapping(index=self.index_name)
+                status.mapping_version = get_mapping_version(mapping, self.index_name)
+                if status.mapping_version != MAPPING_VERSION:
+                    self.index.indices.put_mapping(index=self.index_name, body=self.index_settings["mappings"])
+                    status.mapping_version = MAPPING_VERSION
+        except Exception as e:
+            status.error = str(e)
+
+        status.ready = status.index and status.mapping_version == MAPPING_VERSION
+        self.status = status
+        return status
+
+
+    def ensure_ready(self):
+        if not self.status.ready:
+            self.bootstrap()
 
 
     def get_metadata(self, paper_name="electron"):
@@ -91,7 +203,8 @@ class Agent_Tools():
         paper_name = paper_name.replace(" ", "+")
 
         url = f'http://export.arxiv.org/api/query?search_query=all:{paper_name}&max_results={self.max_results}'
-        data = urllib.request.urlopen(url).read()
+        with span("GET export.arxiv.org", kind="client", attributes={"http.request.method": "GET", "url.full": url}):
+            data = urllib.request.urlopen(url).read()
         feed = feedparser.parse(data)
 
         return feed
@@ -107,10 +220,11 @@ class Agent_Tools():
             #TODO: this pdf_url is not always yielding correct links.
             # it breaks the tool call. fix it.
             pdf_url = entry["links"][1]["href"]
-            paper_data = arxiv_to_text(pdf_url)
+            with span("arxiv_to_text", attributes={"url.full": pdf_url}):
+                paper_data = arxiv_to_text(pdf_url)
 
             if paper_data is not None:
-                chunks = sliding_window(paper_data, 5000, 1000)
+                chunks = sliding_window(paper_data, self.chunk_size, self.chunk_step)
                 for chunk in chunks:
                     entry_dict = { 
                         "id": arxiv_id,
@@ -131,23 +245,22 @@ class Agent_Tools():
 
 
     def create_elasticsearch_index(self, doc):
-        if self.index.ping():
-            print("✅ Connected to Elasticsearch")
-        else:
-            print("❌ Connection failed")
+        self.ensure_ready()
 
-        if not self.index.indices.exists(index=self.index_name):
-            self.index.indices.create(index=self.index_name, body=self.index_settings)
-            print(f"✅ Created index: {self.index_name}")
+        with es_span("index", self.index_name) as s:
+            s.set_attribute("db.elasticsearch.documents", len(doc))
+            for chunks in tqdm(doc):        
+                self.index.index(index=self.index_name, document=chunks)
 
-        for chunks in tqdm(doc):        
-            self.index.index(index=self.index_name, document=chunks)
+        for listener in self.index_listeners:
+            listener(doc)
    
 
     def get_data_to_index(self, param: FetchQuery):
-        feed = self.get_metadata(param.query)
-        doc = self.extract_data(feed)
-        self.create_elasticsearch_index(doc)
+        with tool_span("get_data_to_index"):
+            feed = self.get_metadata(param.query)
+            doc = self.extract_data(feed)
+            self.create_elasticsearch_index(doc)
 
 
     def search(self, param: FetchQuery):
@@ -162,11 +275,16 @@ class Agent_Tools():
                 }
             }
         }
-        
-        if not self.index.indices.exists(index=self.index_name):
-            self.index.indices.create(index=self.index_name, body=self.index_settings)
 
-        response = self.index.search(index=self.index_name, body=es_query)
+        with tool_span("search"):
+            self.ensure_ready()
+            try:
+                with es_span("search", self.index_name):
+                    response = self.index.search(index=self.index_name, body=es_query)
+            except NotFoundError:
+                # the index was deleted underneath us; recreate it, nothing to find yet
+                self.bootstrap()
+                return []
 
         result_docs = []
         
@@ -176,6 +294,198 @@ class Agent_Tools():
         return result_docs
 
 
+class AsyncAgent_Tools(Agent_Tools):
+    """
+    Async variant of Agent_Tools for use inside the asyncio server.
+
+    Elasticsearch and arXiv are reached through async clients and PDF
+    parsing runs in a process pool, so a tool call never blocks the event
+    loop. Tool names and signatures match Agent_Tools.
+    """
+
+    def __init__(self, es_index: AsyncElasticsearch, max_results=None, http_client=None, chunk_size=CHUNK_SIZE, chunk_step=CHUNK_STEP):
+        super().__init__(es_index=es_index, max_results=max_results, chunk_size=chunk_size, chunk_step=chunk_step)
+        if http_client is None:
+            http_client = httpx.AsyncClient(timeout=60, follow_redirects=True)
+        self.http = http_client
+
+
+    async def aclose(self):
+        await self.http.aclose()
+        await self.index.close()
+
+
+    async def get_metadata(self, paper_name="electron"):
+        return await self.fetch_feed(search_query=f"all:{paper_name}")
+
+
+    async def fetch_feed(self, search_query=None, id_list=None, max_results=None):
+        """
+        Query the arXiv API by search query (e.g. "all:lora", "cat:cs.CL")
+        and/or by a list of arXiv IDs.
+        """
+        params = {"max_results": max_results or self.max_results}
+        if search_query:
+            params["search_query"] = search_query
+        if id_list:
+            params["id_list"] = ",".join(id_list)
+            params["max_results"] = max(params["max_results"], len(id_list))
+
+        with span("GET export.arxiv.org", kind="client", attributes={"http.request.method": "GET", "arxiv.query": search_query or ",".join(id_list or [])}), \
+                timed(ARXIV_FETCH_SECONDS, kind="feed"):
+            response = await self.http.get('http://export.arxiv.org/api/query', params=params)
+            response.raise_for_status()
+        feed = feedparser.parse(response.content)
+
+        return feed
+
+
+    async def download_pdf(self, entry):
+        #TODO: this pdf_url is not always yielding correct links.
+        pdf_url = entry["links"][1]["href"]
+        try:
+            with span("GET arxiv pdf", kind="client", attributes={"http.request.method": "GET", "url.full": pdf_url}), \
+                    timed(ARXIV_FETCH_SECONDS, kind="pdf"):
+                response = await self.http.get(pdf_url)
+                response.raise_for_status()
+        except httpx.HTTPError:
+            # a broken link should not break the whole tool call
+            return None
+
+        return response.content
+
+
+    async def parse_pdf(self, entry, pdf_bytes):
+        entry_id_url = entry.id
+        arxiv_id = entry_id_url.split('/')[-1]
+
+        loop = asyncio.get_running_loop()
+        try:
+            with span("pdf_to_chunks", attributes={"arxiv.id": arxiv_id, "pdf.bytes": len(pdf_bytes)}), \
+                    timed(PDF_EXTRACTION_SECONDS):
+                chunks = await loop.run_in_executor(
+                    get_process_pool(), pdf_to_chunks, pdf_bytes, self.chunk_size, self.chunk_step
+                )
+        except Exception:
+            # not a parseable pdf
+            return []
+
+        doc = []
+        for chunk in chunks:
+            entry_dict = {
+                "id": arxiv_id,
+                "title": entry.title,
+                "authors": [auth['name'] for auth in entry.authors],
+                "published": entry.published,
+                "summary": entry.summary,
+                "content": chunk["content"],
+            }
+            doc.append(entry_dict)
+
+        return doc
+
+
+    async def extract_paper(self, entry):
+        pdf_bytes = await self.download_pdf(entry)
+        if pdf_bytes is None:
+            return []
+        return await self.parse_pdf(entry, pdf_bytes)
+
+
+    async def extract_data(self, feed):
+        # papers are downloaded and parsed concurrently
+        papers = await asyncio.gather(*[self.extract_paper(entry) for entry in feed.entries])
+
+        doc = []
+        for paper_doc in papers:
+            doc.extend(paper_doc)
+
+        return doc
+
+
+    async def bootstrap(self) -> IndexStatus:
+        status = IndexStatus()
+        try:
+            status.elasticsearch = await self.index.ping()
+            if status.elasticsearch:
+                if not await self.index.indices.exists(index=self.index_name):
+                    await self.index.indices.create(index=self.index_name, body=self.index_settings)
+                    print(f"✅ Created index: {self.index_name}")
+                status.index = True
+
+                mapping = await self.index.indices.get_mapping(index=self.index_name)
+                status.mapping_version = get_mapping_version(mapping, self.index_name)
+                if status.mapping_version != MAPPING_VERSION:
+                    await self.index.indices.put_mapping(index=self.index_name, body=self.index_settings["mappings"])
+                    status.mapping_version = MAPPING_VERSION
+        except Exception as e:
+            status.error = str(e)
+
+        status.ready = status.index and status.mapping_version == MAPPING_VERSION
+        self.status = status
+        return status
+
+
+    async def ensure_ready(self):
+        if not self.status.ready:
+            await self.bootstrap()
+
+
+    async def index_docs(self, doc):
+        actions = [{"_index": self.index_name, "_source": chunks} for chunks in doc]
+        with es_span("bulk", self.index_name) as s, timed(ES_REQUEST_SECONDS, operation="bulk"):
+            s.set_attribute("db.elasticsearch.documents", len(actions))
+            indexed, _ = await async_bulk(self.index, actions)
+
+        for listener in self.index_listeners:
+            listener(doc)
+
+        return indexed
+
+
+    async def create_elasticsearch_index(self, doc):
+        await self.ensure_ready()
+        await self.index_docs(doc)
+
+
+    async def get_data_to_index(self, param: FetchQuery):
+        with tool_span("get_data_to_index"), timed(TOOL_SECONDS, tool="get_data_to_index"):
+            feed = await self.get_metadata(param.query)
+            doc = await self.extract_data(feed)
+            await self.create_elasticsearch_index(doc)
+
+
+    async def search(self, param: FetchQuery):
+
+        es_query = {
+            "size": self.max_results,
+            "query": {
+                "multi_match": {
+                    "query": param.query,
+                    "type": "best_fields",
+                    "fields": ["content", "filename", "title", "description"],
+                }
+            }
+        }
+
+        with tool_span("search"), timed(TOOL_SECONDS, tool="search"):
+            await self.ensure_ready()
+            try:
+                with es_span("search", self.index_name), timed(ES_REQUEST_SECONDS, operation="search"):
+                    response = await self.index.search(index=self.index_name, body=es_query)
+            except NotFoundError:
+                # the index was deleted underneath us; recreate it, nothing to find yet
+                await self.bootstrap()
+                return []
+
+        result_docs = []
+
+        for hit in response['hits']['hits']:
+            result_docs.append(hit['_source'])
+
+        return result_docs
+
+
 # es = Elasticsearch("http://localhost:9200")
 
 # agent_class = Agent_Tools(es_index=es)